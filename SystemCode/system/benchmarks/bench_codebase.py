@@ -0,0 +1,158 @@
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from synthetic_codebase import SyntheticCodebaseSpec, generate_codebase
+
+from aristotle.graph.parser import ASTTraverser, CodebaseParser, ParserSettings
+from aristotle.graph.parser.parser_settings import PARSER_PROFILES
+
+
+class ProfilingTraverser(ASTTraverser):
+    """ASTTraverser that accumulates the self time spent in each visitor method."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.self_times: Counter = Counter()
+        self.calls: Counter = Counter()
+        # Time spent in nested visits of each visit on the stack
+        self.child_times: list[float] = []
+
+    def visit(self, node):
+        method = f"visit_{node.__class__.__name__}"
+        if not hasattr(self, method):
+            method = "generic_visit"
+        self.child_times.append(0.0)
+        start = time.perf_counter()
+        try:
+            return super().visit(node)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.self_times[method] += elapsed - self.child_times.pop()
+            self.calls[method] += 1
+            if self.child_times:
+                self.child_times[-1] += elapsed
+
+
+def peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def run_size(
+    spec: SyntheticCodebaseSpec, parser_profile: str, profile_files: int
+) -> dict:
+    """Generate and parse one codebase, meant to run in a fresh process so peak RSS is its own."""
+    with tempfile.TemporaryDirectory() as root:
+        generate_codebase(spec, root)
+        settings = ParserSettings(profile=parser_profile)
+        parser = CodebaseParser("bench", settings)
+        files = parser.collect_files(root)
+
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        parser.parse_dir(root)
+        elapsed = time.perf_counter() - start
+        rss_after = peak_rss_mb()
+
+        self_times: Counter = Counter()
+        calls: Counter = Counter()
+        for file_path, virtual_path, reference in files[:profile_files]:
+            traverser = ProfilingTraverser(
+                "bench", file_path, virtual_path, reference, settings
+            )
+            traverser.traverse()
+            self_times.update(traverser.self_times)
+            calls.update(traverser.calls)
+
+    return {
+        "parser_profile": parser_profile,
+        "files": len(files),
+        "nodes": len(parser.get_nodes()),
+        "edges": len(parser.get_relationships()),
+        "seconds": elapsed,
+        "peak_rss_mb": rss_after,
+        "parse_rss_mb": rss_after - rss_before,
+        "profiled_files": min(profile_files, len(files)),
+        "self_times": dict(self_times),
+        "calls": dict(calls),
+    }
+
+
+def print_report(stats: dict, top: int):
+    seconds = stats["seconds"]
+    print(
+        f"{stats['files']:>7} files [{stats['parser_profile']}]: {seconds:8.2f}s"
+        f" | {stats['files'] / seconds:8.1f} files/s"
+        f" | {stats['nodes'] / seconds:9.0f} nodes/s"
+        f" | {stats['edges'] / seconds:9.0f} edges/s"
+        f" | peak RSS {stats['peak_rss_mb']:7.1f} MB"
+        f" (+{stats['parse_rss_mb']:.1f} MB while parsing)"
+    )
+    total = sum(stats["self_times"].values()) or 1.0
+    print(f"    visitor self time over {stats['profiled_files']} files:")
+    for method, self_time in Counter(stats["self_times"]).most_common(top):
+        print(
+            f"    {method:<24} {self_time * 1e3:9.1f} ms {self_time / total:6.1%}"
+            f" {stats['calls'][method]:>9} calls"
+        )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Offline parser throughput benchmark on synthetic codebases"
+    )
+    arg_parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1_000, 10_000]
+    )
+    arg_parser.add_argument("--classes", type=int, default=3)
+    arg_parser.add_argument("--methods", type=int, default=4)
+    arg_parser.add_argument("--nesting-depth", type=int, default=2)
+    arg_parser.add_argument("--notebook-ratio", type=float, default=0.05)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument(
+        "--profile-files",
+        type=int,
+        default=200,
+        help="Number of files re-parsed with per-visitor timing",
+    )
+    arg_parser.add_argument(
+        "--parser-profiles",
+        nargs="+",
+        default=["full"],
+        choices=list(PARSER_PROFILES),
+        help="ParserSettings profiles to compare",
+    )
+    arg_parser.add_argument("--top", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    print("=" * 60)
+    print(
+        f"Synthetic codebases ({args.classes} classes x {args.methods} methods,"
+        f" nesting depth {args.nesting_depth}, {args.notebook_ratio:.0%} notebooks)"
+    )
+    print("=" * 60)
+    for size in args.sizes:
+        spec = SyntheticCodebaseSpec(
+            num_files=size,
+            classes_per_module=args.classes,
+            methods_per_class=args.methods,
+            nesting_depth=args.nesting_depth,
+            notebook_ratio=args.notebook_ratio,
+            seed=args.seed,
+        )
+        for parser_profile in args.parser_profiles:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                stats = executor.submit(
+                    run_size, spec, parser_profile, args.profile_files
+                ).result()
+            print_report(stats, args.top)
+
+
+if __name__ == "__main__":
+    main()
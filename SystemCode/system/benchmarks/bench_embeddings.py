@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+
+from synthetic_codebase import SyntheticCodebaseSpec, generate_codebase
+
+from aristotle.embedding_cache import EmbeddingCache
+from aristotle.graph.embedding_batcher import EmbeddingBatcher
+from aristotle.graph.parser import CodebaseParser, ParserSettings, build_fact
+
+
+class StandInEmbeddingServer:
+    """
+    Local stand-in for Ollama: a request takes `overhead_ms` plus `token_us` for every
+    token of the batch padded to its longest text, with `parallel` requests served at
+    once (OLLAMA_NUM_PARALLEL) and a fraction `error_rate` of them failing.
+    """
+
+    def __init__(
+        self, overhead_ms: float, token_us: float, parallel: int, error_rate: float
+    ):
+        self.overhead = overhead_ms / 1e3
+        self.token_cost = token_us / 1e6
+        self.slots = asyncio.Semaphore(parallel)
+        self.error_rate = error_rate
+        self.random = random.Random(0)
+        self.requests = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+
+    async def create(self, text: str) -> list[float]:
+        return (await self.create_batch([text]))[0]
+
+    async def create_batch(self, texts: list[str]) -> list[list[float]]:
+        lengths = [len(text) // 4 + 1 for text in texts]
+        async with self.slots:
+            self.requests += 1
+            padded = max(lengths) * len(lengths)
+            await asyncio.sleep(self.overhead + padded * self.token_cost)
+            if self.random.random() < self.error_rate:
+                raise ConnectionError("stand-in server error")
+        self.tokens += sum(lengths)
+        self.padded_tokens += padded
+        return [[0.0] * 768 for _ in texts]
+
+
+def load_texts(num_files: int) -> list[str]:
+    """Node names and facts of a synthetic codebase, the texts ingestion embeds."""
+    with tempfile.TemporaryDirectory() as root:
+        generate_codebase(SyntheticCodebaseSpec(num_files=num_files), root)
+        parser = CodebaseParser("bench", ParserSettings())
+        parser.parse_dir(root)
+    texts = [node.uuid for node in parser.get_nodes()]
+    texts.extend(
+        build_fact(r.source, r.relationship, r.target, dict(r.attributes))
+        for r in parser.get_relationships()
+    )
+    return texts
+
+
+def report(label: str, server: StandInEmbeddingServer, num_texts: int, seconds: float):
+    padding = 1 - server.tokens / server.padded_tokens if server.padded_tokens else 0
+    print(
+        f"{label:<24} {seconds:8.2f}s | {num_texts / seconds:8.0f} texts/s"
+        f" | {server.requests:>6} requests"
+        f" | padding {padding:6.1%}"
+    )
+
+
+async def main_async(args):
+    texts = load_texts(args.files)
+    print("=" * 60)
+    print(
+        f"{len(texts)} texts, stand-in server {args.overhead_ms} ms + {args.token_us} us"
+        f" per padded token, {args.parallel} parallel, {args.error_rate:.0%} errors"
+    )
+    print("=" * 60)
+
+    def new_server():
+        return StandInEmbeddingServer(
+            args.overhead_ms, args.token_us, args.parallel, args.error_rate
+        )
+
+    if args.sequential:
+        server = new_server()
+        start = time.perf_counter()
+        for text in texts:
+            # Retry until it goes through, as a caller of create would have to
+            while True:
+                try:
+                    await server.create(text)
+                    break
+                except ConnectionError:
+                    pass
+        report("one text per request", server, len(texts), time.perf_counter() - start)
+
+    for concurrency in args.concurrency:
+        server = new_server()
+        batcher = EmbeddingBatcher(
+            server,  # type: ignore
+            batch_size=args.batch_size,
+            max_concurrency=concurrency,
+            target_latency=args.target_latency,
+            retry_delay=0.01,
+        )
+        start = time.perf_counter()
+        await batcher.embed(texts)
+        report(
+            f"batched, {concurrency} in flight",
+            server,
+            len(texts),
+            time.perf_counter() - start,
+        )
+        print(f"    final batch size {batcher.batch_size}, {batcher.errors} errors")
+
+    if not args.cache:
+        return
+    # A reload of the same codebase, the second pass is served by the cache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = EmbeddingCache(f"{cache_dir}/embeddings.sqlite3", 1024 * 1024 * 1024)
+        for label in ("cache, cold", "cache, warm"):
+            server = new_server()
+            batcher = EmbeddingBatcher(
+                server,  # type: ignore
+                batch_size=args.batch_size,
+                max_concurrency=args.concurrency[-1],
+                target_latency=args.target_latency,
+                retry_delay=0.01,
+                cache=cache,
+                model="bench",
+                dim=768,
+            )
+            start = time.perf_counter()
+            await batcher.embed(texts)
+            report(label, server, len(texts), time.perf_counter() - start)
+        print(f"    {cache.stats()}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Embedding throughput of EmbeddingBatcher against an Ollama stand-in"
+    )
+    arg_parser.add_argument("--files", type=int, default=20)
+    arg_parser.add_argument("--overhead-ms", type=float, default=5)
+    arg_parser.add_argument("--token-us", type=float, default=20)
+    arg_parser.add_argument("--parallel", type=int, default=4)
+    arg_parser.add_argument("--error-rate", type=float, default=0.01)
+    arg_parser.add_argument("--batch-size", type=int, default=32)
+    arg_parser.add_argument("--target-latency", type=float, default=0.5)
+    arg_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    arg_parser.add_argument(
+        "--no-sequential",
+        dest="sequential",
+        action="store_false",
+        help="Skip the one text per request baseline",
+    )
+    arg_parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Skip the cold and warm embedding cache runs",
+    )
+    asyncio.run(main_async(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
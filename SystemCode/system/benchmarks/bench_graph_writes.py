@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from types import SimpleNamespace
+
+from synthetic_codebase import SyntheticCodebaseSpec, generate_codebase
+
+from aristotle.graph import GraphDatabase
+from aristotle.graph.embedding_batcher import EmbeddingBatcher
+from aristotle.graph.name_index import NameIndex
+from aristotle.graph.search_cache import SearchCache
+from aristotle.graph.parser import (CodebaseParser, ParseBatch, ParserSettings,
+                                    read_parser_results)
+
+
+class StandInTransaction:
+    def __init__(self, driver: "StandInDriver"):
+        self.driver = driver
+
+    async def run(self, query: str, **params):
+        (records,) = params.values()
+        await self.driver.round_trip(len(records))
+        self.driver.records += len(records)
+        return SimpleNamespace(consume=self.consume)
+
+    async def consume(self):
+        pass
+
+
+class StandInSession:
+    def __init__(self, driver: "StandInDriver"):
+        self.driver = driver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def execute_write(self, func, *args, **kwargs):
+        self.driver.transactions += 1
+        result = await func(StandInTransaction(self.driver), *args, **kwargs)
+        # The commit is a round trip of its own
+        await self.driver.round_trip(0)
+        return result
+
+
+class StandInDriver:
+    """
+    Local stand-in for the Neo4j driver: every query and commit costs a round trip of
+    `latency_ms` plus `per_record_us` of server work per record it carries.
+    """
+
+    def __init__(self, latency_ms: float, per_record_us: float):
+        self.latency = latency_ms / 1e3
+        self.per_record = per_record_us / 1e6
+        self.transactions = 0
+        self.records = 0
+
+    async def round_trip(self, num_records: int):
+        await asyncio.sleep(self.latency + num_records * self.per_record)
+
+    def session(self):
+        return StandInSession(self)
+
+
+class ConstantEmbedder:
+    async def create_batch(self, texts: list[str]) -> list[list[float]]:
+        return [[0.0] * 768 for _ in texts]
+
+
+def load_batches(args) -> list[ParseBatch]:
+    if args.input:
+        return list(read_parser_results(args.input))
+    with tempfile.TemporaryDirectory() as root:
+        generate_codebase(SyntheticCodebaseSpec(num_files=args.files), root)
+        parser = CodebaseParser("bench", ParserSettings())
+        return list(parser.iter_parse_dir(root, max_batch_items=2000))
+
+
+async def run(batches: list[ParseBatch], batch_size: int, args) -> dict:
+    driver = StandInDriver(args.latency_ms, args.per_record_us)
+    graph_db = GraphDatabase.__new__(GraphDatabase)
+    graph_db.graphiti = SimpleNamespace(driver=driver)
+    graph_db.embedding_batcher = EmbeddingBatcher(ConstantEmbedder())
+    graph_db.write_batch_size = batch_size
+    graph_db.name_index = NameIndex()
+    graph_db.search_cache = SearchCache(max_entries=0, ttl_seconds=0)
+
+    start = time.perf_counter()
+    docstrings: dict[str, str] = {}
+    for batch in batches:
+        await graph_db.insert_batch(batch, docstrings)
+    elapsed = time.perf_counter() - start
+    return {
+        "batch_size": batch_size,
+        "records": driver.records,
+        "transactions": driver.transactions,
+        "seconds": elapsed,
+    }
+
+
+async def main_async(args):
+    batches = load_batches(args)
+    items = sum(len(batch) for batch in batches)
+    print("=" * 60)
+    print(
+        f"{items} nodes and relationships, stand-in round trip {args.latency_ms} ms"
+        f" + {args.per_record_us} us per record"
+    )
+    print("=" * 60)
+    for batch_size in args.batch_sizes:
+        stats = await run(batches, batch_size, args)
+        print(
+            f"batch size {stats['batch_size']:>6}: {stats['seconds']:8.2f}s"
+            f" | {stats['records'] / stats['seconds']:9.0f} items/s"
+            f" | {stats['transactions']:>7} transactions"
+        )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Graph write throughput by batch size against a Neo4j stand-in"
+    )
+    arg_parser.add_argument(
+        "--input", help="Parse stream written by main_stream.py, instead of parsing"
+    )
+    arg_parser.add_argument(
+        "--files", type=int, default=50, help="Size of the synthetic codebase"
+    )
+    arg_parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 500, 2000]
+    )
+    arg_parser.add_argument("--latency-ms", type=float, default=0.5)
+    arg_parser.add_argument("--per-record-us", type=float, default=20)
+    asyncio.run(main_async(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
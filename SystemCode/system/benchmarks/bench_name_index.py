@@ -0,0 +1,57 @@
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from synthetic_codebase import SyntheticCodebaseSpec, generate_codebase
+
+from aristotle.graph.name_index import NameIndex
+from aristotle.graph.parser import CodebaseParser, ParserSettings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="NameIndex build time and lookup latency on a synthetic codebase"
+    )
+    arg_parser.add_argument("--files", type=int, default=1000)
+    arg_parser.add_argument("--queries", type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_codebase(SyntheticCodebaseSpec(num_files=args.files), root)
+        parser = CodebaseParser("bench", ParserSettings())
+        parser.parse_dir(root)
+    uuids = [node.uuid for node in parser.get_nodes()]
+
+    index = NameIndex()
+    start = time.perf_counter()
+    index.load("bench", uuids)
+    build = time.perf_counter() - start
+
+    symbols = [
+        node.uuid.split(".", 2)[-1]
+        for node in parser.get_nodes()
+        if node.kind in ("CLASS", "METHOD", "FUNCTION")
+    ]
+    rng = random.Random(0)
+    latencies = []
+    found = 0
+    for _ in range(args.queries):
+        query = f"what are the parameters of `{rng.choice(symbols)}` and what calls it"
+        start = time.perf_counter()
+        found += bool(index.lookup(query))
+        latencies.append(time.perf_counter() - start)
+
+    print("=" * 60)
+    print(f"{len(uuids)} nodes, {len(index.suffixes['bench'])} suffixes")
+    print("=" * 60)
+    print(f"build: {build * 1e3:.1f} ms")
+    print(
+        f"lookup: median {statistics.median(latencies) * 1e6:.1f} us,"
+        f" max {max(latencies) * 1e6:.1f} us, {found}/{args.queries} found"
+    )
+
+
+if __name__ == "__main__":
+    main()
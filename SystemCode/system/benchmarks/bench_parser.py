@@ -0,0 +1,266 @@
+import argparse
+import ast
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from aristotle.graph.parser import ASTTraverser, ParserSettings, RelationshipTable
+from aristotle.graph.parser.notebook import (
+    convert_with_nbconvert,
+    extract_notebook_source,
+)
+
+
+def generate_many_globals_module(num_globals: int) -> str:
+    """Synthetic generated-style module: imports and functions interleaved with globals."""
+    lines = ['"""Synthetic module with many globals."""', "import os", ""]
+    for i in range(num_globals):
+        if i % 10 == 0:
+            lines.append(f"from pkg{i}.sub import Name{i} as alias_{i}")
+        if i % 3 == 0:
+            lines.append(f"VAR_{i}: int = {i}")
+        else:
+            lines.append(f"VAR_{i} = VAR_{i - 1} + 1")
+        if i % 100 == 0:
+            lines.append(f"def func_{i}(x: int) -> int:")
+            lines.append(f"    return x + VAR_{i}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_nested_module(num_classes: int, methods_per_class: int, depth: int) -> str:
+    """Synthetic module with classes whose methods contain nested functions."""
+    lines = []
+    for c in range(num_classes):
+        lines.append(f"class Class{c}:")
+        for m in range(methods_per_class):
+            lines.append(f"    def method_{m}(self, value: int):")
+            indent = "        "
+            for d in range(depth):
+                lines.append(f"{indent}def nested_{d}(item):")
+                indent += "    "
+                lines.append(f"{indent}if item:")
+                lines.append(f"{indent}    return item + {d}")
+            for d in range(depth):
+                indent = indent[:-4]
+                lines.append(f"{indent}return nested_{depth - d - 1}")
+            lines.append(f"        return value")
+    return "\n".join(lines) + "\n"
+
+
+def generate_notebook(num_cells: int) -> dict:
+    """Synthetic v4 notebook alternating markdown, code and output-heavy cells."""
+    cells = []
+    for i in range(num_cells):
+        cells.append(
+            {"cell_type": "markdown", "metadata": {}, "source": [f"## Step {i}\n"]}
+        )
+        cells.append(
+            {
+                "cell_type": "code",
+                "execution_count": i,
+                "metadata": {},
+                "outputs": [
+                    {
+                        "output_type": "stream",
+                        "name": "stdout",
+                        "text": [f"line {j}\n" for j in range(20)],
+                    }
+                ],
+                "source": [
+                    f"def step_{i}(data: list) -> int:\n",
+                    f"    return len(data) + {i}\n",
+                    "\n",
+                    f"result_{i} = step_{i}([1, 2, 3])\n",
+                ],
+            }
+        )
+    return {
+        "cells": cells,
+        "metadata": {"language_info": {"name": "python"}},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+
+
+def bench_notebooks(num_notebooks: int, cells_per_notebook: int):
+    print("=" * 60)
+    print(
+        f"Notebook extraction ({num_notebooks} notebooks x {cells_per_notebook} cells)"
+    )
+    print("=" * 60)
+    notebooks = [
+        json.loads(json.dumps(generate_notebook(cells_per_notebook)))
+        for _ in range(num_notebooks)
+    ]
+    for label, convert in (
+        ("nbconvert", convert_with_nbconvert),
+        ("direct JSON", extract_notebook_source),
+    ):
+        start = time.perf_counter()
+        for notebook in notebooks:
+            ast.parse(convert(notebook).source)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:<12} {elapsed:8.3f}s"
+            f" ({elapsed / num_notebooks * 1e3:7.2f} ms/notebook)"
+        )
+
+
+# Context and operator nodes are shared singletons, not distinct tree nodes
+SHARED_AST_NODES = (ast.expr_context, ast.operator, ast.boolop, ast.cmpop, ast.unaryop)
+
+
+class CountingTraverser(ASTTraverser):
+    """ASTTraverser that counts how many times each AST node is visited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.visit_counts: Counter = Counter()
+
+    def visit(self, node):
+        if not isinstance(node, SHARED_AST_NODES):
+            self.visit_counts[id(node)] += 1
+        return super().visit(node)
+
+
+def bench_visit_counts(num_classes: int, methods_per_class: int, depth: int):
+    print("=" * 60)
+    print(
+        f"Node visits ({num_classes} classes x {methods_per_class} methods,"
+        f" nesting depth {depth})"
+    )
+    print("=" * 60)
+    source = generate_nested_module(num_classes, methods_per_class, depth)
+    num_ast_nodes = sum(
+        1
+        for node in ast.walk(ast.parse(source))
+        if not isinstance(node, SHARED_AST_NODES)
+    )
+
+    # Count nodes yielded by any extra ast.walk the traverser might do on the side
+    walked = Counter()
+    original_walk = ast.walk
+
+    def counting_walk(node):
+        for child in original_walk(node):
+            walked[id(child)] += 1
+            yield child
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "nested.py")
+        with open(file_path, "w") as f:
+            f.write(source)
+        traverser = CountingTraverser(
+            "bench", file_path, "./nested.py", file_path, ParserSettings()
+        )
+        ast.walk = counting_walk
+        try:
+            start = time.perf_counter()
+            traverser.traverse()
+            elapsed = time.perf_counter() - start
+        finally:
+            ast.walk = original_walk
+
+    visits = sum(traverser.visit_counts.values())
+    revisited = sum(1 for count in traverser.visit_counts.values() if count > 1)
+    print(f"AST nodes:            {num_ast_nodes}")
+    print(f"Visitor visits:       {visits} ({revisited} nodes visited more than once)")
+    print(f"Extra ast.walk nodes: {sum(walked.values())}")
+    print(f"Traverse time:        {elapsed:.3f}s")
+
+
+def bench_many_globals(sizes: list[int]):
+    print("=" * 60)
+    print("Many globals module (ASTTraverser.traverse)")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            file_path = os.path.join(tmp_dir, f"globals_{size}.py")
+            with open(file_path, "w") as f:
+                f.write(generate_many_globals_module(size))
+
+            start = time.perf_counter()
+            nodes, relationships = ASTTraverser(
+                "bench", file_path, f"./globals_{size}.py", file_path, ParserSettings()
+            ).traverse()
+            elapsed = time.perf_counter() - start
+            print(
+                f"{size:>7} globals: {elapsed:8.3f}s"
+                f" ({elapsed / size * 1e6:7.1f} us/global,"
+                f" {len(nodes)} nodes, {len(relationships)} edges)"
+            )
+
+
+class DictRelationship:
+    """Relationship as it was stored before, with a per-instance __dict__."""
+
+    def __init__(self, source, relationship, target, attributes):
+        self.source = source
+        self.relationship = relationship
+        self.target = target
+        self.attributes = attributes
+
+
+def bench_edge_memory(num_classes: int, methods_per_class: int, depth: int):
+    print("=" * 60)
+    print("Retained bytes per edge (tracemalloc)")
+    print("=" * 60)
+    representations = {
+        "dict instances (before)": lambda rels: [
+            DictRelationship(*r.to_tuple()) for r in rels
+        ],
+        "__slots__ instances": lambda rels: rels,
+        "RelationshipTable": RelationshipTable,
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "nested.py")
+        with open(file_path, "w") as f:
+            f.write(generate_nested_module(num_classes, methods_per_class, depth))
+
+        for label, build in representations.items():
+            gc.collect()
+            tracemalloc.start()
+            _, relationships = ASTTraverser(
+                "bench", file_path, "./nested.py", file_path, ParserSettings()
+            ).traverse()
+            num_edges = len(relationships)
+            stored = build(relationships)
+            del relationships
+            gc.collect()
+            retained, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del stored
+            print(
+                f"{label:<24} {retained / num_edges:8.1f} bytes/edge"
+                f" ({num_edges} edges)"
+            )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Offline parser benchmarks")
+    arg_parser.add_argument(
+        "--globals",
+        type=int,
+        nargs="+",
+        default=[1_000, 5_000, 10_000],
+        help="Number of globals in the synthetic module",
+    )
+    arg_parser.add_argument(
+        "--nesting-depth",
+        type=int,
+        default=4,
+        help="Depth of nested functions in the node visit benchmark",
+    )
+    args = arg_parser.parse_args()
+    bench_many_globals(args.globals)
+    bench_visit_counts(200, 10, args.nesting_depth)
+    bench_edge_memory(200, 10, args.nesting_depth)
+    bench_notebooks(200, 30)
+
+
+if __name__ == "__main__":
+    main()
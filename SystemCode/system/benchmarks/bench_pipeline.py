@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from types import SimpleNamespace
+
+from bench_embeddings import StandInEmbeddingServer
+from bench_graph_writes import StandInDriver
+from synthetic_codebase import SyntheticCodebaseSpec, generate_codebase
+
+from aristotle.graph import GraphDatabase, IngestPipeline
+from aristotle.graph.embedding_batcher import EmbeddingBatcher
+from aristotle.graph.name_index import NameIndex
+from aristotle.graph.search_cache import SearchCache
+from aristotle.graph.parser import (CodebaseParser, ParserSettings,
+                                    iterate_in_thread)
+
+
+def new_graph_db(args) -> GraphDatabase:
+    graph_db = GraphDatabase.__new__(GraphDatabase)
+    graph_db.graphiti = SimpleNamespace(
+        driver=StandInDriver(args.latency_ms, args.per_record_us)
+    )
+    server = StandInEmbeddingServer(args.overhead_ms, args.token_us, args.parallel, 0)
+    graph_db.embedding_batcher = EmbeddingBatcher(
+        server, max_concurrency=args.parallel  # type: ignore
+    )
+    graph_db.write_batch_size = 500
+    graph_db.name_index = NameIndex()
+    graph_db.search_cache = SearchCache(max_entries=0, ttl_seconds=0)
+    return graph_db
+
+
+def docs_loader(args):
+    # Encoding the README chunks blocks on the embedding server
+    time.sleep(args.docs_seconds)
+    return 1
+
+
+def iter_batches(root: str, args):
+    parser = CodebaseParser("bench", ParserSettings())
+    return parser.iter_parse_dir(root, max_batch_items=args.batch_items)
+
+
+async def sequential(root: str, args):
+    """Parse and insert batch by batch, then load the docs, as loading used to."""
+    graph_db = new_graph_db(args)
+    await graph_db.insert_parser_results(iterate_in_thread(iter_batches(root, args)))
+    await asyncio.to_thread(docs_loader, args)
+
+
+async def pipelined(root: str, args):
+    pipeline = IngestPipeline(
+        new_graph_db(args),
+        queue_size=args.queue_size,
+        embed_concurrency=args.embed_concurrency,
+    )
+    await pipeline.run(iter_batches(root, args), docs_loader=lambda: docs_loader(args))
+
+
+async def main_async(args):
+    with tempfile.TemporaryDirectory() as root:
+        generate_codebase(SyntheticCodebaseSpec(num_files=args.files), root)
+        for label, run in (("sequential", sequential), ("pipelined", pipelined)):
+            print("=" * 60)
+            print(label)
+            print("=" * 60)
+            start = time.perf_counter()
+            await run(root, args)
+            print(f"{label}: {time.perf_counter() - start:.2f}s")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Sequential against pipelined ingestion with local stand-ins"
+    )
+    arg_parser.add_argument("--files", type=int, default=100)
+    arg_parser.add_argument("--batch-items", type=int, default=2000)
+    arg_parser.add_argument("--queue-size", type=int, default=4)
+    arg_parser.add_argument("--embed-concurrency", type=int, default=2)
+    arg_parser.add_argument("--overhead-ms", type=float, default=5)
+    arg_parser.add_argument("--token-us", type=float, default=20)
+    arg_parser.add_argument("--parallel", type=int, default=4)
+    arg_parser.add_argument("--latency-ms", type=float, default=0.5)
+    arg_parser.add_argument("--per-record-us", type=float, default=20)
+    arg_parser.add_argument("--docs-seconds", type=float, default=1.0)
+    asyncio.run(main_async(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import csv
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+import numpy as np
+
+from aristotle import project_config
+from aristotle.graph import GraphDatabase, graph_database
+from aristotle.graph.name_index import NameIndex, query_symbols
+from aristotle.graph.rerankers import RERANK_STRATEGIES
+from aristotle.graph.search_cache import SearchCache
+
+# Strategies the stand-in covers, llm reranking needs the Ollama chat model
+STAND_IN_STRATEGIES = ("rrf", "cosine", "cross_encoder")
+
+
+class StandInGraphiti:
+    """
+    Local stand-in for graphiti on Neo4j and Ollama: embedding the query takes
+    `embed_ms`, each query to Neo4j `round_trip_ms`, and the hybrid search computes
+    the cosine similarity of every fact embedding like the Neo4j vector index scan.
+    """
+
+    def __init__(self, edges: int, dim: int, embed_ms: float, round_trip_ms: float):
+        self.random = np.random.default_rng(0)
+        embeddings = self.random.standard_normal((edges, dim), dtype=np.float32)
+        self.embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.embed_seconds = embed_ms / 1e3
+        self.round_trip_seconds = round_trip_ms / 1e3
+        self.clients = None
+        self.embedder = SimpleNamespace(create=self.embed)
+        self.driver = SimpleNamespace(execute_query=self.execute_query)
+
+    async def embed(self, input_data: List[str]) -> List[float]:
+        await asyncio.sleep(self.embed_seconds)
+        return self.random.standard_normal(self.embeddings.shape[1]).tolist()
+
+    async def execute_query(self, query: str, uuids: List[str]):
+        """Fact embeddings of the candidates, the only query the reranking runs."""
+        await asyncio.sleep(self.round_trip_seconds)
+        records = [
+            {"uuid": uuid, "embedding": self.embeddings[int(uuid)].tolist()}
+            for uuid in uuids
+        ]
+        return records, None, None
+
+    async def hybrid_search(self, query_vector: List[float], limit: int):
+        # BM25 and vector queries, fused with RRF
+        await asyncio.sleep(2 * self.round_trip_seconds)
+        scores = self.embeddings @ np.asarray(query_vector, dtype=np.float32)
+        top = np.argpartition(-scores, limit)[:limit]
+        return [
+            SimpleNamespace(uuid=str(i), fact=f"fact {i}")
+            for i in top[np.argsort(-scores[top])]
+        ]
+
+    async def search(
+        self, query: str, group_ids: Optional[List[str]] = None, num_results=10
+    ):
+        """Graphiti.search, the rrf strategy."""
+        return await self.hybrid_search(await self.embed([query]), num_results)
+
+    async def search_candidates(
+        self, clients, query, group_ids, config, search_filter, query_vector
+    ):
+        """graphiti_core.search.search, the candidates of the other strategies."""
+        edges = await self.hybrid_search(query_vector, config.limit)
+        return SimpleNamespace(edges=edges)
+
+
+class StandInCrossEncoder:
+    """
+    Local stand-in for LocalCrossEncoder, blocking its thread for `pair_ms` per
+    (query, fact) pair like the model's forward pass on CPU.
+    """
+
+    def __init__(self, pair_ms: float):
+        self.pair_seconds = pair_ms / 1e3
+
+    def scores(self, query: str, texts: List[str]) -> List[float]:
+        time.sleep(self.pair_seconds * len(texts))
+        return [float(len(text)) for text in texts]
+
+
+def stand_in_graph_db(args) -> GraphDatabase:
+    graphiti = StandInGraphiti(args.edges, args.dim, args.embed_ms, args.round_trip_ms)
+    graph_database.search = graphiti.search_candidates  # type: ignore
+    graph_db = GraphDatabase.__new__(GraphDatabase)
+    graph_db.graphiti = graphiti  # type: ignore
+    graph_db.name_index = NameIndex()
+    graph_db.search_cache = SearchCache(max_entries=0, ttl_seconds=0)
+    graph_db.cross_encoder = StandInCrossEncoder(args.pair_ms)  # type: ignore
+    graph_db.embedding_batcher = SimpleNamespace(  # type: ignore
+        cache=None, model="stand-in", dim=args.dim
+    )
+    return graph_db
+
+
+def identifier_recall(reference: str, facts: list[str]) -> float:
+    """
+    Share of the code identifiers of the reference answer (e.g. `split_features`)
+    that appear in the retrieved facts, a retrieval quality proxy that needs no LLM.
+    """
+    identifiers = {symbol.split(".")[-1].lower() for symbol in query_symbols(reference)}
+    if not identifiers:
+        return 0.0
+    text = "\n".join(facts).lower()
+    return sum(1 for identifier in identifiers if identifier in text) / len(identifiers)
+
+
+def load_questions(path: str, limit: int) -> list[tuple[str, str]]:
+    csv.field_size_limit(sys.maxsize)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    questions = [(row["user_input"], row["reference"]) for row in rows]
+    return [q for q in questions if query_symbols(q[1])][:limit]
+
+
+async def measure(graph_db: GraphDatabase, strategy: str, questions, args):
+    # One untimed search loads models and warms the caches
+    await graph_db.semantic_search(questions[0][0], args.top_k, None, strategy)
+    latencies, recalls = [], []
+    for question, reference in questions:
+        start = time.perf_counter()
+        edges = await graph_db.semantic_search(question, args.top_k, None, strategy)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(identifier_recall(reference, [e.fact for e in edges]))
+    latencies.sort()
+    line = (
+        f"{strategy:<14} median {statistics.median(latencies) * 1e3:8.1f} ms"
+        f" | p90 {latencies[int(len(latencies) * 0.9)] * 1e3:8.1f} ms"
+    )
+    if args.live:
+        line += f" | identifier recall {statistics.mean(recalls):.3f}"
+    print(line)
+
+
+async def main_async(args):
+    if not args.live:
+        questions = [
+            (f"How does `module_{i}.Class_{i}.run` validate its options", "")
+            for i in range(args.limit)
+        ]
+        print("=" * 60)
+        print(
+            f"Stand-in graph of {args.edges} facts, {args.dim} dimensions,"
+            f" query embedding {args.embed_ms} ms, Neo4j round trip"
+            f" {args.round_trip_ms} ms, cross-encoder {args.pair_ms} ms per pair,"
+            f" top {args.top_k} of {args.top_k * project_config.rerank_candidates}"
+        )
+        print("=" * 60)
+        graph_db = stand_in_graph_db(args)
+        for strategy in args.strategies:
+            if strategy not in STAND_IN_STRATEGIES:
+                print(f"[WARN] Skipped '{strategy}', it needs --live")
+                continue
+            await measure(graph_db, strategy, questions, args)
+        return
+
+    questions = load_questions(args.questions, args.limit)
+    graph_db = GraphDatabase()
+    print("=" * 60)
+    print(f"{len(questions)} questions from {args.questions}, top {args.top_k}")
+    print("=" * 60)
+    try:
+        for strategy in args.strategies:
+            await measure(graph_db, strategy, questions, args)
+    finally:
+        await graph_db.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Latency of each rerank strategy against a local stand-in graph,"
+        " or with --live also its retrieval quality against the configured Neo4j and"
+        " Ollama with the evaluated codebases loaded"
+    )
+    arg_parser.add_argument("--live", action="store_true")
+    arg_parser.add_argument(
+        "--questions", default="../eval/eval_progress_with_facts.csv"
+    )
+    arg_parser.add_argument("--limit", type=int, default=30)
+    arg_parser.add_argument("--top-k", type=int, default=7)
+    arg_parser.add_argument("--edges", type=int, default=20000)
+    arg_parser.add_argument("--dim", type=int, default=768)
+    arg_parser.add_argument("--embed-ms", type=float, default=15)
+    arg_parser.add_argument("--round-trip-ms", type=float, default=2)
+    arg_parser.add_argument("--pair-ms", type=float, default=3)
+    arg_parser.add_argument(
+        "--strategies", nargs="+", choices=RERANK_STRATEGIES, default=None
+    )
+    args = arg_parser.parse_args()
+    if args.strategies is None:
+        args.strategies = RERANK_STRATEGIES if args.live else STAND_IN_STRATEGIES
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
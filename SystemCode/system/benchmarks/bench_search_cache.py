@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+from bench_search_routing import CODEBASE_NAMES, StandInGraphiti
+
+from aristotle.graph import GraphDatabase
+from aristotle.graph.name_index import NameIndex
+from aristotle.graph.search_cache import SearchCache
+
+
+def agent_queries(args) -> list[tuple[str, str]]:
+    """
+    Searches of an agent session: a few popular questions asked over and over, with
+    small variations, and a long tail of one-off ones (Zipf distributed).
+    """
+    random = np.random.default_rng(1)
+    ranks = random.zipf(args.zipf, args.queries)
+    queries = []
+    for rank in ranks:
+        codebase = CODEBASE_NAMES[rank % args.codebases]
+        query = f"How does {codebase} handle case {rank}"
+        queries.append((query + ("?" if random.random() < 0.5 else ""), codebase))
+    return queries
+
+
+async def measure(graph_db: GraphDatabase, queries, write_every: int):
+    latencies = []
+    for i, (query, codebase) in enumerate(queries):
+        if write_every and i % write_every == 0:
+            # A file of the codebase is reloaded
+            graph_db.search_cache.invalidate(codebase)
+        start = time.perf_counter()
+        await graph_db.search(query, top_k=7, group_ids=[codebase], rerank="rrf")
+        latencies.append(time.perf_counter() - start)
+    return statistics.mean(latencies) * 1e3
+
+
+async def main_async(args):
+    graphiti = StandInGraphiti(args.edges, args.dim)
+    for name in CODEBASE_NAMES[: args.codebases]:
+        graphiti.load(name)
+    queries = agent_queries(args)
+
+    print("=" * 60)
+    print(f"{args.queries} searches over {args.codebases} codebases")
+    print("=" * 60)
+    for label, max_entries in (("uncached", 0), ("cached", args.max_entries)):
+        graph_db = GraphDatabase.__new__(GraphDatabase)
+        graph_db.graphiti = graphiti  # type: ignore
+        graph_db.name_index = NameIndex()
+        graph_db.search_cache = SearchCache(max_entries, args.ttl_seconds)
+        mean = await measure(graph_db, queries, args.write_every)
+        stats = graph_db.search_cache.stats()
+        print(
+            f"{label:<9} mean {mean:6.2f} ms | hit rate {stats['hit_rate']:.2f}"
+            f" | {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB"
+        )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Graph search latency of agent-like searches with the search cache"
+    )
+    arg_parser.add_argument("--codebases", type=int, default=10)
+    arg_parser.add_argument("--edges", type=int, default=2000)
+    arg_parser.add_argument("--dim", type=int, default=768)
+    arg_parser.add_argument("--queries", type=int, default=2000)
+    arg_parser.add_argument("--zipf", type=float, default=1.3)
+    arg_parser.add_argument("--max-entries", type=int, default=1024)
+    arg_parser.add_argument("--ttl-seconds", type=float, default=600)
+    arg_parser.add_argument("--write-every", type=int, default=200)
+    asyncio.run(main_async(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
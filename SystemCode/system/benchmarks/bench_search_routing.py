@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+import numpy as np
+
+from aristotle.graph import GraphDatabase
+from aristotle.graph.name_index import NameIndex
+from aristotle.graph.search_cache import SearchCache
+from aristotle.kbs.codebase_router import route_codebases
+
+CODEBASE_NAMES = [
+    "numpy", "pandas", "scikit-learn", "scipy", "matplotlib", "django", "flask",
+    "fastapi", "pydantic", "sqlalchemy", "celery", "httpx", "aiohttp", "pytest",
+    "black", "mypy", "keras", "xgboost", "lightgbm", "graphiti", "langchain",
+    "transformers", "diffusers", "torchvision", "jax", "polars", "dask", "ray",
+    "airflow", "prefect", "dagster", "streamlit", "gradio", "rich", "typer",
+    "click", "boto3", "paramiko", "cryptography", "pillow", "opencv-python",
+    "networkx", "sympy", "statsmodels", "seaborn", "plotly", "bokeh", "tornado",
+    "starlette", "uvicorn",
+]  # fmt: skip
+
+
+class StandInGraphiti:
+    """
+    Local stand-in for graphiti's edge search on Neo4j, which filters the RELATES_TO
+    edges by group_id and computes the cosine similarity of every remaining edge.
+    """
+
+    def __init__(self, edges_per_codebase: int, dim: int):
+        self.edges_per_codebase = edges_per_codebase
+        self.dim = dim
+        self.random = np.random.default_rng(0)
+        self.embeddings: dict[str, np.ndarray] = {}
+
+    def load(self, codebase_name: str):
+        embeddings = self.random.standard_normal(
+            (self.edges_per_codebase, self.dim), dtype=np.float32
+        )
+        self.embeddings[codebase_name] = embeddings / np.linalg.norm(
+            embeddings, axis=1, keepdims=True
+        )
+
+    async def search(
+        self, query: str, group_ids: Optional[List[str]] = None, num_results=10
+    ):
+        query_embedding = self.random.standard_normal(self.dim, dtype=np.float32)
+        groups = group_ids if group_ids is not None else list(self.embeddings)
+        scores = np.concatenate(
+            [self.embeddings[group] @ query_embedding for group in groups]
+        )
+        top = np.argpartition(-scores, num_results)[:num_results]
+        return [SimpleNamespace(uuid=str(i)) for i in top]
+
+
+async def measure(graph_db: GraphDatabase, codebases: List[str], routed: bool, args):
+    latencies = []
+    for i in range(args.queries):
+        target = codebases[i % len(codebases)]
+        query = f"How does {target} validate the options passed to its main entry point"
+        start = time.perf_counter()
+        group_ids = route_codebases(query, codebases) if routed else None
+        await graph_db.search(query, top_k=7, group_ids=group_ids or None)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1e3
+
+
+async def main_async(args):
+    graphiti = StandInGraphiti(args.edges, args.dim)
+    graph_db = GraphDatabase.__new__(GraphDatabase)
+    graph_db.graphiti = graphiti  # type: ignore
+    graph_db.name_index = NameIndex()
+    graph_db.search_cache = SearchCache(max_entries=0, ttl_seconds=0)
+
+    print("=" * 60)
+    print(
+        f"{args.edges} edges per codebase, {args.dim} dimensions,"
+        f" median of {args.queries} queries"
+    )
+    print("=" * 60)
+    loaded: List[str] = []
+    for count in args.codebases:
+        for name in CODEBASE_NAMES[len(loaded) : count]:
+            graphiti.load(name)
+            loaded.append(name)
+        unscoped = await measure(graph_db, loaded, False, args)
+        routed = await measure(graph_db, loaded, True, args)
+        print(
+            f"{len(loaded):>3} codebases: all {unscoped:8.2f} ms"
+            f" | routed {routed:8.2f} ms"
+        )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Graph search latency by number of loaded codebases, with routing"
+    )
+    arg_parser.add_argument(
+        "--codebases", type=int, nargs="+", default=[1, 5, 10, 25, 50]
+    )
+    arg_parser.add_argument("--edges", type=int, default=2000)
+    arg_parser.add_argument("--dim", type=int, default=768)
+    arg_parser.add_argument("--queries", type=int, default=50)
+    asyncio.run(main_async(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import random
+from typing import List
+
+
+class SyntheticCodebaseSpec:
+    def __init__(
+        self,
+        num_files: int = 100,
+        classes_per_module: int = 3,
+        methods_per_class: int = 4,
+        nesting_depth: int = 2,
+        notebook_ratio: float = 0.05,
+        modules_per_package: int = 20,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            num_files: Number of .py and .ipynb files to generate
+            classes_per_module: Classes defined in every module
+            methods_per_class: Methods defined in every class
+            nesting_depth: Depth of nested functions inside every method
+            notebook_ratio: Fraction of the files written as notebooks
+            modules_per_package: Files per package directory
+            seed: Seed of the generator, the same spec always yields the same tree
+        """
+        self.num_files = num_files
+        self.classes_per_module = classes_per_module
+        self.methods_per_class = methods_per_class
+        self.nesting_depth = nesting_depth
+        self.notebook_ratio = notebook_ratio
+        self.modules_per_package = modules_per_package
+        self.seed = seed
+
+
+def module_path(spec: SyntheticCodebaseSpec, index: int) -> str:
+    return f"pkg{index // spec.modules_per_package}/mod{index}"
+
+
+def generate_module(
+    spec: SyntheticCodebaseSpec, index: int, rng: random.Random
+) -> str:
+    """Source of module `index`, importing and subclassing classes of earlier modules."""
+    lines = [f'"""Synthetic module {index}."""', "import os", "from typing import List"]
+    bases = []
+    for _ in range(min(index, 2)):
+        other = rng.randrange(index)
+        other_class = f"Class{other}_{rng.randrange(spec.classes_per_module)}"
+        lines.append(
+            f"from {module_path(spec, other).replace('/', '.')} import {other_class}"
+        )
+        bases.append(other_class)
+    lines.append("")
+    lines.append(f"CONSTANT_{index}: int = {index}")
+    lines.append(f"NAMES_{index} = [str(i) for i in range({index % 7 + 1})]")
+    lines.append("")
+
+    for c in range(spec.classes_per_module):
+        class_name = f"Class{index}_{c}"
+        base = f"({bases[c % len(bases)]})" if bases and c % 2 == 0 else ""
+        lines.append(f"class {class_name}{base}:")
+        lines.append(f'    """Class {c} of module {index}."""')
+        lines.append("    def __init__(self, value: int, name: str = 'x'):")
+        lines.append("        self.value = value")
+        lines.append("        self.name = name")
+        for m in range(spec.methods_per_class):
+            lines.append(
+                f"    def method_{m}(self, items: List[int], factor: float = 1.0) -> int:"
+            )
+            lines.append(f'        """Method {m}."""')
+            indent = "        "
+            for d in range(spec.nesting_depth):
+                lines.append(f"{indent}def helper_{d}(item: int) -> int:")
+                indent += "    "
+                lines.append(f"{indent}total = item * {d + 1}")
+            if spec.nesting_depth:
+                lines.append(f"{indent}return total + CONSTANT_{index}")
+            for d in reversed(range(spec.nesting_depth)):
+                indent = indent[:-4]
+                lines.append(f"{indent}result_{d} = helper_{d}(len(items))")
+                if d:
+                    lines.append(f"{indent}return result_{d}")
+            lines.append("        path = os.path.join(self.name, str(self.value))")
+            lines.append("        count = len(path) + len(items)")
+            lines.append("        return int(count * factor)")
+        lines.append("")
+
+    lines.append(f"def build_{index}(value: int) -> Class{index}_0:")
+    lines.append(f"    instance = Class{index}_0(value)")
+    if spec.methods_per_class:
+        lines.append("    instance.method_0([value])")
+    lines.append("    return instance")
+    return "\n".join(lines) + "\n"
+
+
+def to_notebook(source: str) -> dict:
+    """Split a module into notebook cells at top level definitions, with a markdown header."""
+    cells: List[dict] = [
+        {"cell_type": "markdown", "metadata": {}, "source": ["# Synthetic notebook\n"]}
+    ]
+    chunk: List[str] = []
+    for line in source.splitlines(keepends=True):
+        if chunk and (line.startswith("class ") or line.startswith("def ")):
+            cells.append(code_cell(chunk, len(cells)))
+            chunk = []
+        chunk.append(line)
+    if chunk:
+        cells.append(code_cell(chunk, len(cells)))
+    return {
+        "cells": cells,
+        "metadata": {"language_info": {"name": "python"}},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+
+
+def code_cell(lines: List[str], execution_count: int) -> dict:
+    return {
+        "cell_type": "code",
+        "execution_count": execution_count,
+        "metadata": {},
+        "outputs": [],
+        "source": lines,
+    }
+
+
+def generate_codebase(spec: SyntheticCodebaseSpec, root: str) -> List[str]:
+    """Write the synthetic codebase under `root`, returning the paths of the files written."""
+    rng = random.Random(spec.seed)
+    paths = []
+    for index in range(spec.num_files):
+        source = generate_module(spec, index, rng)
+        base_path = os.path.join(root, *module_path(spec, index).split("/"))
+        os.makedirs(os.path.dirname(base_path), exist_ok=True)
+        init_path = os.path.join(os.path.dirname(base_path), "__init__.py")
+        if not os.path.exists(init_path):
+            open(init_path, "w").close()
+
+        if rng.random() < spec.notebook_ratio:
+            path = f"{base_path}.ipynb"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(to_notebook(source), f)
+        else:
+            path = f"{base_path}.py"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(source)
+        paths.append(path)
+    return paths
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic codebase")
+    arg_parser.add_argument("root", help="Directory to write the codebase to")
+    arg_parser.add_argument("--files", type=int, default=100)
+    arg_parser.add_argument("--classes", type=int, default=3)
+    arg_parser.add_argument("--methods", type=int, default=4)
+    arg_parser.add_argument("--nesting-depth", type=int, default=2)
+    arg_parser.add_argument("--notebook-ratio", type=float, default=0.05)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    spec = SyntheticCodebaseSpec(
+        num_files=args.files,
+        classes_per_module=args.classes,
+        methods_per_class=args.methods,
+        nesting_depth=args.nesting_depth,
+        notebook_ratio=args.notebook_ratio,
+        seed=args.seed,
+    )
+    paths = generate_codebase(spec, args.root)
+    print(f"[INFO] Generated {len(paths)} files under '{args.root}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+import pytest
+
+from aristotle.graph.graph_database import GraphDatabase
+from aristotle.graph.name_index import NameIndex
+from aristotle.graph.search_cache import SearchCache
+
+
+@pytest.fixture
+def fake_graph_db():
+    """Builds a GraphDatabase around a fake graphiti, without connecting to Neo4j.
+
+    Args:
+        driver: The fake Neo4j driver of the graphiti, if graphiti is not given.
+        graphiti: The fake graphiti, e.g. one with its own search method.
+        **attributes: Attributes replacing the defaults, e.g. a smaller SearchCache.
+    """
+
+    def build(driver=None, graphiti=None, **attributes):
+        graph_db = GraphDatabase.__new__(GraphDatabase)
+        graph_db.graphiti = graphiti or SimpleNamespace(driver=driver)
+        graph_db.name_index = NameIndex()
+        graph_db.search_cache = SearchCache(max_entries=8, ttl_seconds=60)
+        graph_db.__dict__.update(attributes)
+        return graph_db
+
+    return build
@@ -10,8 +10,10 @@ from evaluate_csv import evaluate_progress_file
 
 from aristotle import project_config
 from aristotle.agent import AristotleAgent, docs_db, graph_db
+from aristotle.agent.databases import parse_cache
 from aristotle.agent.loaded_codebases import (get_loaded_codebase_status,
                                               update_loaded_codebase_status)
+from aristotle.repository_loader.file_discovery import discover_files
 from aristotle.graph.parser import CodebaseParser
 from aristotle.graph.parser.parser_settings import ParserSettings
 from aristotle.repository_loader import clone_git_repository
@@ -49,6 +51,7 @@ async def load_repository(git_url: str, commit_id: str, codebase_name: str):
             )
 
             update_loaded_codebase_status(codebase_name, "LOADING_IN_PROGRESS")
+            listing = discover_files(codebase_path)
 
             print(f"[STEP] Loading documents into vector database...")
             docs_db.load_dir(
@@ -56,12 +59,19 @@ async def load_repository(git_url: str, commit_id: str, codebase_name: str):
                 codebase_name,
                 reference_prefix=reference_prefix,
                 print_progress=False,
+                listing=listing,
             )
 
             print(f"[STEP] Parsing codebase '{codebase_name}'...")
-            parser = CodebaseParser(codebase_name, ParserSettings())
+            parser = CodebaseParser(
+                codebase_name, ParserSettings(), cache=parse_cache
+            )
             parser.parse_dir(
-                codebase_path, reference_prefix=reference_prefix, print_progress=False
+                codebase_path,
+                reference_prefix=reference_prefix,
+                print_progress=False,
+                parallel=True,
+                listing=listing,
             )
 
             print(
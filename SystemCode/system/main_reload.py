@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import os
+
+from aristotle import project_config
+from aristotle.agent.loaded_codebases import codebase_group_id
+from aristotle.graph import GraphDatabase
+from aristotle.graph.parser import CodebaseParser, ParserSettings
+from aristotle.graph.parser.codebase_parser import file_reference
+
+
+async def reload(args):
+    settings = ParserSettings(
+        profile=args.profile,
+        max_source_kb=project_config.parse_max_source_kb,
+        max_ast_nodes=project_config.parse_max_ast_nodes,
+        max_parse_seconds=project_config.parse_max_seconds,
+    )
+    parser = CodebaseParser(args.codebase_name, settings)
+    index_path = os.path.join(
+        project_config.dependency_index_dir, f"{args.codebase_name}.json"
+    )
+    if not parser.load_index(index_path):
+        print(
+            f"[WARN] No usable dependency index at '{index_path}',"
+            f" load '{args.codebase_name}' in full first"
+        )
+        return
+
+    changed = {
+        file_reference(path.replace(os.sep, "/").strip("/"), args.reference_prefix)
+        for path in args.changed_files
+    }
+    affected = parser.dependency_index.affected_files(changed)
+    print(
+        f"[INFO] {len(changed)} changed files affect {len(affected)} files:"
+        f" {sorted(affected)}"
+    )
+
+    # Changed files are written to the active version of the codebase in place
+    group_id = codebase_group_id(args.codebase_name)
+    graph_db = GraphDatabase()
+    await graph_db.setup()
+    try:
+        await graph_db.delete_references(group_id, sorted(affected))
+        await graph_db.insert_parser_results(
+            parser.iter_reparse_files(
+                args.codebase_path,
+                affected,
+                reference_prefix=args.reference_prefix,
+                max_batch_items=project_config.ingest_batch_items,
+            ),
+            group_id=group_id,
+        )
+    finally:
+        await graph_db.stop()
+    parser.save_index(index_path)
+    if parser.quarantine:
+        print(f"[INFO] Quarantined files: {parser.quarantine.summary()}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Parse changed files of a loaded codebase, and the files depending"
+        " on them, again instead of reloading the whole codebase"
+    )
+    arg_parser.add_argument("codebase_path")
+    arg_parser.add_argument("codebase_name")
+    arg_parser.add_argument(
+        "changed_files", nargs="+", help="Paths relative to the codebase root"
+    )
+    arg_parser.add_argument("--reference-prefix", default="")
+    arg_parser.add_argument("--profile", default=project_config.parser_profile)
+    asyncio.run(reload(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
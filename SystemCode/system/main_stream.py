@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import itertools
+
+from aristotle import project_config
+from aristotle.agent.loaded_codebases import codebase_group_id
+from aristotle.graph import GraphDatabase
+from aristotle.graph.parser import (CodebaseParser, ParserSettings,
+                                    read_parser_results, write_parser_results)
+
+
+def parse(args):
+    settings = ParserSettings(
+        profile=args.profile,
+        max_source_kb=project_config.parse_max_source_kb,
+        max_ast_nodes=project_config.parse_max_ast_nodes,
+        max_parse_seconds=project_config.parse_max_seconds,
+    )
+    parser = CodebaseParser(args.codebase_name, settings)
+    batches = parser.iter_parse_dir(
+        args.codebase_path,
+        reference_prefix=args.reference_prefix,
+        parallel=True,
+        max_workers=project_config.parser_max_workers,
+        max_batch_items=project_config.ingest_batch_items,
+    )
+    num_batches = write_parser_results(args.output, batches)
+    print(f"[INFO] Wrote {num_batches} batches to '{args.output}'")
+    for entry in parser.quarantine.to_list():
+        print(f"[WARN] {entry['action']} '{entry['reference']}': {entry['reason']}")
+
+
+async def insert(args):
+    batches = read_parser_results(args.input)
+    first = next(batches, None)
+    if first is None:
+        print(f"[WARN] No batches in '{args.input}'")
+        return
+    # Into the active version of the codebase, like main_reload.py
+    group_id = codebase_group_id(first.codebase_name)
+    graph_db = GraphDatabase()
+    await graph_db.setup()
+    try:
+        await graph_db.insert_parser_results(
+            itertools.chain([first], batches), group_id=group_id
+        )
+    finally:
+        await graph_db.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Parse a codebase to a file and insert that file into the graph"
+        " as separate steps, e.g. on different machines"
+    )
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    parse_command = commands.add_parser("parse", help="Parse a codebase to a file")
+    parse_command.add_argument("codebase_path")
+    parse_command.add_argument("codebase_name")
+    parse_command.add_argument("output")
+    parse_command.add_argument("--reference-prefix", default="")
+    parse_command.add_argument("--profile", default=project_config.parser_profile)
+
+    insert_command = commands.add_parser("insert", help="Insert a parsed file")
+    insert_command.add_argument("input")
+
+    args = arg_parser.parse_args()
+    if args.command == "parse":
+        parse(args)
+    else:
+        asyncio.run(insert(args))
+
+
+if __name__ == "__main__":
+    main()
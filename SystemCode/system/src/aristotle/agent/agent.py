@@ -268,7 +268,7 @@ You MUST respond with valid JSON only. Do not include any text outside the JSON
                 )
             messages.append(
                 SystemMessage(
-                    content="Loaded codebases status, do not load codebases that are already 'LOADED' or 'IN_PROGRESS':\n"
+                    content="Loaded codebases status, do not load codebases that are already 'LOADED', 'STRUCTURE_READY' (searchable by names and structure, semantic search still being completed) or 'IN_PROGRESS':\n"
                     + list_all_codebases()
                 )
             )
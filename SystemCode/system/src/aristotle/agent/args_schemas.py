@@ -1,13 +1,29 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
 
 class SearchToolArgs(BaseModel):
     query: str = Field(description="The query to search for in the codebase")
+    codebase: Optional[str] = Field(
+        default=None,
+        description="Name of the codebase to search, found from the query when omitted",
+    )
+    rerank: Optional[
+        Literal["rrf"] | Literal["cosine"] | Literal["cross_encoder"] | Literal["llm"]
+    ] = Field(
+        default=None,
+        description="How to order code search results, from fastest to most thorough:"
+        " 'rrf', 'cosine', 'cross_encoder', 'llm'. Omit for the configured default",
+    )
 
 
 class CodebaseLoaderToolArgs(BaseModel):
     repository: str = Field(
         description="URL of the git repository OR the PyPi package name"
     )
+    reload: bool = Field(
+        default=False,
+        description="Load an already loaded codebase again, e.g. for its latest"
+        " changes. It stays searchable as loaded before until the reload is done",
+    )
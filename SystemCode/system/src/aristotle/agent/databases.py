@@ -1,8 +1,12 @@
 from concurrent.futures import ThreadPoolExecutor
 from aristotle import project_config
 from ..graph import GraphDatabase
+from ..graph.parser import ParseCache
 from ..vector import DocumentationsDatabase
 
 graph_db = GraphDatabase()
 docs_db = DocumentationsDatabase()
+parse_cache = ParseCache(
+    project_config.parse_cache_dir, project_config.parse_cache_max_mb * 1024 * 1024
+)
 worker_pool = ThreadPoolExecutor(max_workers=project_config.pool_max_workers)
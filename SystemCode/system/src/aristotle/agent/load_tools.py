@@ -1,20 +1,42 @@
 import asyncio
 import json
+import os
+from concurrent.futures import Future
 from pathlib import Path
+from typing import Callable
 
 from langchain_core.tools import BaseTool
 
-from aristotle.agent.loaded_codebases import update_loaded_codebase_status
+from aristotle import project_config
 
+from ..graph import IngestPipeline
+from ..graph.group_versions import versioned_group_id
 from ..graph.parser import CodebaseParser, ParserSettings
+from ..repository_loader.file_discovery import discover_files
 from ..repository_loader.git_integration import \
     clone_git_repository as load_git_repository
 from ..repository_loader.pypi_integration import \
     clone_pypi_package as load_pypi_package
 from .args_schemas import CodebaseLoaderToolArgs
-from .databases import docs_db, graph_db, worker_pool
-from .loaded_codebases import (get_loaded_codebase_status, list_all_codebases,
-                               update_loaded_codebase_status)
+from .databases import docs_db, graph_db, parse_cache, worker_pool
+from .loaded_codebases import (abandon_codebase_version,
+                               activate_codebase_version,
+                               begin_codebase_version,
+                               get_loaded_codebase_status, is_loading,
+                               list_all_codebases, retire_interrupted_loads,
+                               retired_group_deleted, retired_groups)
+
+
+def load_refusal(codebase_name: str, reload: bool) -> str | None:
+    """Answer to the agent when the codebase should not be loaded now, None otherwise."""
+    status = get_loaded_codebase_status(codebase_name)
+    if status == "LOADING_IN_PROGRESS" or (
+        status in ("LOADED", "STRUCTURE_READY") and not reload
+    ):
+        return f"Codebase '{codebase_name}' loading status is currently {status}, there is no need to try to load it again, you can proceed knowing this information"
+    if is_loading(codebase_name):
+        return f"Codebase '{codebase_name}' is already being loaded again, searches use the loaded version until it is done"
+    return None
 
 
 def is_git_url(repository: str):
@@ -33,33 +55,209 @@ def background_task(
     codebase_path: str,
     reference_prefix: str,
     loop: asyncio.AbstractEventLoop,
+    version: int,
 ):
+    try:
+        load_codebase(codebase_name, codebase_path, reference_prefix, loop, version)
+    except Exception as e:
+        print(f"[WARN] Failed to load codebase '{codebase_name}': {e}")
+        retired = abandon_codebase_version(
+            codebase_name, version, f"{type(e).__name__}: {e}"
+        )
+        delete_retired_groups(codebase_name, retired, loop)
+
+
+def load_codebase(
+    codebase_name: str,
+    codebase_path: str,
+    reference_prefix: str,
+    loop: asyncio.AbstractEventLoop,
+    version: int,
+):
+    """
+    Load the codebase into the group of a new version, from begin_codebase_version.
+    Searches keep using the previous version until this one is activated, then the
+    previous version is deleted in the background.
+    """
+    group_id = versioned_group_id(codebase_name, version)
     print(
         f"[INFO] Attempting to parse '{codebase_path}' with reference prefix '{reference_prefix}'"
+        f" into '{group_id}'"
     )
 
-    parser_settings = ParserSettings()
-    parser = CodebaseParser(codebase_name, parser_settings)
-    parser.parse_dir(codebase_path, reference_prefix=reference_prefix)
+    # Walk the tree once, the listing is shared by the parser and the docs loader
+    listing = discover_files(codebase_path)
+    if listing.skipped:
+        print(f"[INFO] Skipped {len(listing.skipped)} large or generated files")
 
-    loaded_nodes = len(parser.get_nodes())
-    loaded_relationships = len(parser.get_relationships())
-    print(
-        f"[INFO] Successfully parsed, now inserting {loaded_nodes} nodes"
-        f" and {loaded_relationships} relationships into graph db..."
+    parser_settings = ParserSettings(
+        profile=project_config.parser_profile,
+        max_source_kb=project_config.parse_max_source_kb,
+        max_ast_nodes=project_config.parse_max_ast_nodes,
+        max_parse_seconds=project_config.parse_max_seconds,
     )
+    parser = CodebaseParser(codebase_name, parser_settings, cache=parse_cache)
+    # Batches are inserted as soon as they are parsed instead of after the whole codebase
+    batches = parser.iter_parse_dir(
+        codebase_path,
+        reference_prefix=reference_prefix,
+        parallel=True,
+        max_workers=project_config.parser_max_workers,
+        max_batch_items=project_config.ingest_batch_items,
+        listing=listing,
+    )
+
+    def load_docs() -> int:
+        return docs_db.load_dir(
+            codebase_path,
+            codebase_name,
+            reference_prefix=reference_prefix,
+            listing=listing,
+            group_id=group_id,
+        )
 
-    asyncio.run_coroutine_threadsafe(
-        graph_db.insert_parser_results(parser), loop
+    # Structure first writes the graph without embeddings and leaves the embeddings
+    # and the docs to a background backfill
+    structure_first = project_config.structure_first_load
+    # Parsing, embedding, graph writes and the docs overlap instead of running in turn
+    pipeline = IngestPipeline(
+        graph_db,
+        queue_size=project_config.ingest_queue_size,
+        embed_concurrency=project_config.ingest_embed_concurrency,
+        embed=not structure_first,
+        group_id=group_id,
+    )
+    loaded_docs = asyncio.run_coroutine_threadsafe(
+        pipeline.run(batches, docs_loader=None if structure_first else load_docs),
+        loop,
     ).result()
     print(f"[INFO] Successfully inserted all nodes to Graph DB")
+    # Lets main_reload.py parse only changed files and their dependents later
+    parser.save_index(
+        os.path.join(project_config.dependency_index_dir, f"{codebase_name}.json")
+    )
+
+    if parser.quarantine:
+        print(f"[INFO] Quarantined files: {parser.quarantine.summary()}")
+    details = {"quarantined": parser.quarantine.to_list()}
+    if not structure_first:
+        print(f"[INFO] Successfully loaded {loaded_docs} code documentation files")
+        retired = activate_codebase_version(codebase_name, version, "LOADED", details)
+        delete_retired_groups(codebase_name, retired, loop)
+        return
 
-    loaded_docs = docs_db.load_dir(
-        codebase_path, codebase_name, reference_prefix=reference_prefix
+    # A reload keeps searching the complete previous version until the backfill is done
+    reload = get_loaded_codebase_status(codebase_name) == "LOADED"
+    if not reload:
+        retired = activate_codebase_version(
+            codebase_name, version, "STRUCTURE_READY", details
+        )
+        delete_retired_groups(codebase_name, retired, loop)
+        if group_id in retired:
+            # Superseded by a later load, there is nothing left to backfill
+            return
+    run_in_background(
+        backfill_codebase(
+            codebase_name, version, parser_settings, load_docs, details, reload
+        ),
+        loop,
     )
-    print(f"[INFO] Successfully loaded {loaded_docs} code documentation files")
 
-    update_loaded_codebase_status(codebase_name, "LOADED")
+
+# Backfills and deletes still running, see run_in_background
+background_tasks: set[Future] = set()
+# Retired groups being deleted by this process
+deleting_groups: set[str] = set()
+
+
+def run_in_background(coroutine, loop: asyncio.AbstractEventLoop):
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    # The event loop only keeps a weak reference to the task
+    background_tasks.add(future)
+    future.add_done_callback(background_tasks.discard)
+
+
+async def backfill_codebase(
+    codebase_name: str,
+    version: int,
+    parser_settings: ParserSettings,
+    load_docs: Callable[[], int],
+    details: dict,
+    reload: bool,
+):
+    """
+    Load the docs and embed the graph of a codebase loaded structure first.
+
+    Args:
+        reload: Whether the version replaces a LOADED one, which searches keep using
+            until the backfill is done, rather than being searched already
+    """
+    group_id = versioned_group_id(codebase_name, version)
+    loop = asyncio.get_running_loop()
+    try:
+        loaded_docs = await asyncio.to_thread(load_docs)
+        print(f"[INFO] Successfully loaded {loaded_docs} code documentation files")
+        num_nodes, num_relationships = await graph_db.backfill_embeddings(
+            group_id, parser_settings
+        )
+        print(
+            f"[INFO] Embedded {num_nodes} nodes and {num_relationships} relationships"
+            f" of '{group_id}'"
+        )
+    except Exception as e:
+        print(f"[WARN] Failed to backfill embeddings of '{group_id}': {e}")
+        error = f"{type(e).__name__}: {e}"
+        if reload:
+            # Keep searching the complete previous version
+            retired = abandon_codebase_version(codebase_name, version, error)
+        else:
+            # The structure is still there, only semantic search is incomplete
+            retired = activate_codebase_version(
+                codebase_name,
+                version,
+                "STRUCTURE_READY",
+                {**details, "backfill_error": error},
+            )
+        delete_retired_groups(codebase_name, retired, loop)
+        return
+    retired = activate_codebase_version(codebase_name, version, "LOADED", details)
+    delete_retired_groups(codebase_name, retired, loop)
+
+
+def delete_retired_groups(
+    codebase_name: str, group_ids: list[str], loop: asyncio.AbstractEventLoop
+):
+    """Delete retired groups in the background, unless they are being deleted."""
+    for group_id in group_ids:
+        if group_id not in deleting_groups:
+            deleting_groups.add(group_id)
+            run_in_background(delete_retired_group(codebase_name, group_id), loop)
+
+
+async def delete_retired_group(codebase_name: str, group_id: str):
+    try:
+        num_nodes, num_relationships = await graph_db.delete_group(group_id)
+        num_chunks = await asyncio.to_thread(docs_db.delete_group, group_id)
+        print(
+            f"[INFO] Deleted {num_nodes} nodes, {num_relationships} relationships"
+            f" and {num_chunks} documentation chunks of retired '{group_id}'"
+        )
+        retired_group_deleted(codebase_name, group_id)
+    except Exception as e:
+        # Stays retired, resume_retired_deletes tries again on the next start
+        print(f"[WARN] Failed to delete retired '{group_id}': {e}")
+    finally:
+        deleting_groups.discard(group_id)
+
+
+def resume_retired_deletes(loop: asyncio.AbstractEventLoop):
+    """
+    Delete the groups retired before the server last stopped, and those of the loads
+    it stopped midway.
+    """
+    retire_interrupted_loads()
+    for codebase_name, group_id in retired_groups():
+        delete_retired_groups(codebase_name, [group_id], loop)
 
 
 class ListLoadedCodebases(BaseTool):
@@ -86,8 +284,12 @@ class CodebaseLoaderTool(BaseTool):
         super().__init__()
         self.args_schema = CodebaseLoaderToolArgs
 
-    def _run(self, repository: str):
+    def _run(self, repository: str, reload: bool = False):
         codebase_name = automatic_codebase_name(repository)
+        refusal = load_refusal(codebase_name, reload)
+        if refusal is not None:
+            return refusal
+
         try:
             if is_git_url(repository):
                 codebase_path, reference_prefix = load_git_repository(repository)
@@ -102,6 +304,7 @@ class CodebaseLoaderTool(BaseTool):
             codebase_path,
             reference_prefix,
             asyncio.get_event_loop(),
+            begin_codebase_version(codebase_name),
         )
         return json.dumps(
             {
@@ -111,14 +314,14 @@ class CodebaseLoaderTool(BaseTool):
             }
         )
 
-    async def _arun(self, repository: str) -> str:
+    async def _arun(self, repository: str, reload: bool = False) -> str:
         codebase_name = automatic_codebase_name(repository)
         print(
             f"[INFO] Agent attempts to load codebase: '{repository}', inferred codebase name='{codebase_name}'"
         )
-        status = get_loaded_codebase_status(codebase_name)
-        if status == "LOADED" or status == "LOADING_IN_PROGRESS":
-            return f"Codebase '{codebase_name}' loading status is currently {status}, there is no need to try to load it again, you can proceed knowing this information"
+        refusal = load_refusal(codebase_name, reload)
+        if refusal is not None:
+            return refusal
 
         try:
             if is_git_url(repository):
@@ -128,6 +331,8 @@ class CodebaseLoaderTool(BaseTool):
         except Exception as e:
             return f"ERROR: {repository} is either invalid git url or invalid PyPi package or the repository doesn't exist, maybe try again with PyPi package name"
 
+        # Set before scheduling, a structure-first load may be done within seconds
+        version = begin_codebase_version(codebase_name)
         loop = asyncio.get_running_loop()
         loop.run_in_executor(
             worker_pool,
@@ -136,8 +341,8 @@ class CodebaseLoaderTool(BaseTool):
             codebase_path,
             reference_prefix,
             asyncio.get_event_loop(),
+            version,
         )
-        update_loaded_codebase_status(codebase_name, "LOADING_IN_PROGRESS")
         print(f"[INFO] Agent scheduled to load codebase: '{repository}'")
         return json.dumps(
             {
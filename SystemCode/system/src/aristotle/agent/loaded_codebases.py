@@ -1,12 +1,27 @@
 import json
 import os
 import threading
+from typing import Optional
 
 from datasets.utils.py_utils import Literal
 
 from aristotle import project_config
 
+from ..graph.group_versions import group_version, versioned_group_id
+
 lock = threading.Lock()
+# (file identity, contents) of the file when read_file_cached last read it
+file_cache: tuple[Optional[tuple[int, int]], dict] = (None, {})
+
+SEARCHABLE_STATUSES = ("LOADED", "STRUCTURE_READY")
+# Fields of the versioned loads, kept across status updates:
+# - version: version whose group searches use, absent for codebases loaded into the
+#   group named after them before loads were versioned
+# - loading_version: version being written, searches do not see it until activated
+# - superseded: groups of versions still being written when a later load began, their
+#   load retires them when it stops writing
+# - retired: groups of replaced or abandoned versions, deleted in the background
+VERSION_FIELDS = ("version", "loading_version", "superseded", "retired")
 
 
 def create_file():
@@ -16,20 +31,88 @@ def create_file():
             f.write("{}")
 
 
+def read_file() -> dict:
+    """Contents of the file, with the lock held."""
+    create_file()
+    with open(project_config.loaded_codebases_file, "r") as f:
+        return json.load(f)
+
+
+def write_file(loaded: dict):
+    """
+    Replace the file at once, with the lock held. Readers, in this process or another,
+    see either the old or the new contents, which makes activating a version atomic.
+    """
+    path = project_config.loaded_codebases_file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(loaded, f, indent=4)
+    os.replace(temp_path, path)
+
+
+def read_file_cached() -> dict:
+    """
+    Contents of the file, read again only when it was replaced since, searches read it
+    far more often than loads change it. Do not modify the result.
+    """
+    global file_cache
+    with lock:
+        create_file()
+        stat = os.stat(project_config.loaded_codebases_file)
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if file_cache[0] != identity:
+            file_cache = (identity, read_file())
+        return file_cache[1]
+
+
+def as_dict(entry: str | dict) -> dict:
+    # Older files stored the bare status string
+    if isinstance(entry, dict):
+        return dict(entry)
+    return {"status": entry}
+
+
+def entry_status(entry: str | dict) -> str:
+    # Older files stored the bare status string
+    if isinstance(entry, dict):
+        return entry.get("status", "NOT_LOADED")
+    return entry
+
+
+def summarize_entry(entry: str | dict) -> str | dict:
+    """Entry without the per-file quarantine list, which is too long to show the agent."""
+    if not isinstance(entry, dict) or "quarantined" not in entry:
+        return entry
+    summary = {key: value for key, value in entry.items() if key != "quarantined"}
+    summary["quarantined_files"] = len(entry["quarantined"])
+    return summary
+
+
 def update_loaded_codebase_status(
     codebase_name: str,
     status: (
-        Literal["LOADING_IN_PROGRESS"] | Literal["LOADED"] | Literal["FAILED_TO_LOAD"]
+        Literal["LOADING_IN_PROGRESS"]
+        | Literal["STRUCTURE_READY"]
+        | Literal["LOADED"]
+        | Literal["FAILED_TO_LOAD"]
     ),
+    details: Optional[dict] = None,
 ):
+    """
+    STRUCTURE_READY means the graph was written without embeddings: exact-name and
+    structural lookups work while the embeddings and docs are still being backfilled.
+
+    Args:
+        details: Extra fields stored with the status, e.g. the quarantine report of
+            the files that were skipped, failed or only parsed shallow
+    """
     try:
         with lock:
-            create_file()
-            with open(project_config.loaded_codebases_file, "r") as f:
-                loaded = json.load(f)
-            loaded[codebase_name] = status
-            with open(project_config.loaded_codebases_file, "w") as f:
-                json.dump(loaded, f, indent=4)
+            loaded = read_file()
+            entry = as_dict(loaded.get(codebase_name, {}))
+            versions = {key: entry[key] for key in VERSION_FIELDS if key in entry}
+            loaded[codebase_name] = {"status": status, **(details or {}), **versions}
+            write_file(loaded)
     except Exception as e:
         print("[WARN] Failed to update loaded codebase status:", e)
 
@@ -38,17 +121,15 @@ def get_loaded_codebase_status(
     codebase_name: str,
 ) -> (
     Literal["LOADING_IN_PROGRESS"]
+    | Literal["STRUCTURE_READY"]
     | Literal["LOADED"]
     | Literal["FAILED_TO_LOAD"]
     | Literal["NOT_LOADED"]
 ):
     try:
         with lock:
-            create_file()
-            with open(project_config.loaded_codebases_file) as f:
-                loaded = json.load(f)
-                status = loaded.get(codebase_name, "NOT_LOADED")
-                return status
+            loaded = read_file()
+        return entry_status(loaded.get(codebase_name, "NOT_LOADED"))
     except Exception as e:
         print("[WARN] Failed to get loaded codebase status:", e)
         return "LOADED"
@@ -57,12 +138,238 @@ def get_loaded_codebase_status(
 def list_all_codebases() -> str:
     try:
         with lock:
-            create_file()
-            with open(project_config.loaded_codebases_file, "r") as f:
-                loaded = json.load(f)
-                return json.dumps(loaded)
+            loaded = read_file()
+        return json.dumps(
+            {name: summarize_entry(entry) for name, entry in loaded.items()}
+        )
     except Exception as e:
         print("[WARN] Failed to list loaded codebase statuses:", e)
         return (
             "Failed to get loaded codebase status, assume that all codebases are loaded"
         )
+
+
+def searchable_codebases() -> list[str]:
+    """Names of the codebases whose graph has been written."""
+    try:
+        return [
+            name
+            for name, entry in read_file_cached().items()
+            if entry_status(entry) in SEARCHABLE_STATUSES
+        ]
+    except Exception as e:
+        print("[WARN] Failed to list searchable codebases:", e)
+        return []
+
+
+def active_group_id(codebase_name: str, entry: str | dict = "NOT_LOADED") -> str:
+    """Group of the graph that searches of the codebase use."""
+    version = as_dict(entry).get("version")
+    if version is None:
+        return codebase_name
+    return versioned_group_id(codebase_name, version)
+
+
+def codebase_group_id(codebase_name: str) -> str:
+    """Active group of a codebase, e.g. for writing changed files to it in place."""
+    try:
+        entry = read_file_cached().get(codebase_name, "NOT_LOADED")
+    except Exception as e:
+        print("[WARN] Failed to get active codebase version:", e)
+        entry = "NOT_LOADED"
+    return active_group_id(codebase_name, entry)
+
+
+def search_group_ids(codebases: Optional[list[str]]) -> Optional[list[str]]:
+    """
+    Groups of the graph to search for the given codebases, or for every codebase when
+    None. Searching every group (None) is only safe when no version is being loaded or
+    deleted, otherwise the active groups are listed.
+    """
+    try:
+        loaded = read_file_cached()
+    except Exception as e:
+        print("[WARN] Failed to get active codebase versions:", e)
+        return codebases
+    if codebases is not None:
+        return [
+            active_group_id(name, loaded.get(name, "NOT_LOADED")) for name in codebases
+        ]
+    entries = {name: as_dict(entry) for name, entry in loaded.items()}
+    if not any(
+        "loading_version" in entry or entry.get("superseded") or entry.get("retired")
+        for entry in entries.values()
+    ):
+        return None
+    return [
+        active_group_id(name, entry)
+        for name, entry in entries.items()
+        if entry.get("status") in SEARCHABLE_STATUSES
+    ]
+
+
+def is_loading(codebase_name: str) -> bool:
+    """Whether a version of the codebase is being loaded."""
+    with lock:
+        loaded = read_file()
+    return "loading_version" in as_dict(loaded.get(codebase_name, {}))
+
+
+def begin_codebase_version(codebase_name: str) -> int:
+    """
+    Allocate the version a new load of the codebase writes to. Searches keep using the
+    active version, if any, until activate_codebase_version. A version that is still
+    loading is superseded, it is retired once its load stops writing to it.
+    """
+    with lock:
+        loaded = read_file()
+        entry = as_dict(loaded.get(codebase_name, {}))
+        superseded = entry.get("superseded", [])
+        retired = entry.get("retired", [])
+        versions = [entry.get("version", 0), entry.get("loading_version", 0)]
+        versions += [group_version(group_id) for group_id in superseded + retired]
+        if "loading_version" in entry:
+            superseded.append(
+                versioned_group_id(codebase_name, entry["loading_version"])
+            )
+        version = max(versions) + 1
+
+        entry["loading_version"] = version
+        entry["superseded"] = superseded
+        entry["retired"] = retired
+        if entry.get("status") not in SEARCHABLE_STATUSES:
+            entry = {key: entry[key] for key in VERSION_FIELDS if key in entry}
+            entry["status"] = "LOADING_IN_PROGRESS"
+        loaded[codebase_name] = entry
+        write_file(loaded)
+        return version
+
+
+def activate_codebase_version(
+    codebase_name: str,
+    version: int,
+    status: Literal["STRUCTURE_READY"] | Literal["LOADED"],
+    details: Optional[dict] = None,
+) -> list[str]:
+    """
+    Switch searches of the codebase to a loaded version, or update the status of the
+    active version. The group searched before is retired.
+
+    Returns:
+        Retired groups of the codebase, to be deleted with delete_retired_group
+    """
+    with lock:
+        loaded = read_file()
+        entry = as_dict(loaded.get(codebase_name, {}))
+        retired = entry.get("retired", [])
+        if entry.get("loading_version") == version:
+            # Also retires the unversioned group, which failed loads may have written
+            retired.append(active_group_id(codebase_name, entry))
+            del entry["loading_version"]
+        elif entry.get("version") != version:
+            # Superseded by a later load, nothing writes to it any more
+            print(f"[WARN] Version {version} of '{codebase_name}' is no longer loading")
+            if retire_superseded(codebase_name, entry, version):
+                loaded[codebase_name] = entry
+                write_file(loaded)
+            return entry.get("retired", [])
+        entry = {key: entry[key] for key in VERSION_FIELDS if key in entry}
+        loaded[codebase_name] = {
+            "status": status,
+            **(details or {}),
+            **entry,
+            "version": version,
+            "retired": retired,
+        }
+        write_file(loaded)
+        return retired
+
+
+def abandon_codebase_version(codebase_name: str, version: int, error: str) -> list[str]:
+    """
+    Retire a version that failed to load. Searches keep using the active version if
+    there is one, the codebase failed to load otherwise.
+
+    Returns:
+        Retired groups of the codebase, to be deleted with delete_retired_group
+    """
+    with lock:
+        loaded = read_file()
+        entry = as_dict(loaded.get(codebase_name, {}))
+        retired = entry.get("retired", [])
+        if entry.get("loading_version") == version:
+            retired.append(versioned_group_id(codebase_name, version))
+            del entry["loading_version"]
+        elif retire_superseded(codebase_name, entry, version):
+            # The later load that superseded it decides the status
+            loaded[codebase_name] = entry
+            write_file(loaded)
+            return entry["retired"]
+        entry["retired"] = retired
+        if entry.get("status") in SEARCHABLE_STATUSES:
+            entry["reload_error"] = error
+        else:
+            entry = {key: entry[key] for key in VERSION_FIELDS if key in entry}
+            entry.update(status="FAILED_TO_LOAD", error=error)
+        loaded[codebase_name] = entry
+        write_file(loaded)
+        return retired
+
+
+def retire_superseded(codebase_name: str, entry: dict, version: int) -> bool:
+    """Retire a superseded version of the entry, whose load stopped writing to it."""
+    group_id = versioned_group_id(codebase_name, version)
+    if group_id not in entry.get("superseded", []):
+        return False
+    entry["superseded"].remove(group_id)
+    entry.setdefault("retired", []).append(group_id)
+    return True
+
+
+def retire_interrupted_loads():
+    """
+    Retire the versions whose load stopped midway, e.g. when the server stopped, to
+    be run before this process starts loading. Codebases that were not searchable
+    yet failed to load.
+    """
+    with lock:
+        loaded = read_file()
+        changed = False
+        for codebase_name, entry in loaded.items():
+            entry = as_dict(entry)
+            interrupted = entry.pop("superseded", [])
+            if "loading_version" in entry:
+                version = entry.pop("loading_version")
+                interrupted.append(versioned_group_id(codebase_name, version))
+            if not interrupted:
+                continue
+            print(f"[INFO] Retiring interrupted loads {interrupted}")
+            entry["retired"] = entry.get("retired", []) + interrupted
+            if entry.get("status") not in SEARCHABLE_STATUSES:
+                entry = {key: entry[key] for key in VERSION_FIELDS if key in entry}
+                entry.update(status="FAILED_TO_LOAD", error="Loading was interrupted")
+            loaded[codebase_name] = entry
+            changed = True
+        if changed:
+            write_file(loaded)
+
+
+def retired_group_deleted(codebase_name: str, group_id: str):
+    with lock:
+        loaded = read_file()
+        entry = as_dict(loaded.get(codebase_name, {}))
+        if group_id in entry.get("retired", []):
+            entry["retired"].remove(group_id)
+            loaded[codebase_name] = entry
+            write_file(loaded)
+
+
+def retired_groups() -> list[tuple[str, str]]:
+    """(codebase, group) of every retired group, e.g. to resume deleting them."""
+    with lock:
+        loaded = read_file()
+    return [
+        (name, group_id)
+        for name, entry in loaded.items()
+        for group_id in as_dict(entry).get("retired", [])
+    ]
@@ -1,42 +1,91 @@
 import json
+from typing import Any, Dict, List, Optional
 
+from graphiti_core.edges import EntityEdge
 from langchain_core.tools import BaseTool
 from langgraph.pregel.main import asyncio
 
 from aristotle import project_config
+from aristotle.kbs.codebase_router import merge_routed, route_codebases
 from aristotle.kbs.query_filter import (combine_filter_search_information,
                                         filter_docs_search,
                                         filter_graph_search)
 
 from .args_schemas import SearchToolArgs
 from .databases import docs_db, graph_db
+from .loaded_codebases import search_group_ids, searchable_codebases
+
+
+def codebases_of(query: str, codebase: Optional[str] = None) -> Optional[List[str]]:
+    """Codebases the search is about, None when it names none of them."""
+    codebases = route_codebases(query, searchable_codebases(), codebase)
+    if not codebases:
+        return None
+    print(f"[INFO] Search routed to codebases: {codebases}")
+    return codebases
+
+
+async def search_graph(
+    query: str, codebase: Optional[str], rerank: Optional[str]
+) -> List[EntityEdge]:
+    """
+    Graph search scoped to the given codebase, or with the results of the codebases
+    the query names on top of the search of every codebase.
+    """
+    codebases = codebases_of(query, codebase)
+    results = await graph_db.search(
+        query, group_ids=search_group_ids(codebases), rerank=rerank
+    )
+    if codebases is None or codebase:
+        return results
+    unscoped = await graph_db.search(
+        query, group_ids=search_group_ids(None), rerank=rerank
+    )
+    return merge_routed(results, unscoped, lambda edge: edge.uuid)
+
+
+def search_docs(query: str, codebase: Optional[str]) -> List[Dict[str, Any]]:
+    """Docs search scoped like search_graph."""
+    codebases = codebases_of(query, codebase)
+    results = docs_db.search(query, group_ids=search_group_ids(codebases))
+    if codebases is None or codebase:
+        return results
+    return merge_routed(
+        results,
+        docs_db.search(query, group_ids=search_group_ids(None)),
+        lambda chunk: (chunk.get("codebase"), chunk.get("text")),
+    )
 
 
 class CombinedSearchTool(BaseTool):
     name: str = "search"
     description: str = (
         "Search for entities, relationships, and code documentations in the codebase."
-        "Provide a 'query' describing what to find in detail along with the codebase name."
+        "Provide a 'query' describing what to find in detail along with the 'codebase' name."
     )
 
     def __init__(self) -> None:
         super().__init__()
         self.args_schema = SearchToolArgs
 
-    async def _run(self, query: str) -> str:
+    async def _run(
+        self, query: str, codebase: Optional[str] = None, rerank: Optional[str] = None
+    ) -> str:
         print(f"[WARN] Agent combined searched (sync run): '{query}'")
         try:
             loop = asyncio.get_running_loop()
-            return loop.create_task(self._arun(query)).result()
+            return loop.create_task(self._arun(query, codebase, rerank)).result()
         except Exception as e:
             print("[ERROR]:", e)
             return f"Error: {str(e)}"
 
-    async def _arun(self, query: str) -> str:
+    async def _arun(
+        self, query: str, codebase: Optional[str] = None, rerank: Optional[str] = None
+    ) -> str:
         print(f"[INFO] Agent combined searched (async run): '{query}'")
         try:
-            graph_information = await graph_db.search(query)
-            docs_information = docs_db.search(query)
+            graph_information = await search_graph(query, codebase, rerank)
+            docs_information = search_docs(query, codebase)
             combined_result = json.dumps(
                 combine_filter_search_information(graph_information, docs_information)
             )
@@ -55,26 +104,30 @@ class GraphSearchTool(BaseTool):
     name: str = "search_code"
     description: str = (
         "Search for entities and relationships of source code in the codebase."
-        "Provide a 'query' describing what to find in detail along with the codebase name."
+        "Provide a 'query' describing what to find in detail along with the 'codebase' name."
     )
 
     def __init__(self) -> None:
         super().__init__()
         self.args_schema = SearchToolArgs
 
-    async def _run(self, query: str) -> str:
+    async def _run(
+        self, query: str, codebase: Optional[str] = None, rerank: Optional[str] = None
+    ) -> str:
         print(f"[WARN] Agent graph only searched (sync run): '{query}'")
         try:
             loop = asyncio.get_running_loop()
-            return loop.create_task(self._arun(query)).result()
+            return loop.create_task(self._arun(query, codebase, rerank)).result()
         except Exception as e:
             print("[ERROR]:", e)
             return f"Error: {str(e)}"
 
-    async def _arun(self, query: str) -> str:
+    async def _arun(
+        self, query: str, codebase: Optional[str] = None, rerank: Optional[str] = None
+    ) -> str:
         print(f"[INFO] Agent graph only searched (async run): '{query}'")
         try:
-            graph_information = await graph_db.search(query)
+            graph_information = await search_graph(query, codebase, rerank)
             print("[INFO] Graph search result:", graph_information)
             return json.dumps(filter_graph_search(graph_information))
         except Exception as e:
@@ -86,17 +139,20 @@ class DocumentationsSearchTool(BaseTool):
     name: str = "search_docs"
     description: str = (
         "Search for code documentation chunks in the codebase."
-        "Provide a 'query' describing what to find in detail along with the codebase name."
+        "Provide a 'query' describing what to find in detail along with the 'codebase' name."
     )
 
     def __init__(self) -> None:
         super().__init__()
         self.args_schema = SearchToolArgs
 
-    def _run(self, query: str) -> str:
+    def _run(
+        self, query: str, codebase: Optional[str] = None, rerank: Optional[str] = None
+    ) -> str:
+        # Docs are ranked by the faiss inner product, rerank only applies to code
         print(f"[INFO] Agent docs only searched: '{query}'")
         try:
-            docs_information = docs_db.search(query)
+            docs_information = search_docs(query, codebase)
             print("[INFO] Docs search result:", docs_information)
             return json.dumps(filter_docs_search(docs_information))
         except Exception as e:
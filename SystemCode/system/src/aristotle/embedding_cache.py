@@ -0,0 +1,185 @@
+import contextlib
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from typing import List, Optional, Sequence
+
+from . import project_config
+
+# SQLite limits the number of parameters of a statement
+QUERY_CHUNK_SIZE = 500
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embeddings in SQLite, keyed by (model name, dimension, sha256
+    of the text), so a string is only embedded once however many codebases or reloads
+    it appears in.
+
+    Vectors are stored as float32. The cache is bounded by `max_bytes` of vector data
+    and evicts the least recently used entries first. It is shared by the graph
+    ingestion and the documentation encoder, and safe to use from several threads.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (model, dim, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        # Logical clock of the last use, higher is more recent
+        self.clock, self.entries, self.total_bytes = self.connection.execute(
+            "SELECT COALESCE(MAX(last_used), 0), COUNT(*),"
+            " COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # The connection is in autocommit mode, group the statements of a call
+        self.connection.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def get_many(
+        self, model: str, dim: int, texts: Sequence[str]
+    ) -> List[Optional[List[float]]]:
+        """Cached embeddings of `texts`, None for the ones not in the cache."""
+        hashes = [text_hash(text) for text in texts]
+        found: dict[bytes, List[float]] = {}
+        with self.lock:
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), QUERY_CHUNK_SIZE):
+                chunk = unique[start : start + QUERY_CHUNK_SIZE]
+                rows = self.connection.execute(
+                    "SELECT text_hash, vector FROM embeddings"
+                    " WHERE model = ? AND dim = ?"
+                    f" AND text_hash IN ({', '.join('?' * len(chunk))})",
+                    (model, dim, *chunk),
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = array("f", vector).tolist()
+
+            if found:
+                self.clock += 1
+                with self.transaction():
+                    self.connection.executemany(
+                        "UPDATE embeddings SET last_used = ?"
+                        " WHERE model = ? AND dim = ? AND text_hash = ?",
+                        [(self.clock, model, dim, key) for key in found],
+                    )
+            results = [found.get(key) for key in hashes]
+            hits = sum(1 for result in results if result is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(
+        self,
+        model: str,
+        dim: int,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+    ):
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            # A model returning another dimension than asked for would poison the key
+            if len(embedding) != dim:
+                continue
+            rows.append((model, dim, text_hash(text), array("f", embedding).tobytes()))
+        if not rows:
+            return
+
+        with self.lock:
+            self.clock += 1
+            changes = self.connection.total_changes
+            with self.transaction():
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO embeddings"
+                    " (model, dim, text_hash, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                    [(*row, self.clock) for row in rows],
+                )
+            inserted = self.connection.total_changes - changes
+            self.entries += inserted
+            self.total_bytes += inserted * dim * array("f").itemsize
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in `max_bytes`, caller holds the lock."""
+        # Other processes may have written to the same file, so start from its actual size
+        self.entries, self.total_bytes = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        while self.total_bytes > self.max_bytes and self.entries:
+            rows = self.connection.execute(
+                "SELECT model, dim, text_hash, LENGTH(vector) FROM embeddings"
+                " ORDER BY last_used LIMIT ?",
+                (QUERY_CHUNK_SIZE,),
+            ).fetchall()
+            evicted = []
+            for model, dim, key, size in rows:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                evicted.append((model, dim, key))
+                self.total_bytes -= size
+            with self.transaction():
+                self.connection.executemany(
+                    "DELETE FROM embeddings"
+                    " WHERE model = ? AND dim = ? AND text_hash = ?",
+                    evicted,
+                )
+            self.entries -= len(evicted)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": self.entries,
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@functools.cache
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """The cache shared by every embedder of the process, None if it is disabled."""
+    if project_config.embedding_cache_max_mb <= 0:
+        return None
+    return EmbeddingCache(
+        project_config.embedding_cache_file,
+        project_config.embedding_cache_max_mb * 1024 * 1024,
+    )
@@ -1 +1,2 @@
 from .graph_database import GraphDatabase
+from .ingest_pipeline import IngestPipeline
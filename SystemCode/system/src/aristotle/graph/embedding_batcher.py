@@ -0,0 +1,162 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from graphiti_core.embedder.client import EmbedderClient
+
+from ..embedding_cache import EmbeddingCache
+
+
+class EmbeddingBatcher:
+    """
+    Embeds many texts through the embedder's batch API with a bounded number of
+    requests in flight.
+
+    Texts are sorted by length so every request carries texts of similar length, which
+    keeps the padding the server adds to the shorter ones small. The batch size adapts
+    to the server (additive increase while requests finish within `target_latency`,
+    halved when they are slower or fail) and failed requests are retried in smaller
+    halves after an exponential backoff. With a cache, only the texts it misses are
+    sent to the embedder.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbedderClient,
+        batch_size: int = 32,
+        max_batch_size: int = 256,
+        max_concurrency: int = 4,
+        target_latency: float = 2.0,
+        max_retries: int = 5,
+        retry_delay: float = 1.0,
+        cache: Optional[EmbeddingCache] = None,
+        model: str = "",
+        dim: int = 0,
+    ):
+        """
+        Args:
+            embedder: Embedder whose create_batch is called
+            batch_size: Texts per request to start with
+            max_batch_size: Upper bound of the adapted batch size
+            max_concurrency: Requests in flight at once, shared by concurrent embed calls
+            target_latency: Seconds a request may take before the batch size shrinks
+            max_retries: Failed attempts of a single text before giving up
+            retry_delay: Seconds to wait after the first failure, doubled every retry
+            cache: Embedding cache consulted before the embedder
+            model: Embedding model name, part of the cache key
+            dim: Embedding dimension, part of the cache key
+        """
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.cache = cache
+        self.model = model
+        self.dim = dim
+        self.increase = max(1, batch_size // 4)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.requests = 0
+        self.embedded = 0
+        self.errors = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings of `texts`, in the same order."""
+        if self.cache is None:
+            return await self.embed_uncached(texts)
+
+        # SQLite calls block, keep them off the event loop
+        results = await asyncio.to_thread(
+            self.cache.get_many, self.model, self.dim, texts
+        )
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            embeddings = await self.embed_uncached(missing_texts)
+            await asyncio.to_thread(
+                self.cache.put_many, self.model, self.dim, missing_texts, embeddings
+            )
+            for i, embedding in zip(missing, embeddings):
+                results[i] = embedding
+        return results  # type: ignore
+
+    async def embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        next_position = 0
+        # (indices, failed attempts) of chunks to try again, taken before new ones
+        retries: List[tuple[List[int], int]] = []
+
+        def take() -> Optional[tuple[List[int], int]]:
+            nonlocal next_position
+            if retries:
+                return retries.pop()
+            if next_position >= len(order):
+                return None
+            chunk = order[next_position : next_position + self.batch_size]
+            next_position += len(chunk)
+            return chunk, 0
+
+        async def worker():
+            while (taken := take()) is not None:
+                chunk, attempts = taken
+                embeddings = await self.request([texts[i] for i in chunk])
+                if embeddings is not None:
+                    for i, embedding in zip(chunk, embeddings):
+                        results[i] = embedding
+                    continue
+
+                attempts += 1
+                if attempts > self.max_retries:
+                    raise RuntimeError(
+                        f"Embedding {len(chunk)} texts failed {attempts} times"
+                    )
+                await asyncio.sleep(self.retry_delay * 2 ** (attempts - 1))
+                if len(chunk) > 1:
+                    middle = len(chunk) // 2
+                    retries.append((chunk[middle:], attempts))
+                    retries.append((chunk[:middle], attempts))
+                else:
+                    retries.append((chunk, attempts))
+
+        num_workers = min(self.max_concurrency, -(-len(texts) // self.batch_size))
+        # A task group cancels the other workers once one of them gives up
+        try:
+            async with asyncio.TaskGroup() as group:
+                for _ in range(num_workers):
+                    group.create_task(worker())
+        except ExceptionGroup as e:
+            raise e.exceptions[0]
+        return results  # type: ignore
+
+    async def request(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """One create_batch call, None if it failed."""
+        async with self.semaphore:
+            start = time.monotonic()
+            try:
+                embeddings = await self.embedder.create_batch(texts)
+                if len(embeddings) != len(texts):
+                    raise ValueError(
+                        f"Got {len(embeddings)} embeddings for {len(texts)} texts"
+                    )
+            except Exception as e:
+                self.errors += 1
+                self.batch_size = max(1, self.batch_size // 2)
+                print(
+                    f"[WARN] Embedding {len(texts)} texts failed, batch size is now"
+                    f" {self.batch_size}: {e}"
+                )
+                return None
+            latency = time.monotonic() - start
+
+        self.requests += 1
+        self.embedded += len(texts)
+        if latency > self.target_latency:
+            self.batch_size = max(1, self.batch_size // 2)
+        elif len(texts) >= self.batch_size:
+            # Only grow when the server kept up with a full batch
+            self.batch_size = min(self.max_batch_size, self.batch_size + self.increase)
+        return embeddings
@@ -1,5 +1,8 @@
+import asyncio
+from collections.abc import AsyncIterable, Iterable
 from datetime import datetime
-from typing import Any, Dict, List, Optional, cast
+from typing import Dict, List, Optional, cast
+from uuid import NAMESPACE_URL, uuid5
 
 from graphiti_core import Graphiti
 from graphiti_core.cross_encoder.openai_reranker_client import \
@@ -8,17 +11,313 @@ from graphiti_core.edges import EntityEdge
 from graphiti_core.embedder.openai import OpenAIEmbedder, OpenAIEmbedderConfig
 from graphiti_core.llm_client.config import LLMConfig
 from graphiti_core.llm_client.openai_generic_client import OpenAIGenericClient
-from graphiti_core.nodes import EntityNode
+from graphiti_core.search.search import search
+from graphiti_core.search.search_config_recipes import (
+    EDGE_HYBRID_SEARCH_CROSS_ENCODER, EDGE_HYBRID_SEARCH_RRF)
+from graphiti_core.search.search_filters import SearchFilters
+from graphiti_core.utils.datetime_utils import utc_now
 
-from aristotle.graph.parser import CodebaseParser
+from aristotle.graph.parser import (CodebaseParser, Node, ParseBatch,
+                                    ParserSettings, Relationship)
 from aristotle.kbs import filter_graph_search
 
 from .. import project_config
+from ..embedding_cache import get_embedding_cache
+from .embedding_batcher import EmbeddingBatcher
+from .group_versions import group_node_uuid, node_name
+from .name_index import NameIndex, query_symbols
+from .rerankers import (RERANK_STRATEGIES, LocalCrossEncoder, cosine_scores,
+                        rank_by_scores)
+from .search_cache import SearchCache
 from .parser.fact_builder import build_fact
 
+# Bulk versions of EntityNode.save and EntityEdge.save, MERGE on uuid makes them
+# idempotent. Nodes and edges that are not embedded skip the vector property call.
+ENTITY_NODES_SAVE_BULK = """
+    UNWIND $nodes AS node
+    MERGE (n:Entity {uuid: node.uuid})
+    SET n = node
+    WITH n, node
+    WHERE node.name_embedding IS NOT NULL
+    CALL db.create.setNodeVectorProperty(n, "name_embedding", node.name_embedding)
+"""
+ENTITY_EDGES_SAVE_BULK = """
+    UNWIND $edges AS edge
+    MATCH (source:Entity {uuid: edge.source_uuid})
+    MATCH (target:Entity {uuid: edge.target_uuid})
+    MERGE (source)-[e:RELATES_TO {uuid: edge.uuid}]->(target)
+    SET e = edge
+    WITH e, edge
+    WHERE edge.fact_embedding IS NOT NULL
+    CALL db.create.setRelationshipVectorProperty(e, "fact_embedding", edge.fact_embedding)
+"""
+
+# Nodes and edges written without embeddings by a structure-first load, and the
+# backfill of their embeddings. A null $relations embeds every relationship name.
+# Nodes embed their qualified name like PreparedBatch.texts, taken from the uuid.
+NODES_WITHOUT_EMBEDDING = """
+    MATCH (n:Entity {group_id: $group_id})
+    WHERE n.name_embedding IS NULL
+    RETURN n.uuid AS uuid
+    LIMIT $limit
+"""
+EDGES_WITHOUT_EMBEDDING = """
+    MATCH (:Entity)-[e:RELATES_TO {group_id: $group_id}]->(:Entity)
+    WHERE e.fact_embedding IS NULL AND ($relations IS NULL OR e.name IN $relations)
+    RETURN e.uuid AS uuid, e.fact AS text
+    LIMIT $limit
+"""
+NODE_EMBEDDINGS_SAVE_BULK = """
+    UNWIND $records AS record
+    MATCH (n:Entity {uuid: record.uuid})
+    CALL db.create.setNodeVectorProperty(n, "name_embedding", record.embedding)
+"""
+EDGE_EMBEDDINGS_SAVE_BULK = """
+    UNWIND $records AS record
+    MATCH (:Entity)-[e:RELATES_TO {uuid: record.uuid}]->(:Entity)
+    CALL db.create.setRelationshipVectorProperty(e, "fact_embedding", record.embedding)
+"""
+
+# Stored fact embeddings of search candidates, for the cosine reranking
+EDGE_FACT_EMBEDDINGS = """
+    MATCH (:Entity)-[e:RELATES_TO]->(:Entity)
+    WHERE e.uuid IN $uuids
+    RETURN e.uuid AS uuid, e.fact_embedding AS embedding
+"""
+
+# Node uuids the NameIndex is loaded from
+GROUP_NODE_UUIDS = """
+    MATCH (n:Entity {group_id: $group_id})
+    RETURN n.uuid AS uuid
+"""
+ALL_NODE_UUIDS = """
+    MATCH (n:Entity)
+    RETURN n.group_id AS group_id, n.uuid AS uuid
+"""
+
+# Everything a set of files put in the graph, relationships first so nodes that are
+# still referenced from other files only lose the edges of the deleted files
+DELETE_REFERENCE_EDGES = """
+    MATCH (:Entity)-[e:RELATES_TO {group_id: $group_id}]->(:Entity)
+    WHERE e.reference IN $references
+    DELETE e
+"""
+DELETE_REFERENCE_NODES = """
+    MATCH (n:Entity {group_id: $group_id})
+    WHERE n.reference IN $references
+    DETACH DELETE n
+"""
+# Placeholders of names defined elsewhere, e.g. base classes, that only the deleted
+# files pointed to
+DELETE_UNREFERENCED_PLACEHOLDERS = """
+    MATCH (n:Entity {group_id: $group_id})
+    WHERE n.reference IS NULL AND NOT (n)--()
+    DELETE n
+"""
+
+# One batch of the delete of a whole group, see GraphDatabase.delete_group
+DELETE_GROUP_EDGES = """
+    MATCH (:Entity)-[e:RELATES_TO {group_id: $group_id}]->(:Entity)
+    WITH e LIMIT $limit
+    DELETE e
+    RETURN count(*) AS deleted
+"""
+DELETE_GROUP_NODES = """
+    MATCH (n:Entity {group_id: $group_id})
+    WITH n LIMIT $limit
+    DETACH DELETE n
+    RETURN count(*) AS deleted
+"""
+
+
+def node_record(
+    group_id: str, node: Node, name_embedding: Optional[List[float]]
+) -> dict:
+    """Properties EntityNode.save would store for the node."""
+    return {
+        "uuid": group_node_uuid(group_id, node.uuid),
+        "name": node.uuid,
+        "name_embedding": name_embedding,
+        "group_id": group_id,
+        "summary": "",
+        "created_at": utc_now(),
+        "kind": node.kind,
+        **(node.attributes or {}),
+    }
+
+
+def edge_record(
+    group_id: str,
+    relationship: Relationship,
+    fact: str,
+    fact_embedding: Optional[List[float]],
+    attributes: Dict[str, Optional[str]],
+) -> dict:
+    """
+    Properties EntityEdge.save would store for the relationship. The uuid is derived
+    from the relationship, so writing the same group twice updates its edges instead of
+    duplicating them.
+    """
+    now = datetime.now()
+    return {
+        "uuid": str(
+            uuid5(
+                NAMESPACE_URL,
+                f"{group_id}/{relationship.source}/{relationship.relationship}"
+                f"/{relationship.target}",
+            )
+        ),
+        "source_uuid": group_node_uuid(group_id, relationship.source),
+        "target_uuid": group_node_uuid(group_id, relationship.target),
+        "name": relationship.relationship,
+        "group_id": group_id,
+        "fact": fact,
+        "fact_embedding": fact_embedding,
+        "episodes": [],
+        "created_at": now,
+        "expired_at": None,
+        "valid_at": now,
+        "invalid_at": None,
+        **attributes,
+    }
+
+
+# Kinds of nodes that carry a docstring, see late_docstrings_batch
+DOCUMENTED_KINDS = ("MODULE", "CLASS", "FUNCTION", "METHOD")
+
+
+class PreparedBatch:
+    """
+    Facts of a batch's relationships, enriched with the docstrings of the nodes seen so
+    far, and the texts to embed for it. Batches are prepared in parse order, so the
+    facts do not depend on how the later stages interleave.
+    """
+
+    def __init__(
+        self,
+        batch: CodebaseParser | ParseBatch,
+        docstrings: dict[str, str],
+        group_id: Optional[str] = None,
+        held_back: Optional[List[Relationship]] = None,
+    ):
+        """
+        Args:
+            group_id: Group the records are written to, the codebase name when None
+            held_back: Relationships with an endpoint that may still get a docstring
+                from a later batch are added to it, see late_docstrings_batch
+        """
+        self.group_id = group_id or batch.codebase_name
+        self.nodes = batch.get_nodes()
+        self.relationships = batch.get_relationships()
+        for node in self.nodes:
+            docstring = (node.attributes or {}).get("docstring")
+            if isinstance(docstring, str):
+                docstrings[node.uuid] = docstring
+
+        self.facts: List[str] = []
+        self.edge_attributes: List[Dict[str, Optional[str]]] = []
+        for relationship in self.relationships:
+            source = relationship.source
+            target = relationship.target
+            enriched_attrs = cast(
+                Dict[str, Optional[str]], dict(relationship.attributes or {})
+            )
+            if target in docstrings:
+                enriched_attrs["target_docstring"] = docstrings[target]
+            if source in docstrings:
+                enriched_attrs["source_docstring"] = docstrings[source]
+            if held_back is not None and any(
+                uuid not in docstrings
+                and enriched_attrs.get(f"{end}_kind") in DOCUMENTED_KINDS
+                for end, uuid in (("source", source), ("target", target))
+            ):
+                held_back.append(relationship)
+            self.facts.append(
+                build_fact(source, relationship.relationship, target, enriched_attrs)
+            )
+            self.edge_attributes.append(enriched_attrs)
+
+        # Edges the parser profile does not embed are still found by fulltext search
+        self.embedded_facts = [
+            i
+            for i, relationship in enumerate(self.relationships)
+            if batch.settings.should_embed(relationship.relationship)
+        ]
+
+    def texts(self) -> List[str]:
+        """Node names, then the embedded facts."""
+        return [node.uuid for node in self.nodes] + [
+            self.facts[i] for i in self.embedded_facts
+        ]
+
+    def records(
+        self, embeddings: Optional[List[List[float]]]
+    ) -> tuple[List[dict], List[dict]]:
+        """Node and relationship records, without any embeddings if `embeddings` is None."""
+        fact_embeddings: List[Optional[List[float]]] = [None] * len(self.facts)
+        name_embeddings: List[Optional[List[float]]] = [None] * len(self.nodes)
+        if embeddings is not None:
+            name_embeddings = list(embeddings[: len(self.nodes)])
+            for i, embedding in zip(self.embedded_facts, embeddings[len(self.nodes) :]):
+                fact_embeddings[i] = embedding
+
+        node_records = [
+            node_record(self.group_id, node, embedding)
+            for node, embedding in zip(self.nodes, name_embeddings)
+        ]
+        edge_records = [
+            edge_record(self.group_id, relationship, fact, embedding, attrs)
+            for relationship, fact, embedding, attrs in zip(
+                self.relationships, self.facts, fact_embeddings, self.edge_attributes
+            )
+        ]
+        return node_records, edge_records
+
+    def __len__(self) -> int:
+        return len(self.nodes) + len(self.relationships)
+
+
+def late_docstrings_batch(
+    batch: CodebaseParser | ParseBatch,
+    held_back: List[Relationship],
+    docstrings: dict[str, str],
+) -> Optional[ParseBatch]:
+    """
+    The held back relationships whose endpoints got a docstring from a later batch,
+    e.g. a node merged with its definition in a later file, to be prepared and
+    written again once every batch is in. Their facts then match what parsing the
+    whole codebase at once gives, whatever the batch size. The edge uuids do not
+    change, so writing them again updates the edges.
+
+    Args:
+        batch: Any batch of the codebase, for its name and parser settings
+    """
+    relationships = [
+        relationship
+        for relationship in held_back
+        if relationship.source in docstrings or relationship.target in docstrings
+    ]
+    if not relationships:
+        return None
+    return ParseBatch(batch.codebase_name, [], relationships, batch.settings)
+
+
+async def run_write(tx, query: str, **params):
+    result = await tx.run(query, **params)
+    await result.consume()
+
 
 class GraphDatabase:
     def __init__(self):
+        self.write_batch_size = project_config.graph_write_batch_size
+        self.name_index = NameIndex(
+            project_config.exact_match_max_nodes, project_config.name_index_ttl_seconds
+        )
+        self.search_cache = SearchCache(
+            project_config.search_cache_max_entries,
+            project_config.search_cache_ttl_seconds,
+        )
+        self.cross_encoder = LocalCrossEncoder(project_config.local_cross_encoder_model)
         self.llm_config = LLMConfig(
             api_key="ollama",
             model=project_config.ollama_llm_main_model,
@@ -35,7 +334,7 @@ class GraphDatabase:
                 config=OpenAIEmbedderConfig(
                     api_key="ollama",
                     embedding_model=project_config.ollama_embedding_model,
-                    embedding_dim=768,
+                    embedding_dim=project_config.embedding_dim,
                     base_url=project_config.graphiti_ollama_base_url,
                 )
             ),
@@ -43,6 +342,16 @@ class GraphDatabase:
                 client=self.llm_client, config=self.llm_config  # type: ignore
             ),
         )
+        self.embedding_batcher = EmbeddingBatcher(
+            self.graphiti.embedder,
+            batch_size=project_config.embedding_batch_size,
+            max_batch_size=project_config.embedding_max_batch_size,
+            max_concurrency=project_config.embedding_concurrency,
+            target_latency=project_config.embedding_target_latency,
+            cache=get_embedding_cache(),
+            model=project_config.ollama_embedding_model,
+            dim=project_config.embedding_dim,
+        )
 
     async def setup(self):
         await self.graphiti.build_indices_and_constraints()
@@ -53,72 +362,396 @@ class GraphDatabase:
         except Exception:
             pass
 
-    async def insert_parser_results(self, parser: CodebaseParser, print_progress=False):
-        node_map: dict[str, EntityNode] = {}
-
-        nodes = parser.get_nodes()
-        num_nodes = len(nodes)
-        print(f"[INFO] Inserting {num_nodes} nodes into graph db...")
-        for i, node in enumerate(nodes):
-            enode = EntityNode(
-                uuid=node.uuid,
-                name=node.uuid,
-                group_id=parser.codebase_name,
-                attributes={"kind": node.kind, **(node.attributes or {})},
-            )
-            enode.name_embedding = await self.graphiti.embedder.create(node.uuid)
-            await enode.save(self.graphiti.driver)
-            node_map[node.uuid] = enode
-            if print_progress:
-                print(f"Node inserted [{i+1} / {num_nodes}]: {node}")
-
-        relationships = parser.get_relationships()
-        num_relationships = len(relationships)
-        print(f"[INFO] Inserting {num_relationships} relationships into graph db...")
-        for i, relationship in enumerate(relationships):
-            source = relationship.source
-            relation = relationship.relationship
-            target = relationship.target
-            attrs = relationship.attributes
-            now = datetime.now()
-
-            target_node = node_map.get(target)
-            source_node = node_map.get(source)
-            enriched_attrs = cast(Dict[str, Optional[str]], dict(attrs or {}))
-
-            if target_node and isinstance(target_node.attributes, dict):
-                docstring = target_node.attributes.get("docstring")
-                if isinstance(docstring, str):
-                    enriched_attrs["target_docstring"] = docstring
-
-            if source_node and isinstance(source_node.attributes, dict):
-                docstring = source_node.attributes.get("docstring")
-                if isinstance(docstring, str):
-                    enriched_attrs["source_docstring"] = docstring
-
-            fact = build_fact(source, relation, target, enriched_attrs)
-            fact_embedding = await self.graphiti.embedder.create(fact)
-
-            entity_edge = EntityEdge(
-                group_id=parser.codebase_name,
-                source_node_uuid=source,
-                target_node_uuid=target,
-                created_at=now,
-                valid_at=now,
-                name=relation,
-                fact=fact,
-                fact_embedding=fact_embedding,
-                attributes=enriched_attrs,
-            )
-
-            await entity_edge.save(self.graphiti.driver)
-            if print_progress:
-                print(
-                    f"Relationship inserted [{i+1} / {num_relationships}]: {relationship}"
+    async def insert_parser_results(
+        self,
+        parser: CodebaseParser | Iterable[ParseBatch] | AsyncIterable[ParseBatch],
+        print_progress=False,
+        group_id: Optional[str] = None,
+    ):
+        """
+        Insert parser output into the graph. Accepts either a CodebaseParser that has
+        already parsed everything, or a stream of ParseBatch (e.g. from
+        CodebaseParser.iter_parse_dir, wrapped with iterate_in_thread when it should not
+        block the event loop) which is inserted batch by batch as it arrives.
+
+        Args:
+            group_id: Group to write to, e.g. the active version of the codebase, the
+                codebase name when None
+        """
+        # uuid -> docstring, kept across batches to enrich facts of later relationships
+        docstrings: dict[str, str] = {}
+        held_back: List[Relationship] = []
+        last_batch: Optional[ParseBatch] = None
+        num_nodes = 0
+        num_relationships = 0
+
+        if isinstance(parser, CodebaseParser):
+            print(
+                f"[INFO] Inserting {len(parser.get_nodes())} nodes and"
+                f" {len(parser.get_relationships())} relationships into graph db..."
+            )
+            num_nodes, num_relationships = await self.insert_batch(
+                parser, docstrings, print_progress, group_id
+            )
+        elif isinstance(parser, AsyncIterable):
+            async for batch in parser:
+                inserted_nodes, inserted_relationships = await self.insert_batch(
+                    batch, docstrings, print_progress, group_id, held_back
+                )
+                num_nodes += inserted_nodes
+                num_relationships += inserted_relationships
+                last_batch = batch
+        else:
+            for batch in parser:
+                inserted_nodes, inserted_relationships = await self.insert_batch(
+                    batch, docstrings, print_progress, group_id, held_back
                 )
+                num_nodes += inserted_nodes
+                num_relationships += inserted_relationships
+                last_batch = batch
+
+        late_batch = last_batch and late_docstrings_batch(
+            last_batch, held_back, docstrings
+        )
+        if late_batch is not None:
+            _, rewritten = await self.insert_batch(
+                late_batch, docstrings, print_progress, group_id
+            )
+            print(f"[INFO] Rewrote {rewritten} relationships with later docstrings")
+
+        print(
+            f"[INFO] Inserted {num_nodes} nodes and {num_relationships} relationships into graph db"
+        )
+        cache = self.embedding_batcher.cache
+        if cache is not None:
+            stats = cache.stats()
+            print(
+                f"[INFO] Embedding cache: {stats['hits']} hits, {stats['misses']} misses,"
+                f" {stats['entries']} entries"
+            )
+
+    async def insert_batch(
+        self,
+        batch: CodebaseParser | ParseBatch,
+        docstrings: dict[str, str],
+        print_progress=False,
+        group_id: Optional[str] = None,
+        held_back: Optional[List[Relationship]] = None,
+    ) -> tuple[int, int]:
+        prepared = PreparedBatch(batch, docstrings, group_id, held_back)
+        node_records, edge_records = await self.embed_batch(prepared, print_progress)
+        await self.write_records(node_records, edge_records, print_progress)
+        return len(node_records), len(edge_records)
+
+    async def embed_batch(
+        self, prepared: "PreparedBatch", print_progress=False
+    ) -> tuple[List[dict], List[dict]]:
+        """Node and relationship records of a prepared batch, with their embeddings."""
+        embeddings = await self.embedding_batcher.embed(prepared.texts())
+        if print_progress:
+            print(
+                f"[INFO] Embedded {len(embeddings)} texts, embedding batch size is now"
+                f" {self.embedding_batcher.batch_size}"
+            )
+        return prepared.records(embeddings)
+
+    async def write_records(
+        self,
+        node_records: List[dict],
+        edge_records: List[dict],
+        print_progress=False,
+    ):
+        """
+        Write nodes, then relationships, with one UNWIND query and one transaction per
+        write_batch_size records instead of a round trip per record. Every node a
+        relationship refers to has been written by the time it is.
+        """
+        batch_size = self.write_batch_size
+        for record in node_records:
+            self.name_index.add(record["group_id"], [record["uuid"]])
+        async with self.graphiti.driver.session() as session:
+            for query, key, records in (
+                (ENTITY_NODES_SAVE_BULK, "nodes", node_records),
+                (ENTITY_EDGES_SAVE_BULK, "edges", edge_records),
+            ):
+                for start in range(0, len(records), batch_size):
+                    chunk = records[start : start + batch_size]
+                    await session.execute_write(run_write, query, **{key: chunk})
+                    if print_progress:
+                        print(
+                            f"{key.capitalize()} inserted"
+                            f" [{start + len(chunk)} / {len(records)}]"
+                        )
+        for group_id in {record["group_id"] for record in node_records + edge_records}:
+            self.search_cache.invalidate(group_id)
+
+    async def backfill_embeddings(
+        self, group_id: str, settings: ParserSettings, print_progress=False
+    ) -> tuple[int, int]:
+        """
+        Embed the nodes and facts of a group written without embeddings, chunk by
+        chunk. It runs with its own EmbeddingBatcher of backfill_concurrency requests
+        in flight and pauses between chunks, so searches keep getting through to the
+        embedding server meanwhile.
+
+        Returns:
+            Number of nodes and relationships embedded
+        """
+        batcher = EmbeddingBatcher(
+            self.graphiti.embedder,
+            batch_size=project_config.embedding_batch_size,
+            max_batch_size=project_config.embedding_max_batch_size,
+            max_concurrency=project_config.backfill_concurrency,
+            target_latency=project_config.embedding_target_latency,
+            cache=self.embedding_batcher.cache,
+            model=self.embedding_batcher.model,
+            dim=self.embedding_batcher.dim,
+        )
+        counts = []
+        for key, read_query, write_query, params, text in (
+            (
+                "nodes",
+                NODES_WITHOUT_EMBEDDING,
+                NODE_EMBEDDINGS_SAVE_BULK,
+                {},
+                lambda record: node_name(record["uuid"]),
+            ),
+            (
+                "relationships",
+                EDGES_WITHOUT_EMBEDDING,
+                EDGE_EMBEDDINGS_SAVE_BULK,
+                {"relations": settings.embedded_relations()},
+                lambda record: record["text"],
+            ),
+        ):
+            embedded: set[str] = set()
+            while True:
+                records, _, _ = await self.graphiti.driver.execute_query(
+                    read_query,
+                    group_id=group_id,
+                    limit=project_config.backfill_chunk_size,
+                    **params,
+                )
+                if not records:
+                    break
+                uuids = [record["uuid"] for record in records]
+                # Guards against looping forever on embeddings the graph did not keep
+                if embedded.intersection(uuids):
+                    raise RuntimeError(
+                        f"Embeddings of {key} of '{group_id}' were not stored"
+                    )
+                embedded.update(uuids)
+
+                embeddings = await batcher.embed([text(record) for record in records])
+                async with self.graphiti.driver.session() as session:
+                    await session.execute_write(
+                        run_write,
+                        write_query,
+                        records=[
+                            {"uuid": uuid, "embedding": embedding}
+                            for uuid, embedding in zip(uuids, embeddings)
+                        ],
+                    )
+                # Facts found by the semantic search only now
+                self.search_cache.invalidate(group_id)
+                if print_progress:
+                    print(f"{key.capitalize()} embedded [{len(embedded)}]")
+                await asyncio.sleep(project_config.backfill_pause_seconds)
+            counts.append(len(embedded))
+        return counts[0], counts[1]
+
+    async def delete_references(self, group_id: str, references: list[str]):
+        """Remove the nodes and relationships parsed from the given files."""
+        for query in (
+            DELETE_REFERENCE_EDGES,
+            DELETE_REFERENCE_NODES,
+            DELETE_UNREFERENCED_PLACEHOLDERS,
+        ):
+            await self.graphiti.driver.execute_query(
+                query, group_id=group_id, references=references
+            )
+        self.name_index.invalidate(group_id)
+        self.search_cache.invalidate(group_id)
+
+    async def delete_group(
+        self,
+        group_id: str,
+        batch_size: int = project_config.group_delete_batch_size,
+        pause_seconds: float = project_config.group_delete_pause_seconds,
+    ) -> tuple[int, int]:
+        """
+        Remove every node and relationship of a group, e.g. a replaced version of a
+        codebase, a transaction of `batch_size` at a time with pauses in between, so
+        a large delete does not hold locks and memory the searches need.
+
+        Returns:
+            Number of nodes and relationships deleted
+        """
+        self.name_index.invalidate(group_id)
+        counts = []
+        for query in (DELETE_GROUP_EDGES, DELETE_GROUP_NODES):
+            total = 0
+            while True:
+                records, _, _ = await self.graphiti.driver.execute_query(
+                    query, group_id=group_id, limit=batch_size
+                )
+                deleted = records[0]["deleted"] if records else 0
+                total += deleted
+                if deleted < batch_size:
+                    break
+                await asyncio.sleep(pause_seconds)
+            counts.append(total)
+        self.search_cache.invalidate(group_id)
+        return counts[1], counts[0]
 
     async def search(
-        self, query: str, top_k: int = project_config.top_k_graph_search
+        self,
+        query: str,
+        top_k: int = project_config.top_k_graph_search,
+        group_ids: Optional[List[str]] = None,
+        rerank: Optional[str] = None,
     ) -> List[EntityEdge]:
-        results = await self.graphiti.search(query, num_results=top_k)
-        return results
+        """
+        Relationships of the symbols the query names (e.g. `DataFrame.to_json`) come
+        first, straight from the graph. The semantic search only runs when they are
+        fewer than `top_k`. Results are cached until the codebases are written to.
+
+        Args:
+            group_ids: Codebases to search, every loaded codebase when None
+            rerank: One of RERANK_STRATEGIES, project_config.search_rerank when None
+        """
+        rerank = rerank or project_config.search_rerank
+        key = self.search_cache.key(query, group_ids, top_k, rerank)
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        generation = self.search_cache.generation(group_ids)
+
+        exact = await self.exact_match_edges(query, group_ids)
+        if len(exact) >= top_k:
+            results = exact
+        else:
+            semantic = await self.semantic_search(query, top_k, group_ids, rerank)
+            seen = {edge.uuid for edge in exact}
+            results = exact + [edge for edge in semantic if edge.uuid not in seen]
+        self.search_cache.put(key, results, generation)
+        return list(results)
+
+    async def semantic_search(
+        self, query: str, top_k: int, group_ids: Optional[List[str]], rerank: str
+    ) -> List[EntityEdge]:
+        """Hybrid BM25 and cosine search, with its candidates ordered by `rerank`."""
+        if rerank not in RERANK_STRATEGIES:
+            raise ValueError(
+                f"Unknown rerank strategy '{rerank}', expected one of {RERANK_STRATEGIES}"
+            )
+        if rerank == "llm":
+            config = EDGE_HYBRID_SEARCH_CROSS_ENCODER.model_copy(
+                update={"limit": top_k}
+            )
+            results = await self.graphiti.search_(query, config, group_ids=group_ids)
+            return results.edges
+
+        if rerank == "rrf":
+            # Graphiti.search fuses the BM25 and cosine results with RRF already
+            return await self.graphiti.search(
+                query, group_ids=group_ids, num_results=top_k
+            )
+
+        # Cheaper rerankers order a larger pool of the RRF candidates themselves
+        limit = top_k * project_config.rerank_candidates
+        query_vector = await self.embed_query(query)
+        candidates = (
+            await search(
+                self.graphiti.clients,
+                query,
+                group_ids,
+                EDGE_HYBRID_SEARCH_RRF.model_copy(update={"limit": limit}),
+                SearchFilters(),
+                query_vector=query_vector,
+            )
+        ).edges
+        if not candidates:
+            return candidates
+
+        if rerank == "cosine":
+            records, _, _ = await self.graphiti.driver.execute_query(
+                EDGE_FACT_EMBEDDINGS, uuids=[edge.uuid for edge in candidates]
+            )
+            embeddings = {record["uuid"]: record["embedding"] for record in records}
+            scores = cosine_scores(
+                query_vector, [embeddings.get(edge.uuid) for edge in candidates]
+            )
+        else:
+            scores = await asyncio.to_thread(
+                self.cross_encoder.scores, query, [edge.fact for edge in candidates]
+            )
+        return rank_by_scores(candidates, scores)[:top_k]
+
+    async def embed_query(self, query: str) -> List[float]:
+        """Query embedding through the embedding cache, repeated queries are free."""
+        cache = self.embedding_batcher.cache
+        model = self.embedding_batcher.model
+        dim = self.embedding_batcher.dim
+        text = query.replace("\n", " ")
+        if cache is not None:
+            (cached,) = await asyncio.to_thread(cache.get_many, model, dim, [text])
+            if cached is not None:
+                return cached
+        embedding = await self.graphiti.embedder.create(input_data=[text])
+        if cache is not None:
+            await asyncio.to_thread(cache.put_many, model, dim, [text], [embedding])
+        return embedding
+
+    async def exact_match_edges(
+        self, query: str, group_ids: Optional[List[str]] = None
+    ) -> List[EntityEdge]:
+        """Relationships of the nodes the query names, their outgoing ones first."""
+        if not query_symbols(query):
+            return []
+        await self.load_name_index(group_ids)
+        uuids = self.name_index.lookup(query, group_ids)
+        if not uuids:
+            return []
+
+        incident = await asyncio.gather(
+            *(
+                EntityEdge.get_by_node_uuid(self.graphiti.driver, uuid)
+                for uuid in uuids
+            )
+        )
+        edges: List[EntityEdge] = []
+        seen = set()
+        for uuid, node_edges in zip(uuids, incident):
+            node_edges.sort(key=lambda edge: edge.source_node_uuid != uuid)
+            for edge in node_edges:
+                if edge.uuid not in seen:
+                    seen.add(edge.uuid)
+                    edges.append(edge)
+        if edges:
+            print(f"[INFO] Exact match of {uuids}: {len(edges)} relationships")
+        return edges[: project_config.exact_match_max_edges]
+
+    async def load_name_index(self, group_ids: Optional[List[str]] = None):
+        if group_ids is None:
+            if self.name_index.complete:
+                return
+            records, _, _ = await self.graphiti.driver.execute_query(ALL_NODE_UUIDS)
+            uuids_by_group: Dict[str, List[str]] = {}
+            for record in records:
+                uuids_by_group.setdefault(record["group_id"], []).append(record["uuid"])
+            # Codebases deleted by another process since they were loaded
+            for group_id in list(self.name_index.suffixes):
+                if group_id not in uuids_by_group:
+                    self.name_index.invalidate(group_id)
+            for group_id, uuids in uuids_by_group.items():
+                self.name_index.load(group_id, uuids)
+            self.name_index.complete = True
+            return
+
+        for group_id in group_ids:
+            if not self.name_index.is_loaded(group_id):
+                records, _, _ = await self.graphiti.driver.execute_query(
+                    GROUP_NODE_UUIDS, group_id=group_id
+                )
+                self.name_index.load(group_id, [record["uuid"] for record in records])
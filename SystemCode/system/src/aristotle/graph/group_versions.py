@@ -0,0 +1,34 @@
+# A codebase is loaded into a new group of the graph each time, e.g. `keras@v2`, so
+# searches keep using the previous complete group until the new one is activated.
+# Codebases loaded before versioning live in a group named after the codebase.
+VERSION_SEPARATOR = "@v"
+
+
+def versioned_group_id(codebase_name: str, version: int) -> str:
+    return f"{codebase_name}{VERSION_SEPARATOR}{version}"
+
+
+def is_versioned(group_id: str) -> bool:
+    return VERSION_SEPARATOR in group_id
+
+
+def group_version(group_id: str) -> int:
+    """Version of a group, 0 for the unversioned group of a codebase."""
+    if not is_versioned(group_id):
+        return 0
+    return int(group_id.rsplit(VERSION_SEPARATOR, 1)[1])
+
+
+def group_node_uuid(group_id: str, name: str) -> str:
+    """
+    Uuid of the node with this qualified name in the group. Versions of a codebase
+    hold the same names, so versioned groups prefix them to keep the uuids apart.
+    """
+    if is_versioned(group_id):
+        return f"{group_id}/{name}"
+    return name
+
+
+def node_name(uuid: str) -> str:
+    """Qualified name of a node uuid, qualified names never contain a slash."""
+    return uuid.rsplit("/", 1)[-1]
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .graph_database import (GraphDatabase, PreparedBatch,
+                             late_docstrings_batch)
+from .parser import ParseBatch, Relationship
+
+
+class StageStats:
+    """
+    Where a pipeline stage spent its time: working, waiting for input (an upstream
+    stage is slower) or waiting to hand its output over (a downstream stage is slower).
+    """
+
+    def __init__(self, name: str, unit: str = "items", workers: int = 1):
+        self.name = name
+        self.unit = unit
+        self.workers = workers
+        self.batches = 0
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def utilization(self, elapsed: float) -> float:
+        """Fraction of the time its workers were busy."""
+        return self.busy / self.workers / elapsed if elapsed else 0
+
+    def summary(self, elapsed: float) -> str:
+        # Times are summed over the workers of the stage
+        return (
+            f"{self.name}: {self.items} {self.unit} in {self.batches} batches,"
+            f" {self.items / elapsed if elapsed else 0:.0f} {self.unit}/s,"
+            f" busy {self.utilization(elapsed):.0%}, waited for input"
+            f" {self.starved:.1f}s, blocked on output {self.blocked:.1f}s"
+        )
+
+
+class IngestPipeline:
+    """
+    Codebase ingestion as stages connected by bounded asyncio queues, so parsing (CPU),
+    embedding (the Ollama host) and graph writes (Neo4j) overlap instead of idling
+    while another stage runs.
+
+    - parse: pulls ParseBatch from a blocking iterator in a worker thread and prepares
+      its facts, in parse order since facts are enriched with earlier docstrings
+    - embed: `embed_concurrency` workers embedding prepared batches
+    - write: writes batches in parse order, as relationships MATCH nodes that earlier
+      batches may have written
+    - docs: the optional documentation loader, in a worker thread next to the others
+
+    At most `queue_size` batches are between parsing and writing at any time, which
+    bounds memory and pushes back on the parser when the later stages are slower.
+    """
+
+    def __init__(
+        self,
+        graph_db: GraphDatabase,
+        queue_size: int = 4,
+        embed_concurrency: int = 2,
+        embed=True,
+        print_progress=False,
+        group_id: Optional[str] = None,
+    ):
+        """
+        Args:
+            graph_db: Graph database the batches are embedded and written with
+            queue_size: Batches in flight between the parse and write stages
+            embed_concurrency: Batches embedded at once, the embedding requests they
+                make are bounded by the EmbeddingBatcher of graph_db
+            embed: Whether to embed nodes and facts, without it they are written
+                without embeddings for GraphDatabase.backfill_embeddings to fill in
+            group_id: Group the batches are written to, e.g. a new version of the
+                codebase, their codebase name when None
+        """
+        self.graph_db = graph_db
+        self.queue_size = queue_size
+        self.embed_concurrency = embed_concurrency
+        self.embed = embed
+        self.print_progress = print_progress
+        self.group_id = group_id
+        self.stats: Dict[str, StageStats] = {}
+
+    async def run(
+        self,
+        batches: Iterable[ParseBatch],
+        docs_loader: Optional[Callable[[], int]] = None,
+    ) -> Optional[int]:
+        """
+        Ingest the parser output, and the documentation with `docs_loader` if given.
+
+        Returns:
+            What docs_loader returned, None without it
+        """
+        parse_stats = StageStats("parse")
+        embed_stats = StageStats("embed", workers=self.embed_concurrency)
+        write_stats = StageStats("write")
+        self.stats = {"parse": parse_stats, "embed": embed_stats, "write": write_stats}
+
+        in_flight = asyncio.Semaphore(self.queue_size)
+        # Never full: a batch takes an in_flight slot before it enters either queue
+        parsed: asyncio.Queue[Optional[tuple[int, PreparedBatch]]] = asyncio.Queue(
+            self.queue_size + self.embed_concurrency
+        )
+        embedded: asyncio.Queue[Optional[tuple[int, tuple[List[dict], List[dict]]]]] = (
+            asyncio.Queue(self.queue_size + self.embed_concurrency)
+        )
+        loop = asyncio.get_running_loop()
+
+        async def parse():
+            # uuid -> docstring, kept across batches to enrich facts of later relationships
+            docstrings: dict[str, str] = {}
+            held_back: List[Relationship] = []
+            iterator = iter(batches)
+            sentinel = object()
+            index = 0
+            last_batch = None
+            while True:
+                start = time.monotonic()
+                batch = await loop.run_in_executor(None, next, iterator, sentinel)
+                late = batch is sentinel
+                if late:
+                    # Relationships to write again with the docstrings of later batches
+                    batch = last_batch and late_docstrings_batch(
+                        last_batch, held_back, docstrings
+                    )
+                    if batch is None:
+                        parse_stats.busy += time.monotonic() - start
+                        break
+                last_batch = batch
+                prepared = PreparedBatch(
+                    batch,  # type: ignore
+                    docstrings,
+                    self.group_id,
+                    None if late else held_back,
+                )
+                parse_stats.busy += time.monotonic() - start
+                parse_stats.batches += 1
+                parse_stats.items += len(prepared)
+
+                start = time.monotonic()
+                await in_flight.acquire()
+                await parsed.put((index, prepared))
+                parse_stats.blocked += time.monotonic() - start
+                index += 1
+                if late:
+                    break
+            for _ in range(self.embed_concurrency):
+                await parsed.put(None)
+
+        async def embed():
+            while True:
+                start = time.monotonic()
+                item = await parsed.get()
+                embed_stats.starved += time.monotonic() - start
+                if item is None:
+                    break
+                index, prepared = item
+
+                start = time.monotonic()
+                if self.embed:
+                    records = await self.graph_db.embed_batch(
+                        prepared, self.print_progress
+                    )
+                else:
+                    records = prepared.records(None)
+                embed_stats.busy += time.monotonic() - start
+                embed_stats.batches += 1
+                embed_stats.items += len(prepared)
+                await embedded.put((index, records))
+            await embedded.put(None)
+
+        async def write():
+            # index -> records of batches embedded before an earlier one
+            pending: Dict[int, tuple[List[dict], List[dict]]] = {}
+            next_index = 0
+            finished_workers = 0
+            while finished_workers < self.embed_concurrency:
+                start = time.monotonic()
+                item = await embedded.get()
+                write_stats.starved += time.monotonic() - start
+                if item is None:
+                    finished_workers += 1
+                    continue
+                index, records = item
+                pending[index] = records
+
+                while next_index in pending:
+                    node_records, edge_records = pending.pop(next_index)
+                    start = time.monotonic()
+                    await self.graph_db.write_records(
+                        node_records, edge_records, self.print_progress
+                    )
+                    write_stats.busy += time.monotonic() - start
+                    write_stats.batches += 1
+                    write_stats.items += len(node_records) + len(edge_records)
+                    next_index += 1
+                    in_flight.release()
+
+        loaded_docs = None
+
+        async def docs():
+            nonlocal loaded_docs
+            docs_stats = StageStats("docs", unit="files")
+            self.stats["docs"] = docs_stats
+            start = time.monotonic()
+            loaded_docs = await asyncio.to_thread(docs_loader)  # type: ignore
+            docs_stats.busy = time.monotonic() - start
+            docs_stats.batches = 1
+            docs_stats.items = loaded_docs
+
+        start = time.monotonic()
+        # A task group cancels the other stages once one of them fails
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(parse())
+                for _ in range(self.embed_concurrency):
+                    group.create_task(embed())
+                group.create_task(write())
+                if docs_loader is not None:
+                    group.create_task(docs())
+        except ExceptionGroup as e:
+            raise e.exceptions[0]
+        elapsed = time.monotonic() - start
+
+        print(
+            f"[INFO] Inserted {parse_stats.items} nodes and relationships in"
+            f" {elapsed:.1f}s"
+        )
+        for stats in self.stats.values():
+            print(f"[INFO] Stage {stats.summary(elapsed)}")
+        # The busiest stage is the one the others wait for
+        bottleneck = max(
+            (parse_stats, embed_stats, write_stats),
+            key=lambda stats: stats.utilization(elapsed),
+        )
+        print(f"[INFO] Bottleneck stage: {bottleneck.name}")
+        return loaded_docs
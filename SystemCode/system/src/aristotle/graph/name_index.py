@@ -0,0 +1,130 @@
+import re
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from .group_versions import node_name
+
+# Dotted identifiers, e.g. `DataFrame.to_json`
+SYMBOL_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+BACKTICKED_PATTERN = re.compile(r"`([^`]+)`")
+# Interior capital, as in CamelCase or camelCase
+CAMEL_CASE_PATTERN = re.compile(r"[A-Za-z][a-z0-9]*[A-Z]")
+
+
+def looks_like_symbol(word: str) -> bool:
+    """Whether an unquoted word of a query is code rather than English."""
+    return "." in word or "_" in word or CAMEL_CASE_PATTERN.match(word) is not None
+
+
+def query_symbols(query: str) -> List[str]:
+    """Words of a query that name symbols, backticked ones and code-like ones."""
+    symbols = []
+    for quoted in BACKTICKED_PATTERN.findall(query):
+        symbols.extend(SYMBOL_PATTERN.findall(quoted))
+    symbols.extend(
+        word
+        for word in SYMBOL_PATTERN.findall(BACKTICKED_PATTERN.sub(" ", query))
+        if looks_like_symbol(word)
+    )
+    return list(dict.fromkeys(symbols))
+
+
+class NameIndex:
+    """
+    In-memory index of the node uuids (qualified names) of each codebase, by every
+    dotted suffix of them, so `DataFrame.to_json` or `to_json` finds
+    `pandas.core.frame.DataFrame.to_json` with a dict lookup.
+
+    Codebases are loaded from the graph the first time they are searched and kept up
+    to date by the writes of this process afterwards. Writes of other processes are
+    picked up when a codebase is loaded again after `ttl_seconds`.
+    """
+
+    def __init__(self, max_matches: int = 5, ttl_seconds: float = 600):
+        """
+        Args:
+            max_matches: Symbols matching more nodes than this are too ambiguous to
+                answer directly and left to the semantic search
+            ttl_seconds: Codebases loaded longer ago than this are loaded again, e.g.
+                to pick up the nodes written by the server or another loader process
+        """
+        self.max_matches = max_matches
+        self.ttl_seconds = ttl_seconds
+        # codebase -> dotted suffix -> uuids
+        self.suffixes: Dict[str, Dict[str, Set[str]]] = {}
+        # codebase -> when it was loaded
+        self.loaded_at: Dict[str, float] = {}
+        # When every codebase in the graph was loaded
+        self.completed_at: Optional[float] = None
+
+    def is_fresh(self, loaded_at: Optional[float]) -> bool:
+        if loaded_at is None:
+            return False
+        return time.monotonic() - loaded_at <= self.ttl_seconds
+
+    @property
+    def complete(self) -> bool:
+        """Whether every codebase in the graph was loaded within the time to live."""
+        return self.is_fresh(self.completed_at)
+
+    @complete.setter
+    def complete(self, complete: bool):
+        self.completed_at = time.monotonic() if complete else None
+
+    def is_loaded(self, codebase_name: str) -> bool:
+        return codebase_name in self.suffixes and self.is_fresh(
+            self.loaded_at.get(codebase_name)
+        )
+
+    def load(self, codebase_name: str, uuids: Iterable[str]):
+        self.suffixes[codebase_name] = defaultdict(set)
+        self.loaded_at[codebase_name] = time.monotonic()
+        self.add(codebase_name, uuids)
+
+    def add(self, codebase_name: str, uuids: Iterable[str]):
+        """Index new nodes of a codebase, if it is loaded or it is a new codebase."""
+        if codebase_name not in self.suffixes:
+            # Without every codebase loaded this may be part of an existing one
+            if not self.complete:
+                return
+            self.suffixes[codebase_name] = defaultdict(set)
+            self.loaded_at[codebase_name] = time.monotonic()
+        suffixes = self.suffixes[codebase_name]
+        for uuid in uuids:
+            # By qualified name, uuids of versioned groups are prefixed with the group
+            parts = node_name(uuid).split(".")
+            for start in range(len(parts)):
+                suffixes[".".join(parts[start:])].add(uuid)
+
+    def invalidate(self, codebase_name: str):
+        """Forget a codebase whose nodes were deleted, it is loaded again when needed."""
+        self.suffixes.pop(codebase_name, None)
+        self.loaded_at.pop(codebase_name, None)
+        self.complete = False
+
+    def lookup(
+        self, query: str, codebase_names: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Uuids of the nodes the query names. A dotted symbol that matches nothing is
+        tried again without its leading parts, e.g. `pandas.DataFrame` as `DataFrame`
+        when pandas re-exports it from `pandas.core.frame`.
+        """
+        if codebase_names is None:
+            codebase_names = list(self.suffixes)
+        indexes = [self.suffixes[c] for c in codebase_names if c in self.suffixes]
+
+        matched: List[str] = []
+        for symbol in query_symbols(query):
+            parts = symbol.split(".")
+            for start in range(len(parts)):
+                suffix = ".".join(parts[start:])
+                uuids = set()
+                for index in indexes:
+                    uuids.update(index.get(suffix, ()))
+                if uuids:
+                    if len(uuids) <= self.max_matches:
+                        matched.extend(sorted(uuids))
+                    break
+        return list(dict.fromkeys(matched))
@@ -1,7 +1,13 @@
 from .ast_traverser import ASTTraverser
 from .codebase_parser import CodebaseParser
+from .dependency_index import DependencyIndex
 from .fact_builder import build_fact
 from .node import Node
+from .parse_batch import ParseBatch, iterate_in_thread
+from .parse_cache import ParseCache
+from .parse_stream import read_parser_results, write_parser_results
 from .parser_settings import ParserSettings
+from .quarantine import ParseBudgetExceeded, QuarantineReport
 from .relationship import Relationship
+from .relationship_table import RelationshipTable
 from .type_inferrer import TypeInferrer
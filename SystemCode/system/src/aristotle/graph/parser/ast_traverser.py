@@ -1,17 +1,26 @@
 import ast
-import json
 import os
+import time
 from collections import defaultdict
 from typing import Dict, List, Optional
 
-import nbformat
-from nbconvert import PythonExporter
-
 from .node import Node
+from .notebook import read_notebook_source
 from .parser_settings import ParserSettings
+from .quarantine import TIME_BUDGET_REASON, ParseBudgetExceeded
 from .relationship import Relationship
+from .symbol_table import SymbolTable
 from .type_inferrer import TypeInferrer
 
+# Bump whenever the nodes or relationships produced for the same source change,
+# so that cached parse results from older versions are not reused
+PARSER_VERSION = "8"
+# Upper bound of AST nodes per byte of source, reached by chains like `-~-~x`,
+# smaller sources cannot go over max_ast_nodes and are not counted
+MAX_AST_NODES_PER_BYTE = 2
+# Relationships whose target is defined by the file being parsed
+DEFINING_RELATIONS = frozenset({"CONTAINS", "HAS_METHOD", "HAS_FIELD", "HAS_PARAMETER"})
+
 
 def extract_module_name(path: str) -> str:
     path = path.lstrip("./\\")
@@ -39,18 +48,29 @@ class ASTTraverser(ast.NodeVisitor):
         self.current_function: Optional[str] = None
 
         self.class_fields: defaultdict = defaultdict(set)
-        self.function_params: defaultdict = defaultdict(str)
         self.local_vars: set = set()
-        self.global_vars: defaultdict = defaultdict(str)
-        self.imports: defaultdict = defaultdict(str)
+
+        # Shared with the type inferrer, which reads it live
+        self.symbols = SymbolTable()
+        self.imports = self.symbols.imports
+        self.global_vars = self.symbols.global_vars
+        # Absolute names of every module this one may import from, including names
+        # that turn out to be attributes rather than submodules
+        self.imported_modules: set[str] = set()
+
+        # Return types seen in each enclosing function body, innermost last
+        self.return_types: list[set[str]] = []
 
         # Nodes: uuid -> Node
         self.nodes: dict[str, Node] = {}
         self.relationships: dict[tuple[str, str, str], dict] = {}
 
-        self.type_inferrer = TypeInferrer(
-            dict(self.function_params), dict(self.global_vars), dict(self.imports)
-        )
+        self.type_inferrer = TypeInferrer(self.symbols)
+
+        # Shallow mode skips function bodies regardless of the settings profile
+        self.traverse_function_bodies = settings.traverse_function_bodies
+        self.shallow_reason: Optional[str] = None
+        self.deadline: Optional[float] = None
 
     def should_include_name(self, name: str) -> bool:
         """Determine if a name should be included based on privacy settings."""
@@ -104,12 +124,15 @@ class ASTTraverser(ast.NodeVisitor):
         source_kind: str,
         target_kind: str,
         extra_attrs: Optional[Dict] = None,
-    ):
+    ) -> Optional[Dict]:
+        """Add a relationship, returning its attributes or None if it was not added."""
         if source is None or target is None:
-            return
+            return None
+        if not self.settings.should_emit(relation):
+            return None
         key = (source, relation, target)
         if key in self.relationships:
-            return
+            return None
         attrs = extra_attrs or {}
         attrs["source_kind"] = source_kind
         attrs["target_kind"] = target_kind
@@ -122,9 +145,18 @@ class ASTTraverser(ast.NodeVisitor):
             attrs["target_name"] = target.split(".")[-1]
         # do not inject file_path automatically here; only use file_path when explicitly set
         # ensure nodes exist (only set name by default)
-        self.add_node(source, source_kind, {"name": source.split(".")[-1]})
-        self.add_node(target, target_kind, {"name": target.split(".")[-1]})
+        source_attrs = {"name": source.split(".")[-1]}
+        target_attrs = {"name": target.split(".")[-1]}
+        # Nodes the file defines carry its reference, so parsing it again deletes them
+        if relation in DEFINING_RELATIONS:
+            target_attrs["reference"] = self.reference
+            # Every file shares the codebase node without module names
+            if source_kind == "MODULE" and self.settings.include_module_name:
+                source_attrs["reference"] = self.reference
+        self.add_node(source, source_kind, source_attrs)
+        self.add_node(target, target_kind, target_attrs)
         self.relationships[key] = attrs
+        return attrs
 
     def parse_annotation(self, annotation) -> Optional[str]:
         """Parse an AST annotation into a string. Returns None when no annotation present."""
@@ -150,18 +182,8 @@ class ASTTraverser(ast.NodeVisitor):
             return str(annotation.value)
         return "Unknown"
 
-    def infer_target_return_type_from_body(self, body) -> str:
-        """Infer return type by analyzing function body for return statements."""
-        target_return_types = set()
-
-        for node in ast.walk(ast.Module(body=body, type_ignores=[])):
-            if isinstance(node, ast.Return):
-                if node.value:
-                    inferred_type = self.type_inferrer.infer_type_from_value(node.value)
-                    target_return_types.add(inferred_type)
-                else:
-                    target_return_types.add("None")
-
+    def infer_target_return_type(self, target_return_types: set[str]) -> str:
+        """Combine the return types collected from a function body into one type."""
         if not target_return_types:
             return "None"  # No return statements found
         elif len(target_return_types) == 1:
@@ -170,6 +192,26 @@ class ASTTraverser(ast.NodeVisitor):
             # Multiple return types - create union
             return f"Union[{', '.join(sorted(target_return_types))}]"
 
+    def make_shallow(self, reason: str):
+        """Skip function bodies from now on, for files over the AST node or time budget."""
+        self.traverse_function_bodies = False
+        self.shallow_reason = reason
+
+    def check_deadline(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ParseBudgetExceeded(
+                f"{TIME_BUDGET_REASON} {self.settings.max_parse_seconds}s to parse"
+            )
+
+    def visit_function_body(self, node):
+        """Visit a function body, returning the types of the return statements directly in it."""
+        self.check_deadline()
+        if not self.traverse_function_bodies:
+            return set()
+        self.return_types.append(set())
+        self.generic_visit(node)
+        return self.return_types.pop()
+
     def build_class_signature(self, node: ast.ClassDef) -> str:
         """Build the class signature including inheritance."""
         class_name = node.name
@@ -197,29 +239,44 @@ class ASTTraverser(ast.NodeVisitor):
     def visit_Import(self, node):
         """Track imports for proper namespacing."""
         for alias in node.names:
+            self.imported_modules.add(alias.name)
             if alias.asname:
                 self.imports[alias.asname] = alias.name
             else:
                 # For 'import os', we map 'os' to 'os'
                 self.imports[alias.name.split(".")[-1]] = alias.name
 
-        # Update type inferrer with new imports
-        self.type_inferrer.imports = dict(self.imports)
         self.generic_visit(node)
 
+    def resolve_import_module(self, node: ast.ImportFrom) -> str:
+        """Absolute module of a from import, resolving relative imports against this module."""
+        if not node.level:
+            return node.module or ""
+        package_parts = self.module_name.split(".")[:-1]
+        if node.level - 1 > len(package_parts):
+            return node.module or ""
+        parts = package_parts[: len(package_parts) - (node.level - 1)]
+        if node.module:
+            parts.append(node.module)
+        return ".".join(parts)
+
     def visit_ImportFrom(self, node):
         """Track from imports for proper namespacing."""
-        module_name = node.module or ""
+        module_name = self.resolve_import_module(node)
+        if module_name:
+            self.imported_modules.add(module_name)
         for alias in node.names:
             if alias.name == "*":
                 continue  # Skip wildcard imports
+            # `from pkg import mod` imports the submodule pkg.mod
+            self.imported_modules.add(
+                f"{module_name}.{alias.name}" if module_name else alias.name
+            )
             imported_name = alias.asname if alias.asname else alias.name
             self.imports[imported_name] = (
                 f"{module_name}.{alias.name}" if module_name else alias.name
             )
 
-        # Update type inferrer with new imports
-        self.type_inferrer.imports = dict(self.imports)
         self.generic_visit(node)
 
     def visit_Module(self, node):
@@ -241,6 +298,7 @@ class ASTTraverser(ast.NodeVisitor):
         self.generic_visit(node)
 
     def visit_ClassDef(self, node):
+        self.check_deadline()
         class_name = node.name
 
         if not self.should_include_name(class_name):
@@ -308,14 +366,29 @@ class ASTTraverser(ast.NodeVisitor):
 
         prev_class = self.current_class
         self.current_class = class_name
+        self.symbols.push("class", class_name)
         self.generic_visit(node)
+        self.symbols.pop()
         self.current_class = prev_class
 
+    def visit_Return(self, node: ast.Return):
+        if self.return_types:
+            if node.value:
+                inferred_type = self.type_inferrer.infer_type_from_value(node.value)
+                self.return_types[-1].add(inferred_type)
+            else:
+                self.return_types[-1].add("None")
+        self.generic_visit(node)
+
+    def visit_AsyncFunctionDef(self, node):
+        # Not part of the graph, but its returns must not count against the enclosing function
+        self.visit_function_body(node)
+
     def visit_FunctionDef(self, node):
         func_name = node.name
 
         if not self.should_include_name(func_name):
-            self.generic_visit(node)
+            self.visit_function_body(node)
             return
 
         # Build argument signature with full names for parameters
@@ -325,16 +398,11 @@ class ASTTraverser(ast.NodeVisitor):
                 ann = self.parse_annotation(arg.annotation) or "Any"
                 arg_types.append(f"{arg.arg}: {ann}")
 
-        # Parse return annotation (None means not annotated)
+        # Parse return annotation (None means not annotated), when missing the
+        # return type is inferred from the body once it has been visited below
         ret_ann = self.parse_annotation(node.returns)
-        if ret_ann is None or ret_ann == "Unknown":
-            # Try to infer from body
-            inferred_target_return_type = self.infer_target_return_type_from_body(
-                node.body
-            )
-            target_return_type = inferred_target_return_type or "Any"
-        else:
-            target_return_type = ret_ann
+        infer_return_type = ret_ann is None or ret_ann == "Unknown"
+        target_return_type = "Any" if infer_return_type else ret_ann
 
         signature = f"{func_name}(self, {', '.join(arg_types)}) -> {target_return_type}"
 
@@ -346,7 +414,7 @@ class ASTTraverser(ast.NodeVisitor):
             full_func_name = self.get_full_name(func_name, "class")
             full_class_name = self.get_full_name(self.current_class, "module")
 
-            self.add_relationship(
+            func_attrs = self.add_relationship(
                 full_class_name,
                 "HAS_METHOD",
                 full_func_name,
@@ -374,7 +442,7 @@ class ASTTraverser(ast.NodeVisitor):
             full_func_name = self.get_full_name(func_name, "module")
             root_namespace = self.get_root_namespace()
 
-            self.add_relationship(
+            func_attrs = self.add_relationship(
                 root_namespace,
                 "CONTAINS",
                 full_func_name,
@@ -424,32 +492,33 @@ class ASTTraverser(ast.NodeVisitor):
                             {"name": arg.arg, "reference": self.reference},
                         )
 
-        # Store function params for tracking (used by the inferrer)
-        temp_function_params = {}
+        # Function params live in their own scope (used by the inferrer)
+        self.symbols.push("function", func_name)
         for arg in node.args.args:
             if self.should_include_name(arg.arg):
-                temp_function_params[arg.arg] = (
-                    self.parse_annotation(arg.annotation) or "Any"
+                self.symbols.declare(
+                    arg.arg, self.parse_annotation(arg.annotation) or "Any"
                 )
-        self.function_params.update(temp_function_params)
-
-        # Update type inferrer with new function parameters
-        self.type_inferrer.function_params = dict(self.function_params)
 
         prev_function = self.current_function
         self.current_function = func_name
         self.local_vars = set()
-        self.generic_visit(node)
+        target_return_types = self.visit_function_body(node)
         self.current_function = prev_function
 
-        # Clear function params after processing
-        for key in temp_function_params:
-            if key in self.function_params:
-                del self.function_params[key]
+        self.symbols.pop()
         self.local_vars = set()
 
-        # Reset type inferrer function params
-        self.type_inferrer.function_params = {}
+        if (
+            infer_return_type
+            and func_attrs is not None
+            and self.traverse_function_bodies
+        ):
+            target_return_type = self.infer_target_return_type(target_return_types)
+            func_attrs["target_return_type"] = target_return_type
+            func_attrs["target_signature"] = (
+                f"{func_name}(self, {', '.join(arg_types)}) -> {target_return_type}"
+            )
 
     def visit_AnnAssign(self, node: ast.AnnAssign):
         """Handle annotated assignments (module-level or class-level)."""
@@ -468,7 +537,6 @@ class ASTTraverser(ast.NodeVisitor):
             if self.should_include_name(var_name):
                 ann = annotation or "Any"
                 self.global_vars[var_name] = ann
-                self.type_inferrer.global_vars = dict(self.global_vars)
 
                 full_var_name = self.get_full_name(var_name, "module")
                 root_namespace = self.get_root_namespace()
@@ -638,9 +706,6 @@ class ASTTraverser(ast.NodeVisitor):
                 )
                 self.global_vars[var_name] = var_type
 
-                # Update type inferrer with new global variables
-                self.type_inferrer.global_vars = dict(self.global_vars)
-
                 # Add relationship for global variable and ensure node exists
                 full_var_name = self.get_full_name(var_name, "module")
                 root_namespace = self.get_root_namespace()
@@ -673,6 +738,7 @@ class ASTTraverser(ast.NodeVisitor):
         # Track variable usage for HAS_PARAMETER relationships
         if (
             self.current_function
+            and self.settings.should_emit("HAS_PARAMETER")
             and isinstance(node.ctx, ast.Load)
             and self.should_include_name(node.id)
         ):
@@ -691,9 +757,10 @@ class ASTTraverser(ast.NodeVisitor):
                     target_type = "Unknown"
                     full_target_name = self.get_full_name(node.id, "class")
 
-            if node.id in self.function_params:
+            param_type = self.symbols.lookup_local(node.id)
+            if param_type is not None:
                 target_kind = "FIELD"
-                target_type = self.function_params[node.id]
+                target_type = param_type
                 if self.current_class:
                     full_target_name = self.get_full_name(node.id, "method")
                 else:
@@ -726,24 +793,50 @@ class ASTTraverser(ast.NodeVisitor):
         self.generic_visit(node)
 
     def traverse(self) -> tuple[list[Node], list["Relationship"]]:
+        notebook = None
         if self.file_path.endswith(".ipynb"):
             try:
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    notebook_content = json.load(f)
-
-                nb = nbformat.from_dict(notebook_content)
-                exporter = PythonExporter()
-                source_code, _ = exporter.from_notebook_node(nb)
+                notebook = read_notebook_source(self.file_path)
             except Exception as e:
                 print(
                     f"[WARN] Error converting notebook to Python for file '{self.file_path}': {e}"
                 )
                 raise e
+            source_code = notebook.source
         else:
             with open(self.file_path, "r", encoding="utf-8") as f:
                 source_code = f.read()
 
-        tree = ast.parse(source_code, filename=self.file_path)
+        max_source_kb = self.settings.max_source_kb
+        if max_source_kb is not None:
+            source_kb = len(source_code.encode("utf-8")) / 1024
+            if source_kb > max_source_kb:
+                raise ParseBudgetExceeded(
+                    f"{source_kb:.0f} KB of source, over the {max_source_kb} KB budget"
+                )
+
+        try:
+            tree = ast.parse(source_code, filename=self.file_path)
+        except SyntaxError as e:
+            if notebook is not None and notebook.cell_indices and e.lineno:
+                e.msg = f"{e.msg} (notebook cell {notebook.cell_for_line(e.lineno)})"
+            raise e
+
+        max_ast_nodes = self.settings.max_ast_nodes
+        if (
+            max_ast_nodes is not None
+            and self.traverse_function_bodies
+            and len(source_code) * MAX_AST_NODES_PER_BYTE > max_ast_nodes
+        ):
+            num_ast_nodes = sum(1 for _ in ast.walk(tree))
+            if num_ast_nodes > max_ast_nodes:
+                self.make_shallow(
+                    f"{num_ast_nodes} AST nodes, over the {max_ast_nodes} node budget"
+                )
+
+        # Checked between definitions, a single huge statement can still overrun it
+        if self.settings.max_parse_seconds is not None:
+            self.deadline = time.monotonic() + self.settings.max_parse_seconds
         self.visit(tree)
 
         nodes = list(self.nodes.values())
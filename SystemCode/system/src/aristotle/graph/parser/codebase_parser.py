@@ -1,65 +1,542 @@
+import json
 import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
 
-from .ast_traverser import ASTTraverser
+from ...repository_loader.file_discovery import FileListing, discover_files
+from .ast_traverser import PARSER_VERSION, ASTTraverser
+from .dependency_index import DependencyIndex
+from .merge_index import NEW, UNCHANGED, MergeIndex
 from .node import Node
+from .parse_batch import ParseBatch
+from .parse_cache import ParseCache, ParseResult
 from .parser_settings import ParserSettings
+from .quarantine import (FAILED, SHALLOW, SKIPPED, ParseBudgetExceeded,
+                         QuarantineReport, over_time_budget)
 from .relationship import Relationship
+from .relationship_table import RelationshipTable
+from .symbol_index import SymbolIndex
+
+
+def parse_file_task(
+    codebase_name: str,
+    file_path: str,
+    virtual_path: str,
+    reference: str,
+    settings: ParserSettings,
+) -> ParseResult:
+    """Parse a single file, module-level so it can be pickled into a process pool."""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    traverser = ASTTraverser(codebase_name, file_path, virtual_path, reference, settings)
+    try:
+        nodes, relationships = traverser.traverse()
+    except ParseBudgetExceeded as e:
+        # Over the time budget with function bodies, give it one more go without them
+        if traverser.deadline is None or not traverser.traverse_function_bodies:
+            raise
+        traverser = ASTTraverser(
+            codebase_name, file_path, virtual_path, reference, settings
+        )
+        traverser.make_shallow(str(e))
+        nodes, relationships = traverser.traverse()
+    return (
+        nodes,
+        relationships,
+        (
+            traverser.module_name,
+            dict(traverser.imports),
+            sorted(traverser.imported_modules),
+        ),
+        traverser.shallow_reason,
+    )
+
+
+def file_reference(path: str, reference_prefix: str = "") -> str:
+    """Reference of a file from its "/" separated path relative to the codebase root."""
+    *dir_names, file_name = path.split("/")
+    return f"{reference_prefix}{'/'.join(dir_names)}/{file_name}"
 
 
 class CodebaseParser:
-    def __init__(self, codebase_name: str, settings: ParserSettings):
+    def __init__(
+        self,
+        codebase_name: str,
+        settings: ParserSettings,
+        cache: Optional[ParseCache] = None,
+    ):
         self.codebase_name = codebase_name
-        self.relationships: list[Relationship] = []
+        self.relationships = RelationshipTable()
         self.settings = settings
         self.nodes: list[Node] = []
+        self.cache = cache
+        # Shared by every parse_* call, so each uuid and edge is emitted only once
+        self.merge_index = MergeIndex()
+        # Also shared, so INHERITS across separately parsed directories still resolve
+        self.symbol_index = SymbolIndex(codebase_name)
+        # INHERITS relationships and their placeholder targets, held back until
+        # every module is indexed
+        self.pending_inherits: list[Relationship] = []
+        self.pending_nodes: dict[str, Node] = {}
+        # Which files import which, to find what to parse again when a file changes
+        self.dependency_index = DependencyIndex()
+        # Files that were skipped, failed or only parsed shallow
+        self.quarantine = QuarantineReport()
 
     def parse_file(self, file_path: str, virtual_path: str, reference: str):
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-        nodes, relationships = ASTTraverser(
-            self.codebase_name, file_path, virtual_path, reference, self.settings
-        ).traverse()
-        self.nodes.extend(nodes)
-        self.relationships.extend(relationships)
+        for _, _, result in self.parse_files([(file_path, virtual_path, reference)]):
+            if isinstance(result, Exception):
+                raise result
+            nodes, relationships, _, _ = result
+            self.add_result(nodes, relationships)
+
+    def add_result(self, nodes: list[Node], relationships: list[Relationship]):
+        """Merge one file's output into the collected nodes and relationships."""
+        for node in nodes:
+            if self.merge_index.merge_node(node) == NEW:
+                self.nodes.append(node)
+        for relationship in relationships:
+            if self.merge_index.add_relationship(relationship):
+                self.relationships.append(relationship)
+
+    def collect_files(
+        self,
+        codebase_path: str,
+        reference_prefix: str = "",
+        listing: Optional[FileListing] = None,
+    ) -> list[tuple[str, str, str]]:
+        """
+        List (file_path, virtual_path, reference) of every parseable file.
+
+        Args:
+            listing: Files found by discover_files, shared with the docs loader so the
+                tree is only walked once, discovered here when not given
+        """
+        if listing is None:
+            listing = discover_files(codebase_path)
+
+        files = []
+        for path in listing.with_suffixes((".py", ".ipynb")):
+            *dir_names, file_name = path.split("/")
+            if not self.settings.include_private_dirs and any(
+                dir_name.startswith("_") for dir_name in dir_names
+            ):
+                continue
+            if not self.settings.include_test_files and file_name.startswith("test_"):
+                continue
+            file_path = os.path.join(codebase_path, *dir_names, file_name)
+            virtual_path = os.path.join(".", *dir_names, file_name)
+            files.append(
+                (file_path, virtual_path, file_reference(path, reference_prefix))
+            )
+        return files
 
     def parse_dir(
         self,
         codebase_path: str,
         reference_prefix: str = "",
         print_progress: bool = False,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        listing: Optional[FileListing] = None,
     ):
-        for root_path, dir_names, file_names in os.walk(codebase_path):
-            dir_names[:] = [
-                dir_name
-                for dir_name in dir_names
-                if not dir_name.startswith(".")
-                and (
-                    not self.settings.include_private_dirs
-                    and not dir_name.startswith("_")
+        """
+        Args:
+            codebase_path: Root directory of the codebase
+            reference_prefix: Prefix prepended to every file reference
+            print_progress: Whether to print a line for every parsed or failed file
+            parallel: Whether to parse files in a process pool, results are merged
+                in walk order so the output is identical to a sequential run
+            max_workers: Size of the process pool, defaults to the number of CPUs
+            listing: Files to parse, see collect_files
+        """
+        for nodes, relationships in self.iter_resolved_results(
+            codebase_path,
+            reference_prefix,
+            print_progress,
+            parallel,
+            max_workers,
+            listing,
+            None,
+        ):
+            self.add_result(nodes, relationships)
+
+    def iter_parse_dir(
+        self,
+        codebase_path: str,
+        reference_prefix: str = "",
+        print_progress: bool = False,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        max_batch_items: Optional[int] = None,
+        listing: Optional[FileListing] = None,
+        references: Optional[set[str]] = None,
+    ) -> Iterator[ParseBatch]:
+        """
+        Like parse_dir, but yields the results as batches instead of collecting them
+        on the parser, so a codebase can be ingested with bounded memory. A node is
+        yielded again, with its merged attributes, when a later file adds to it.
+
+        Args:
+            max_batch_items: Yield once a batch holds at least this many nodes and
+                relationships, None yields one batch per file
+            references: Only parse the files with these references, see
+                iter_reparse_files
+        """
+        # uuid -> merged node, so a node changed twice within a batch is sent once
+        nodes: dict[str, Node] = {}
+        relationships: list[Relationship] = []
+        for file_nodes, file_relationships in self.iter_resolved_results(
+            codebase_path,
+            reference_prefix,
+            print_progress,
+            parallel,
+            max_workers,
+            listing,
+            references,
+        ):
+            for node in file_nodes:
+                if self.merge_index.merge_node(node) != UNCHANGED:
+                    # Yield a snapshot, the indexed node keeps being merged into
+                    # while the consumer may still be reading an earlier batch
+                    merged = self.merge_index.nodes[node.uuid]
+                    nodes[node.uuid] = Node(
+                        merged.uuid, merged.kind, dict(merged.attributes)
+                    )
+            for relationship in file_relationships:
+                if self.merge_index.add_relationship(relationship):
+                    relationships.append(relationship)
+
+            if (nodes or relationships) and len(nodes) + len(relationships) >= (
+                max_batch_items or 1
+            ):
+                yield ParseBatch(
+                    self.codebase_name,
+                    list(nodes.values()),
+                    relationships,
+                    self.settings,
                 )
-            ]
-
-            for file_name in file_names:
-                if (file_name.endswith(".py") or file_name.endswith(".ipynb")) and (
-                    not self.settings.include_test_files
-                    and not file_name.startswith("test_")
-                ):
-                    file_path = os.path.join(root_path, file_name)
-                    virtual_path = os.path.join(
-                        ".", root_path[len(codebase_path) + 1 :], file_name
+                nodes, relationships = {}, []
+
+        if nodes or relationships:
+            yield ParseBatch(
+                self.codebase_name, list(nodes.values()), relationships, self.settings
+            )
+
+    def iter_reparse_files(
+        self,
+        codebase_path: str,
+        references: Iterable[str],
+        reference_prefix: str = "",
+        print_progress: bool = False,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        max_batch_items: Optional[int] = None,
+    ) -> Iterator[ParseBatch]:
+        """
+        Parse some files of an already parsed codebase again, usually the
+        dependency_index.affected_files of the files that changed. What the symbol and
+        dependency indexes, restored with load_index, knew about them is forgotten
+        first, and the other modules stay in the indexes so INHERITS still resolve to
+        them. Files that no longer exist are dropped from the indexes.
+
+        Args:
+            references: References of the files to parse again
+        """
+        references = set(references)
+        self.symbol_index.remove_modules(
+            self.dependency_index.module_names(references)
+        )
+        self.dependency_index.remove_files(references)
+        yield from self.iter_parse_dir(
+            codebase_path,
+            reference_prefix=reference_prefix,
+            print_progress=print_progress,
+            parallel=parallel,
+            max_workers=max_workers,
+            max_batch_items=max_batch_items,
+            references=references,
+        )
+
+    def save_index(self, path: str):
+        """Persist the dependency and symbol indexes, see iter_reparse_files."""
+        data = {
+            "parser_version": PARSER_VERSION,
+            "codebase_name": self.codebase_name,
+            "dependencies": self.dependency_index.to_dict(),
+            "symbols": self.symbol_index.to_dict(),
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load_index(self, path: str) -> bool:
+        """
+        Restore the indexes written by save_index, returning False when there is no
+        usable index and the codebase has to be parsed in full.
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (
+            data.get("parser_version") != PARSER_VERSION
+            or data.get("codebase_name") != self.codebase_name
+        ):
+            return False
+        self.dependency_index = DependencyIndex.from_dict(data["dependencies"])
+        self.symbol_index = SymbolIndex.from_dict(self.codebase_name, data["symbols"])
+        return True
+
+    def iter_resolved_results(
+        self,
+        codebase_path: str,
+        reference_prefix: str,
+        print_progress: bool,
+        parallel: bool,
+        max_workers: Optional[int],
+        listing: Optional[FileListing],
+        references: Optional[set[str]],
+    ) -> Iterator[tuple[list[Node], list[Relationship]]]:
+        """
+        Yield the (nodes, relationships) of every file without its INHERITS
+        relationships, then one final result with those relationships pointing at
+        the canonical uuid of each base class, see SymbolIndex.
+        """
+        for reference, result in self.iter_file_results(
+            codebase_path,
+            reference_prefix,
+            print_progress,
+            parallel,
+            max_workers,
+            listing,
+            references,
+        ):
+            nodes, relationships, (module_name, imports, imported_modules), _ = result
+            self.symbol_index.add_definitions(relationships)
+            self.symbol_index.add_module(module_name, imports)
+            self.dependency_index.add_file(reference, module_name, imported_modules)
+            yield self.defer_inherits(nodes, relationships)
+        yield self.resolve_inherits()
+
+    def defer_inherits(
+        self, nodes: list[Node], relationships: list[Relationship]
+    ) -> tuple[list[Node], list[Relationship]]:
+        """Hold back INHERITS relationships, and nodes nothing else in the file refers to."""
+        kept_relationships = []
+        referenced = set()
+        for relationship in relationships:
+            if relationship.relationship == "INHERITS":
+                self.pending_inherits.append(relationship)
+                referenced.add(relationship.source)
+            else:
+                kept_relationships.append(relationship)
+                referenced.add(relationship.source)
+                referenced.add(relationship.target)
+
+        inherits_targets = {
+            relationship.target
+            for relationship in relationships
+            if relationship.relationship == "INHERITS"
+        }
+        kept_nodes = []
+        for node in nodes:
+            if node.uuid in inherits_targets and node.uuid not in referenced:
+                pending = self.pending_nodes.get(node.uuid)
+                if pending is None:
+                    self.pending_nodes[node.uuid] = node
+                else:
+                    for key, value in node.attributes.items():
+                        pending.attributes.setdefault(key, value)
+            else:
+                kept_nodes.append(node)
+        return kept_nodes, kept_relationships
+
+    def resolve_inherits(self) -> tuple[list[Node], list[Relationship]]:
+        """
+        Point the held back INHERITS relationships at canonical uuids, returning them
+        with the placeholder nodes that are still referenced afterwards.
+        """
+        nodes: dict[str, Node] = {}
+        relationships = []
+        for relationship in self.pending_inherits:
+            target = self.symbol_index.resolve_base(relationship.target)
+            relationships.append(
+                Relationship(
+                    relationship.source,
+                    relationship.relationship,
+                    target,
+                    relationship.attributes,
+                )
+            )
+            if target in nodes or self.symbol_index.is_definition(target):
+                continue
+            if relationship.target in self.pending_nodes:
+                placeholder = self.pending_nodes[relationship.target]
+                nodes[target] = Node(target, placeholder.kind, placeholder.attributes)
+            else:
+                nodes[target] = Node(target, "CLASS", {"name": target.split(".")[-1]})
+
+        self.pending_inherits = []
+        self.pending_nodes = {}
+        return list(nodes.values()), relationships
+
+    def iter_file_results(
+        self,
+        codebase_path: str,
+        reference_prefix: str,
+        print_progress: bool,
+        parallel: bool,
+        max_workers: Optional[int],
+        listing: Optional[FileListing],
+        references: Optional[set[str]],
+    ) -> Iterator[tuple[str, ParseResult]]:
+        """
+        Yield (reference, ParseResult) of every file that parsed, recording the files
+        that did not, or only in shallow mode, in the quarantine report.
+        """
+        if listing is None:
+            listing = discover_files(codebase_path)
+        for path, reason in listing.skipped:
+            reference = file_reference(path, reference_prefix)
+            if path.endswith((".py", ".ipynb")) and (
+                references is None or reference in references
+            ):
+                self.quarantine.add(reference, SKIPPED, reason)
+
+        files = self.collect_files(codebase_path, reference_prefix, listing)
+        if references is not None:
+            files = [file for file in files if file[2] in references]
+        for file_path, reference, result in self.parse_files(
+            files, parallel=parallel, max_workers=max_workers
+        ):
+            if isinstance(result, ParseBudgetExceeded):
+                self.quarantine.add(reference, SKIPPED, str(result))
+                if print_progress:
+                    print(f"[WARN] Skipped '{file_path}': {result}")
+                continue
+            if isinstance(result, Exception):
+                self.quarantine.add(
+                    reference, FAILED, f"{type(result).__name__}: {result}"
+                )
+                if print_progress:
+                    print(f"[WARN] Failed to parse '{file_path}': {result}")
+                continue
+            shallow_reason = result[3]
+            if shallow_reason is not None:
+                self.quarantine.add(reference, SHALLOW, shallow_reason)
+                if print_progress:
+                    print(f"[WARN] Parsed '{file_path}' shallow: {shallow_reason}")
+            elif print_progress:
+                print(f"[INFO] Parsed '{file_path}' as '{reference}'")
+            yield reference, result
+
+        if self.quarantine and print_progress:
+            print(f"[INFO] Quarantined files: {self.quarantine.summary()}")
+
+    def parse_files(
+        self,
+        files: list[tuple[str, str, str]],
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> Iterator[tuple[str, str, ParseResult | Exception]]:
+        """
+        Parse the given (file_path, virtual_path, reference) entries, yielding
+        (file_path, reference, result) in input order where result is either the
+        ParseResult or the exception raised for that file.
+        Cache lookups happen in this process, only misses are sent to the pool,
+        and at most a small window of files is in flight at any time so results
+        do not pile up ahead of a slow consumer.
+        """
+        executor = None
+        window = 1
+        if parallel and len(files) > 1:
+            max_workers = max_workers or os.cpu_count() or 1
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            window = max_workers * 4
+
+        # (cache_key, cached_result, future) for scheduled files, in input order
+        scheduled: deque[
+            tuple[Optional[str], Optional[ParseResult], Optional[Future]]
+        ] = deque()
+        next_to_schedule = 0
+        try:
+            for i, (file_path, virtual_path, reference) in enumerate(files):
+                while next_to_schedule < min(len(files), i + window):
+                    scheduled.append(
+                        self.schedule_file(files[next_to_schedule], executor)
                     )
-                    reference = f"{reference_prefix}{root_path[len(codebase_path) + 1 :]}/{file_name}"
+                    next_to_schedule += 1
 
+                cache_key, result, future = scheduled.popleft()
+                if result is None:
                     try:
-                        self.parse_file(file_path, virtual_path, reference)
-                        if print_progress:
-                            print(f"[INFO] Parsed '{file_path}' as '{reference}'")
+                        if future is not None:
+                            result = future.result()
+                        else:
+                            result = parse_file_task(
+                                self.codebase_name,
+                                file_path,
+                                virtual_path,
+                                reference,
+                                self.settings,
+                            )
                     except Exception as e:
-                        if print_progress:
-                            print(f"[WARN] Failed to parse '{file_path}': {e}")
+                        yield file_path, reference, e
+                        continue
+                    # A file over the time budget may parse in full next time
+                    if (
+                        self.cache is not None
+                        and cache_key is not None
+                        and not over_time_budget(result[3])
+                    ):
+                        self.cache.put(cache_key, result)
+                yield file_path, reference, result
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def schedule_file(
+        self,
+        file: tuple[str, str, str],
+        executor: Optional[ProcessPoolExecutor],
+    ) -> tuple[Optional[str], Optional[ParseResult], Optional[Future]]:
+        """Look a file up in the cache and, on a miss, submit it to the pool if there is one."""
+        file_path, virtual_path, reference = file
+        cache_key = None
+        if self.cache is not None:
+            try:
+                cache_key = self.cache.make_key(
+                    self.codebase_name,
+                    file_path,
+                    virtual_path,
+                    reference,
+                    self.settings,
+                )
+                result = self.cache.get(cache_key)
+                if result is not None:
+                    return cache_key, result, None
+            except OSError:
+                pass
+
+        future = None
+        if executor is not None:
+            future = executor.submit(
+                parse_file_task,
+                self.codebase_name,
+                file_path,
+                virtual_path,
+                reference,
+                self.settings,
+            )
+        return cache_key, None, future
 
     def get_nodes(self) -> list[Node]:
         return self.nodes
 
-    def get_relationships(self) -> list[Relationship]:
+    def get_relationships(self) -> RelationshipTable:
         return self.relationships
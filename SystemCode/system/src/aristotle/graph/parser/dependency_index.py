@@ -0,0 +1,116 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def package_module_name(module_name: str) -> str:
+    # A package is imported by its name, not by its __init__ module
+    if module_name.endswith(".__init__"):
+        return module_name[: -len(".__init__")]
+    if module_name == "__init__":
+        return ""
+    return module_name
+
+
+class DependencyIndex:
+    """
+    Which files of a codebase import which others, so a change to one file only needs
+    that file and the files depending on it to be parsed again.
+
+    Files are identified by their reference, as in ParseBatch attributes. Imports are
+    kept as the absolute module names ASTTraverser saw and resolved to files lazily,
+    since the imported file may be parsed after the importing one.
+    """
+
+    def __init__(self):
+        # reference -> (module name, imported module names)
+        self.files: Dict[str, Tuple[str, List[str]]] = {}
+        self.reverse: Optional[Dict[str, Set[str]]] = None
+
+    def add_file(self, reference: str, module_name: str, imported_modules: List[str]):
+        self.files[reference] = (module_name, sorted(imported_modules))
+        self.reverse = None
+
+    def remove_files(self, references: Iterable[str]):
+        for reference in references:
+            self.files.pop(reference, None)
+        self.reverse = None
+
+    def dependents(self) -> Dict[str, Set[str]]:
+        """Reverse index, reference -> references of the files importing it."""
+        if self.reverse is not None:
+            return self.reverse
+
+        modules: Dict[str, str] = {}
+        # last module name component -> module names, for suffix matches
+        by_last_name: Dict[str, List[str]] = defaultdict(list)
+        for reference, (module_name, _) in self.files.items():
+            module_name = package_module_name(module_name)
+            modules[module_name] = reference
+            by_last_name[module_name.rsplit(".", 1)[-1]].append(module_name)
+
+        self.reverse = defaultdict(set)
+        for reference, (_, imported_modules) in self.files.items():
+            for imported_module in imported_modules:
+                imported_reference = modules.get(imported_module)
+                if imported_reference is None:
+                    # The codebase may live under a directory (e.g. `src/`) that is not
+                    # part of the import path, so accept a unique module ending with it
+                    candidates = [
+                        module_name
+                        for module_name in by_last_name.get(
+                            imported_module.rsplit(".", 1)[-1], ()
+                        )
+                        if module_name.endswith(f".{imported_module}")
+                    ]
+                    if len(candidates) != 1:
+                        continue
+                    imported_reference = modules[candidates[0]]
+                if imported_reference != reference:
+                    self.reverse[imported_reference].add(reference)
+        return self.reverse
+
+    def affected_files(self, changed_references: Iterable[str]) -> Set[str]:
+        """
+        The changed files and their direct dependents. Packages re-export names of
+        their modules, so the dependents of an affected __init__ module are followed
+        further: `from pkg import Base` resolves through `pkg/__init__.py` to the
+        module defining Base.
+        """
+        dependents = self.dependents()
+        affected = set(changed_references)
+        pending = list(affected)
+        while pending:
+            reference = pending.pop()
+            for dependent in dependents.get(reference, ()):
+                if dependent in affected:
+                    continue
+                affected.add(dependent)
+                module_name = self.files[dependent][0]
+                if module_name == "__init__" or module_name.endswith(".__init__"):
+                    pending.append(dependent)
+        return affected
+
+    def module_names(self, references: Iterable[str]) -> List[str]:
+        return [self.files[r][0] for r in references if r in self.files]
+
+    def to_dict(self) -> dict:
+        return {
+            "files": {
+                reference: {"module": module_name, "imports": imported_modules}
+                for reference, (module_name, imported_modules) in self.files.items()
+            },
+            "dependents": {
+                reference: sorted(dependents)
+                for reference, dependents in sorted(self.dependents().items())
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DependencyIndex":
+        index = cls()
+        for reference, entry in data["files"].items():
+            index.files[reference] = (entry["module"], entry["imports"])
+        index.reverse = defaultdict(set)
+        for reference, dependents in data["dependents"].items():
+            index.reverse[reference] = set(dependents)
+        return index
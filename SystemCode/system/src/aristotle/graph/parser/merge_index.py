@@ -0,0 +1,68 @@
+from typing import Dict, Set
+
+from .node import Node
+from .relationship import Relationship
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+
+class MergeIndex:
+    """
+    Cross-file index of everything a CodebaseParser has emitted so far.
+
+    The same uuid shows up in many files, e.g. a base class is a placeholder node
+    wherever it is inherited from and a full node where it is defined. Nodes are
+    merged by uuid so each one is written to the graph once, and relationships are
+    deduplicated by (source, relationship, target), keeping the first occurrence as
+    ASTTraverser does within a single file.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, Node] = {}
+        # Relationship keys packed into a single int over interned string ids, much
+        # smaller than a set of (source, relationship, target) string tuples
+        self.string_ids: Dict[str, int] = {}
+        self.relationship_keys: Set[int] = set()
+
+    def merge_node(self, node: Node) -> str:
+        """
+        Merge a node into the index, returning NEW, CHANGED or UNCHANGED. Attributes
+        missing on the indexed node are filled in from `node`, existing values are kept.
+        A placeholder node, which only carries its name, takes the kind of the first
+        full definition merged into it.
+        """
+        existing = self.nodes.get(node.uuid)
+        if existing is None:
+            self.nodes[node.uuid] = node
+            return NEW
+
+        changed = False
+        if existing.kind != node.kind and list(existing.attributes) == ["name"]:
+            existing.kind = node.kind
+            changed = True
+        for key, value in node.attributes.items():
+            if key not in existing.attributes:
+                existing.attributes[key] = value
+                changed = True
+        return CHANGED if changed else UNCHANGED
+
+    def add_relationship(self, relationship: Relationship) -> bool:
+        """Record a relationship, returning False if the same edge was already added."""
+        key = (
+            (self.string_id(relationship.source) << 64)
+            | (self.string_id(relationship.relationship) << 32)
+            | self.string_id(relationship.target)
+        )
+        if key in self.relationship_keys:
+            return False
+        self.relationship_keys.add(key)
+        return True
+
+    def string_id(self, value: str) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.string_ids)
+            self.string_ids[value] = string_id
+        return string_id
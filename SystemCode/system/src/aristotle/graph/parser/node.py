@@ -1,10 +1,13 @@
+import sys
 from typing import Dict, Tuple
 
 
 class Node:
+    __slots__ = ("uuid", "kind", "attributes")
+
     def __init__(self, uuid: str, kind: str, attributes: Dict[str, str]):
         self.uuid = uuid
-        self.kind = kind
+        self.kind = sys.intern(kind)
         self.attributes = attributes
 
         assert self.attributes.get("name")
@@ -0,0 +1,134 @@
+import ast
+import bisect
+import json
+import re
+from typing import List
+
+# `%magic args`, `!command` and `var = !command` at the start of a (possibly indented) line
+LINE_MAGIC_PATTERN = re.compile(r"^(\s*)%(?!%)(\w+)\s*(.*)$")
+SHELL_PATTERN = re.compile(r"^(\s*)!(.*)$")
+SHELL_ASSIGN_PATTERN = re.compile(r"^(\s*)([\w.,\s]+?)\s*=\s*!(.*)$")
+MAGIC_ASSIGN_PATTERN = re.compile(r"^(\s*)([\w.,\s]+?)\s*=\s*%(?!%)(\w+)\s*(.*)$")
+CELL_MAGIC_PATTERN = re.compile(r"^%%(\w+)\s*(.*)$")
+HELP_PATTERN = re.compile(r"^\s*(\?\??[\w.]+|[\w.]+\?\??)\s*$")
+# Cheap pre-check for lines that might need any of the rewrites above
+MAYBE_MAGIC_PATTERN = re.compile(r"^\s*[%!?]|=\s*[%!]|\?\s*$", re.MULTILINE)
+
+
+class NotebookSource:
+    """Python source extracted from a notebook, together with where each code cell starts."""
+
+    def __init__(
+        self, source: str, cell_indices: List[int], cell_start_lines: List[int]
+    ):
+        """
+        Args:
+            source: Code cells concatenated into a single Python module
+            cell_indices: Index in the notebook of every extracted code cell
+            cell_start_lines: 1-based line in `source` where each extracted cell starts
+        """
+        self.source = source
+        self.cell_indices = cell_indices
+        self.cell_start_lines = cell_start_lines
+
+    def cell_for_line(self, lineno: int) -> int:
+        """Map a 1-based line of `source` back to the index of the notebook cell it came from."""
+        position = bisect.bisect_right(self.cell_start_lines, lineno) - 1
+        return self.cell_indices[max(position, 0)] if self.cell_indices else 0
+
+
+def translate_magic_line(line: str) -> str:
+    """Rewrite an IPython line magic or shell escape the way IPython does, other lines are kept."""
+    match = SHELL_ASSIGN_PATTERN.match(line)
+    if match:
+        indent, target, command = match.groups()
+        return f"{indent}{target} = get_ipython().getoutput({command.strip()!r})"
+    match = MAGIC_ASSIGN_PATTERN.match(line)
+    if match:
+        indent, target, name, args = match.groups()
+        magic = f"get_ipython().run_line_magic({name!r}, {args.strip()!r})"
+        return f"{indent}{target} = {magic}"
+    match = SHELL_PATTERN.match(line)
+    if match:
+        indent, command = match.groups()
+        return f"{indent}get_ipython().system({command.strip()!r})"
+    match = LINE_MAGIC_PATTERN.match(line)
+    if match:
+        indent, name, args = match.groups()
+        return f"{indent}get_ipython().run_line_magic({name!r}, {args.strip()!r})"
+    if HELP_PATTERN.match(line):
+        return f"# {line.strip()}"
+    return line
+
+
+def translate_cell(source: str) -> List[str]:
+    """
+    Turn a code cell into plain Python lines, one output line per input line so that
+    line numbers still map back to the cell. A cell magic (e.g. `%%time`) becomes a
+    single `run_cell_magic` call with the rest of the cell commented out, as its body
+    is not necessarily Python.
+    """
+    lines = source.splitlines()
+    if not lines:
+        return []
+    match = CELL_MAGIC_PATTERN.match(lines[0])
+    if match:
+        name, args = match.groups()
+        body = "\n".join(lines[1:])
+        return [
+            f"get_ipython().run_cell_magic({name!r}, {args.strip()!r}, {body!r})"
+        ] + [f"# {line}" for line in lines[1:]]
+    if not MAYBE_MAGIC_PATTERN.search(source):
+        return lines
+    # Only rewrite cells that are not valid Python already, so e.g. a line starting
+    # with "%" inside a multi-line string is left alone
+    try:
+        ast.parse(source)
+        return lines
+    except SyntaxError:
+        pass
+    return [translate_magic_line(line) for line in lines]
+
+
+def extract_notebook_source(notebook_content: dict) -> NotebookSource:
+    """
+    Concatenate the code cells of a v4 notebook into a Python module, reading the
+    JSON directly instead of going through nbconvert.
+    """
+    lines: List[str] = []
+    cell_indices: List[int] = []
+    cell_start_lines: List[int] = []
+    for index, cell in enumerate(notebook_content.get("cells", [])):
+        if cell.get("cell_type") != "code":
+            continue
+        source = cell.get("source", "")
+        if isinstance(source, list):
+            source = "".join(source)
+        cell_indices.append(index)
+        cell_start_lines.append(len(lines) + 1)
+        lines.extend(translate_cell(source))
+        lines.append("")
+    return NotebookSource("\n".join(lines) + "\n", cell_indices, cell_start_lines)
+
+
+def convert_with_nbconvert(notebook_content: dict) -> NotebookSource:
+    """Fallback for notebooks the direct extractor does not understand, e.g. pre-v4 formats."""
+    import nbformat
+    from nbconvert import PythonExporter
+
+    nb = nbformat.reads(json.dumps(notebook_content), as_version=4)
+    source_code, _ = PythonExporter().from_notebook_node(nb)
+    return NotebookSource(source_code, [], [])
+
+
+def read_notebook_source(file_path: str) -> NotebookSource:
+    with open(file_path, "r", encoding="utf-8") as f:
+        notebook_content = json.load(f)
+
+    if (
+        isinstance(notebook_content, dict)
+        and notebook_content.get("nbformat", 0) >= 4
+        and isinstance(notebook_content.get("cells"), list)
+    ):
+        return extract_notebook_source(notebook_content)
+    return convert_with_nbconvert(notebook_content)
@@ -0,0 +1,51 @@
+import asyncio
+from typing import AsyncIterator, Iterable, TypeVar
+
+from .node import Node
+from .parser_settings import ParserSettings
+from .relationship import Relationship
+
+T = TypeVar("T")
+
+
+class ParseBatch:
+    """A bounded slice of parser output, exposing the same accessors as CodebaseParser."""
+
+    def __init__(
+        self,
+        codebase_name: str,
+        nodes: list[Node],
+        relationships: list[Relationship],
+        settings: ParserSettings,
+    ):
+        self.codebase_name = codebase_name
+        self.nodes = nodes
+        self.relationships = relationships
+        self.settings = settings
+
+    def get_nodes(self) -> list[Node]:
+        return self.nodes
+
+    def get_relationships(self) -> list[Relationship]:
+        return self.relationships
+
+    def __len__(self) -> int:
+        return len(self.nodes) + len(self.relationships)
+
+
+async def iterate_in_thread(iterable: Iterable[T]) -> AsyncIterator[T]:
+    """
+    Drive a blocking iterator (e.g. CodebaseParser.iter_parse_dir) from a worker thread
+    so the event loop stays free, prefetching the next item while the caller is still
+    busy with the current one.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(iterable)
+    sentinel = object()
+    pending = loop.run_in_executor(None, next, iterator, sentinel)
+    while True:
+        item = await pending
+        if item is sentinel:
+            return
+        pending = loop.run_in_executor(None, next, iterator, sentinel)
+        yield item  # type: ignore
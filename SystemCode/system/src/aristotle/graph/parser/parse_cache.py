@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .ast_traverser import PARSER_VERSION
+from .node import Node
+from .parser_settings import ParserSettings
+from .relationship import Relationship
+
+# (module name, local name -> absolute name it was imported from, imported modules)
+ModuleImports = tuple[str, dict[str, str], list[str]]
+# The last element is why the file was parsed in shallow mode, None if it was not
+ParseResult = tuple[list[Node], list[Relationship], ModuleImports, Optional[str]]
+
+
+class ParseCache:
+    """
+    Content-addressed on-disk cache of ASTTraverser results.
+
+    Entries are keyed by the hash of the file content together with everything else
+    that influences the output (codebase name, virtual path, reference, parser settings
+    and parser version), so unchanged files skip AST parsing entirely. The cache is
+    bounded by `max_bytes` and evicts the least recently used entries first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # key -> entry size in bytes, least recently used first
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.total_bytes = 0
+        existing = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                existing.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(existing):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def make_key(
+        self,
+        codebase_name: str,
+        file_path: str,
+        virtual_path: str,
+        reference: str,
+        settings: ParserSettings,
+    ) -> str:
+        with open(file_path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        context = json.dumps(
+            [
+                PARSER_VERSION,
+                codebase_name,
+                virtual_path,
+                reference,
+                settings.to_dict(),
+            ],
+            sort_keys=True,
+        )
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{content_hash}:{context_hash}".encode()).hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[ParseResult]:
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            os.utime(path)
+        except Exception:
+            with self.lock:
+                self.misses += 1
+                self.total_bytes -= self.entries.pop(key, 0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: ParseResult):
+        path = self.entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except Exception as e:
+            print(f"[WARN] Failed to write parse cache entry '{path}': {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self.lock:
+            self.total_bytes -= self.entries.pop(key, 0)
+            self.entries[key] = size
+            self.total_bytes += size
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in `max_bytes`, caller holds the lock."""
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self.entry_path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,206 @@
+import json
+import mmap
+import sys
+from array import array
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+from .codebase_parser import CodebaseParser
+from .node import Node
+from .parse_batch import ParseBatch
+from .parser_settings import ParserSettings
+from .relationship import Relationship
+
+# Stream layout, every integer is a little-endian uint32:
+#   MAGIC
+#   then records, each a 1-byte tag followed by
+#   STRINGS_TAG: count, total_bytes, `count` byte lengths, utf-8 blob
+#   BATCH_TAG:   num_words, then `num_words` words:
+#                codebase_name, settings (json), num_nodes, num_relationships,
+#                per node:         uuid, kind, attributes
+#                per relationship: source, relationship, target, attributes
+#                where attributes is num_attributes followed by (key, value) pairs
+# Strings are referenced by their index in the string table, which grows as new
+# strings are introduced by the STRINGS record written just before the batch using them.
+MAGIC = b"ARPS\x01"
+STRINGS_TAG = b"S"
+BATCH_TAG = b"B"
+
+
+def to_little_endian(words: array) -> bytes:
+    if sys.byteorder == "big":
+        words = array("I", words)
+        words.byteswap()
+    return words.tobytes()
+
+
+class ParseStreamWriter:
+    """
+    Writes parser output as a stream of batches over an interned string table, so
+    parsing and graph insertion can run in different processes or on different machines.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.string_ids: Dict[str, int] = {}
+        self.new_strings: List[str] = []
+        self.file.write(MAGIC)
+
+    def intern(self, value: str) -> int:
+        if not isinstance(value, str):
+            raise TypeError(f"Only strings can be serialized, got {value!r}")
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.string_ids)
+            self.string_ids[value] = string_id
+            self.new_strings.append(value)
+        return string_id
+
+    def write_attributes(self, words: array, attributes: Dict[str, str]):
+        words.append(len(attributes))
+        for key, value in attributes.items():
+            words.append(self.intern(key))
+            words.append(self.intern(value))
+
+    def write_batch(self, batch: CodebaseParser | ParseBatch):
+        nodes = batch.get_nodes()
+        relationships = batch.get_relationships()
+        words = array("I")
+        words.append(self.intern(batch.codebase_name))
+        words.append(self.intern(json.dumps(batch.settings.to_dict(), sort_keys=True)))
+        words.append(len(nodes))
+        words.append(len(relationships))
+        for node in nodes:
+            words.append(self.intern(node.uuid))
+            words.append(self.intern(node.kind))
+            self.write_attributes(words, node.attributes or {})
+        for relationship in relationships:
+            words.append(self.intern(relationship.source))
+            words.append(self.intern(relationship.relationship))
+            words.append(self.intern(relationship.target))
+            self.write_attributes(words, relationship.attributes or {})
+
+        self.flush_strings()
+        self.file.write(BATCH_TAG)
+        self.file.write(to_little_endian(array("I", [len(words)])))
+        self.file.write(to_little_endian(words))
+
+    def flush_strings(self):
+        if not self.new_strings:
+            return
+        encoded = [string.encode("utf-8") for string in self.new_strings]
+        header = array("I", [len(encoded), sum(len(data) for data in encoded)])
+        header.extend(len(data) for data in encoded)
+        self.file.write(STRINGS_TAG)
+        self.file.write(to_little_endian(header))
+        self.file.write(b"".join(encoded))
+        self.new_strings = []
+
+
+def write_parser_results(
+    path: str, batches: CodebaseParser | ParseBatch | Iterable[ParseBatch]
+) -> int:
+    """Serialize a parser, a batch or a stream of batches, returning the batch count."""
+    if isinstance(batches, (CodebaseParser, ParseBatch)):
+        batches = [batches]  # type: ignore
+    num_batches = 0
+    with open(path, "wb") as f:
+        writer = ParseStreamWriter(f)
+        for batch in batches:  # type: ignore
+            writer.write_batch(batch)
+            num_batches += 1
+    return num_batches
+
+
+class ParseStreamReader:
+    """Reads a parse stream through mmap, integers are read in place without copying."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.strings: List[str] = []
+        self.settings: Dict[str, ParserSettings] = {}
+
+    def __iter__(self) -> Iterator[ParseBatch]:
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield from self.read_records(view)
+                finally:
+                    view.release()
+
+    def read_words(self, view: memoryview, offset: int, count: int) -> memoryview:
+        words = view[offset : offset + 4 * count].cast("I")
+        if sys.byteorder == "big":
+            swapped = array("I", words)
+            swapped.byteswap()
+            return memoryview(swapped)
+        return words
+
+    def read_records(self, view: memoryview) -> Iterator[ParseBatch]:
+        if bytes(view[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"'{self.path}' is not a parse stream")
+        offset = len(MAGIC)
+        while offset < len(view):
+            tag = bytes(view[offset : offset + 1])
+            offset += 1
+            if tag == STRINGS_TAG:
+                count, total_bytes = self.read_words(view, offset, 2)
+                lengths = self.read_words(view, offset + 8, count)
+                position = offset + 8 + 4 * count
+                for length in lengths:
+                    self.strings.append(
+                        str(view[position : position + length], "utf-8")
+                    )
+                    position += length
+                offset = position
+            elif tag == BATCH_TAG:
+                (num_words,) = self.read_words(view, offset, 1)
+                words = self.read_words(view, offset + 4, num_words)
+                yield self.decode_batch(words)
+                offset += 4 + 4 * num_words
+            else:
+                raise ValueError(
+                    f"Corrupt parse stream '{self.path}' at byte {offset - 1}"
+                )
+
+    def decode_attributes(self, words: memoryview, position: int) -> Tuple[Dict, int]:
+        strings = self.strings
+        num_attributes = words[position]
+        position += 1
+        attributes = {}
+        for _ in range(num_attributes):
+            attributes[strings[words[position]]] = strings[words[position + 1]]
+            position += 2
+        return attributes, position
+
+    def decode_batch(self, words: memoryview) -> ParseBatch:
+        strings = self.strings
+        codebase_name = strings[words[0]]
+        settings_json = strings[words[1]]
+        if settings_json not in self.settings:
+            self.settings[settings_json] = ParserSettings(**json.loads(settings_json))
+        num_nodes, num_relationships = words[2], words[3]
+
+        position = 4
+        nodes = []
+        for _ in range(num_nodes):
+            uuid, kind = strings[words[position]], strings[words[position + 1]]
+            attributes, position = self.decode_attributes(words, position + 2)
+            nodes.append(Node(uuid, kind, attributes))
+
+        relationships = []
+        for _ in range(num_relationships):
+            source = strings[words[position]]
+            relation = strings[words[position + 1]]
+            target = strings[words[position + 2]]
+            attributes, position = self.decode_attributes(words, position + 3)
+            relationships.append(Relationship(source, relation, target, attributes))
+
+        return ParseBatch(
+            codebase_name, nodes, relationships, self.settings[settings_json]
+        )
+
+
+def read_parser_results(path: str) -> Iterator[ParseBatch]:
+    """Stream the batches of a file written by write_parser_results."""
+    return iter(ParseStreamReader(path))
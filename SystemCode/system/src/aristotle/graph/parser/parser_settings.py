@@ -1,3 +1,22 @@
+from typing import Optional
+
+# profile -> (traverse function bodies, emitted relationships, embedded relationships),
+# None meaning every relationship kind
+PARSER_PROFILES: dict[str, tuple[bool, Optional[frozenset], Optional[frozenset]]] = {
+    "full": (True, None, None),
+    "structure": (
+        True,
+        frozenset({"CONTAINS", "HAS_METHOD", "INHERITS", "HAS_FIELD"}),
+        None,
+    ),
+    "signatures_only": (
+        False,
+        frozenset({"CONTAINS", "HAS_METHOD", "INHERITS", "HAS_FIELD"}),
+        frozenset({"CONTAINS", "HAS_METHOD"}),
+    ),
+}
+
+
 class ParserSettings:
     def __init__(
         self,
@@ -6,6 +25,10 @@ class ParserSettings:
         include_private_members: bool = False,
         include_dunder: bool = True,
         include_module_name: bool = True,
+        profile: str = "full",
+        max_source_kb: Optional[int] = None,
+        max_ast_nodes: Optional[int] = None,
+        max_parse_seconds: Optional[float] = None,
     ):
         """
         Args:
@@ -14,9 +37,49 @@ class ParserSettings:
             include_private: Whether to include private members (starting with "_")
             include_dunder: Whether to include dunder methods (starting and ending with "__")
             include_module_name: Whether to include module name in the namespace hierarchy
+            profile: How much of the code to ingest, one of PARSER_PROFILES:
+                "full" traverses function bodies and emits every relationship,
+                "structure" drops the HAS_PARAMETER usages found in bodies,
+                "signatures_only" skips function bodies altogether and only embeds
+                the CONTAINS and HAS_METHOD signatures
+            max_source_kb: Files with more Python source than this (the code cells of
+                a notebook) are skipped, None for no limit
+            max_ast_nodes: Files whose AST has more nodes than this are parsed in
+                shallow mode, without function bodies, None for no limit
+            max_parse_seconds: Files still being traversed after this long are parsed
+                again in shallow mode, and skipped if that is too slow as well,
+                None for no limit
         """
+        if profile not in PARSER_PROFILES:
+            raise ValueError(
+                f"Unknown parser profile '{profile}', expected one of {list(PARSER_PROFILES)}"
+            )
         self.include_private_dirs = include_private_dirs
         self.include_test_files = include_test_files
         self.include_private_members = include_private_members
         self.include_dunder = include_dunder
         self.include_module_name = include_module_name
+        self.profile = profile
+        self.max_source_kb = max_source_kb
+        self.max_ast_nodes = max_ast_nodes
+        self.max_parse_seconds = max_parse_seconds
+
+    @property
+    def traverse_function_bodies(self) -> bool:
+        return PARSER_PROFILES[self.profile][0]
+
+    def should_emit(self, relation: str) -> bool:
+        emitted = PARSER_PROFILES[self.profile][1]
+        return emitted is None or relation in emitted
+
+    def should_embed(self, relation: str) -> bool:
+        embedded = PARSER_PROFILES[self.profile][2]
+        return embedded is None or relation in embedded
+
+    def embedded_relations(self) -> Optional[list[str]]:
+        """Relationship names whose facts are embedded, None for all of them."""
+        embedded = PARSER_PROFILES[self.profile][2]
+        return None if embedded is None else sorted(embedded)
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
@@ -0,0 +1,48 @@
+from typing import Dict, List, Optional
+
+SKIPPED = "skipped"
+SHALLOW = "shallow"
+FAILED = "failed"
+
+# Start of the reason of files over the time budget. How long a parse takes depends
+# on the load of the machine, so unlike the other budgets it may not recur.
+TIME_BUDGET_REASON = "took longer than"
+
+
+class ParseBudgetExceeded(Exception):
+    """Raised by ASTTraverser when a file goes over one of the ParserSettings budgets."""
+
+
+def over_time_budget(reason: Optional[str]) -> bool:
+    return reason is not None and reason.startswith(TIME_BUDGET_REASON)
+
+
+class QuarantineReport:
+    """
+    Files of a codebase that were not parsed in full, and why.
+
+    Every entry is either SKIPPED (left out by file discovery or over the source size
+    budget), SHALLOW (parsed without function bodies because it was over the AST node
+    or time budget) or FAILED (the parser raised, e.g. on a syntax error).
+    """
+
+    def __init__(self):
+        self.entries: List[Dict[str, str]] = []
+
+    def add(self, reference: str, action: str, reason: str):
+        self.entries.append({"reference": reference, "action": action, "reason": reason})
+
+    def count(self, action: str) -> int:
+        return sum(1 for entry in self.entries if entry["action"] == action)
+
+    def summary(self) -> str:
+        return (
+            f"{self.count(SKIPPED)} skipped, {self.count(SHALLOW)} parsed shallow,"
+            f" {self.count(FAILED)} failed"
+        )
+
+    def to_list(self) -> List[Dict[str, str]]:
+        return list(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -1,12 +1,15 @@
+import sys
 from typing import Dict, Tuple
 
 
 class Relationship:
+    __slots__ = ("source", "relationship", "target", "attributes")
+
     def __init__(
         self, source: str, relationship: str, target: str, attributes: Dict[str, str]
     ):
         self.source = source
-        self.relationship = relationship
+        self.relationship = sys.intern(relationship)
         self.target = target
         self.attributes = attributes
 
@@ -0,0 +1,128 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, overload
+
+from .relationship import Relationship
+
+# Attribute columns store string id + 1 so that 0 can mean "key absent on this row"
+ABSENT = 0
+# Marks a non-string attribute value, kept aside in `RelationshipTable.objects`
+OBJECT = 0xFFFFFFFF
+
+
+class RelationshipTable:
+    """
+    Columnar, array-backed store of relationships.
+
+    Every string (uuids, relationship kinds, attribute values) is interned once in a
+    shared pool and rows only hold 4-byte ids, so the `source_kind`, `target_kind`,
+    `reference`, ... values repeated across edges cost nothing per edge. Rows are
+    materialised back into `Relationship` objects on access, which keeps iteration,
+    indexing and `to_tuple()` behaving like the plain list it replaces. Materialised
+    relationships own a fresh attributes dict, mutating it does not change the table.
+    """
+
+    def __init__(self, relationships: Iterable[Relationship] = ()):
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+        self.sources = array("I")
+        self.kinds = array("I")
+        self.targets = array("I")
+        # attribute key -> column of value ids, in first-seen key order
+        self.attribute_columns: Dict[str, array] = {}
+        # (row, key) -> value, for the rare attribute value that is not a string
+        self.objects: Dict[Tuple[int, str], Any] = {}
+        self.extend(relationships)
+
+    def intern(self, value: str) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            value = sys.intern(value)
+            self.strings.append(value)
+            self.string_ids[value] = string_id
+        return string_id
+
+    def append(self, relationship: Relationship):
+        row = len(self.sources)
+        self.sources.append(self.intern(relationship.source))
+        self.kinds.append(self.intern(relationship.relationship))
+        self.targets.append(self.intern(relationship.target))
+
+        attributes = relationship.attributes
+        for key in attributes:
+            if key not in self.attribute_columns:
+                self.attribute_columns[key] = array("I", bytes(4 * row))
+        for key, column in self.attribute_columns.items():
+            if key not in attributes:
+                column.append(ABSENT)
+                continue
+            value = attributes[key]
+            if isinstance(value, str):
+                column.append(self.intern(value) + 1)
+            else:
+                column.append(OBJECT)
+                self.objects[(row, key)] = value
+
+    def extend(self, relationships: Iterable[Relationship]):
+        for relationship in relationships:
+            self.append(relationship)
+
+    def row(self, index: int) -> Relationship:
+        strings = self.strings
+        attributes = {}
+        for key, column in self.attribute_columns.items():
+            value_id = column[index]
+            if value_id == ABSENT:
+                continue
+            if value_id == OBJECT:
+                attributes[key] = self.objects[(index, key)]
+            else:
+                attributes[key] = strings[value_id - 1]
+        return Relationship(
+            strings[self.sources[index]],
+            strings[self.kinds[index]],
+            strings[self.targets[index]],
+            attributes,
+        )
+
+    def to_tuples(self) -> List[Tuple[str, str, str, Dict[str, str]]]:
+        return [relationship.to_tuple() for relationship in self]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the table, including the string pool."""
+        columns = [self.sources, self.kinds, self.targets]
+        columns.extend(self.attribute_columns.values())
+        total = sum(sys.getsizeof(column) for column in columns)
+        total += sys.getsizeof(self.strings) + sys.getsizeof(self.string_ids)
+        total += sum(sys.getsizeof(string) for string in self.strings)
+        return total
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def __iter__(self) -> Iterator[Relationship]:
+        for index in range(len(self.sources)):
+            yield self.row(index)
+
+    @overload
+    def __getitem__(self, index: int) -> Relationship: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Relationship]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RelationshipTable index out of range")
+        return self.row(index)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (RelationshipTable, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            a == b for a, b in zip(self, other)
+        )
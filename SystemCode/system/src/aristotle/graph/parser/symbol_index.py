@@ -0,0 +1,143 @@
+import builtins
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from .dependency_index import package_module_name
+from .relationship import Relationship
+
+# Relationships whose targets are definitions made by the parsed module itself
+DEFINING_RELATIONSHIPS = ("CONTAINS", "HAS_METHOD", "HAS_FIELD")
+# Re-exports can chain through several __init__ modules, but not forever
+MAX_REEXPORT_DEPTH = 10
+BUILTIN_NAMES = frozenset(dir(builtins))
+
+
+class SymbolIndex:
+    """
+    Codebase-wide map from qualified names to the uuids the parser produced for them.
+
+    ASTTraverser only sees one module, so a base class becomes whatever string the
+    module refers to it by: the raw import path (`pkg.sub.Base`, without the codebase
+    prefix), a path through a package re-export (`pkg.Base` when `pkg/__init__.py`
+    does `from .sub import Base`), or `codebase.module.Base` for names that are not
+    imported at all. Once every module has been seen, the index resolves those
+    strings to the uuid of the actual definition.
+    """
+
+    def __init__(self, codebase_name: str):
+        self.codebase_name = codebase_name
+        # qualified name (uuid without the codebase prefix) -> uuid
+        self.definitions: Dict[str, str] = {}
+        # last two components of a qualified name -> qualified names, for suffix matches
+        self.suffixes: Dict[str, Set[str]] = defaultdict(set)
+        # module qualified name -> local name -> absolute name it was imported from
+        self.module_imports: Dict[str, Dict[str, str]] = {}
+
+    def add_definitions(self, relationships: Iterable[Relationship]):
+        for relationship in relationships:
+            if relationship.relationship in DEFINING_RELATIONSHIPS:
+                self.add_definition(relationship.target)
+
+    def add_definition(self, uuid: str):
+        prefix = f"{self.codebase_name}."
+        if not uuid.startswith(prefix):
+            return
+        qualified_name = uuid[len(prefix) :]
+        self.definitions[qualified_name] = uuid
+        self.suffixes[".".join(qualified_name.split(".")[-2:])].add(qualified_name)
+
+    def add_module(self, module_name: str, imports: Dict[str, str]):
+        self.module_imports[package_module_name(module_name)] = imports
+
+    def remove_modules(self, module_names: List[str]):
+        """
+        Forget the imports and definitions of modules about to be parsed again.
+        Definitions are found by their module prefix, so this relies on the settings
+        including module names in uuids.
+        """
+        prefixes = tuple(f"{module_name}." for module_name in module_names)
+        for module_name in module_names:
+            self.module_imports.pop(package_module_name(module_name), None)
+        if not prefixes:
+            return
+        for qualified_name in list(self.definitions):
+            if qualified_name.startswith(prefixes):
+                del self.definitions[qualified_name]
+                suffix = ".".join(qualified_name.split(".")[-2:])
+                self.suffixes[suffix].discard(qualified_name)
+
+    def to_dict(self) -> dict:
+        return {
+            "definitions": sorted(self.definitions),
+            "module_imports": self.module_imports,
+        }
+
+    @classmethod
+    def from_dict(cls, codebase_name: str, data: dict) -> "SymbolIndex":
+        index = cls(codebase_name)
+        for qualified_name in data["definitions"]:
+            index.add_definition(f"{codebase_name}.{qualified_name}")
+        index.module_imports = data["module_imports"]
+        return index
+
+    def is_definition(self, uuid: str) -> bool:
+        prefix = f"{self.codebase_name}."
+        return uuid.startswith(prefix) and uuid[len(prefix) :] in self.definitions
+
+    def resolve(self, target: str) -> Optional[str]:
+        """Uuid of the definition `target` refers to, None if it is not in the codebase."""
+        return self.resolve_name(target, MAX_REEXPORT_DEPTH)
+
+    def resolve_name(self, name: str, depth: int) -> Optional[str]:
+        if depth < 0:
+            return None
+        if name in self.definitions:
+            return self.definitions[name]
+        if name.startswith(f"{self.codebase_name}."):
+            name = name[len(self.codebase_name) + 1 :]
+            if name in self.definitions:
+                return self.definitions[name]
+
+        # Names re-exported by the module they are imported from
+        if "." in name:
+            module_name, local_name = name.rsplit(".", 1)
+            imports = self.find_module_imports(module_name)
+            if imports is not None and local_name in imports:
+                return self.resolve_name(imports[local_name], depth - 1)
+
+        # The codebase may live under a directory (e.g. `src/`) that is not part of
+        # the import path, so accept a unique definition ending with the name
+        candidates = [
+            qualified_name
+            for qualified_name in self.suffixes.get(
+                ".".join(name.split(".")[-2:]), ()
+            )
+            if qualified_name.endswith(f".{name}")
+        ]
+        if len(candidates) == 1:
+            return self.definitions[candidates[0]]
+        return None
+
+    def find_module_imports(self, module_name: str) -> Optional[Dict[str, str]]:
+        if module_name in self.module_imports:
+            return self.module_imports[module_name]
+        candidates = [
+            name for name in self.module_imports if name.endswith(f".{module_name}")
+        ]
+        if len(candidates) == 1:
+            return self.module_imports[candidates[0]]
+        return None
+
+    def resolve_base(self, target: str) -> str:
+        """
+        Canonical target of an INHERITS relationship: the defining uuid when the base
+        is in the codebase, `builtins.Name` for builtins that ASTTraverser qualified with
+        the module, otherwise the target unchanged.
+        """
+        resolved = self.resolve(target)
+        if resolved is not None:
+            return resolved
+        *_, name = target.rsplit(".", 1)
+        if name in BUILTIN_NAMES and target.startswith(f"{self.codebase_name}."):
+            return f"builtins.{name}"
+        return target
@@ -0,0 +1,66 @@
+from typing import Dict, Optional
+
+
+class Scope:
+    __slots__ = ("kind", "name", "parent", "symbols")
+
+    def __init__(self, kind: str, name: str, parent: Optional["Scope"] = None):
+        """
+        Args:
+            kind: One of "module", "class" or "function"
+            name: Name of the module, class or function owning this scope
+            parent: Enclosing scope, None for the module scope
+        """
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.symbols: Dict[str, str] = {}
+
+
+class SymbolTable:
+    """
+    Chained module -> class -> function scopes mapping names to their inferred types.
+
+    The table is shared with the TypeInferrer, which reads it live, so entering or
+    leaving a scope is O(1) instead of copying every known name into a new dict.
+    """
+
+    def __init__(self):
+        self.imports: Dict[str, str] = {}
+        self.module = Scope("module", "")
+        self.current = self.module
+
+    @property
+    def global_vars(self) -> Dict[str, str]:
+        return self.module.symbols
+
+    def push(self, kind: str, name: str) -> Scope:
+        self.current = Scope(kind, name, self.current)
+        return self.current
+
+    def pop(self) -> Scope:
+        scope = self.current
+        assert scope.parent is not None, "Cannot pop the module scope"
+        self.current = scope.parent
+        return scope
+
+    def declare(self, name: str, type_name: str):
+        self.current.symbols[name] = type_name
+
+    def lookup_local(self, name: str) -> Optional[str]:
+        """Look a name up in the enclosing function scopes, class bodies are skipped as in Python."""
+        scope: Optional[Scope] = self.current
+        while scope is not None and scope.kind != "module":
+            if scope.kind == "function" and name in scope.symbols:
+                return scope.symbols[name]
+            scope = scope.parent
+        return None
+
+    def lookup_global(self, name: str) -> Optional[str]:
+        return self.module.symbols.get(name)
+
+    def lookup(self, name: str) -> Optional[str]:
+        local = self.lookup_local(name)
+        if local is not None:
+            return local
+        return self.lookup_global(name)
@@ -1,5 +1,7 @@
 import ast
-from typing import Any, Dict
+from typing import Any
+
+from .symbol_table import SymbolTable
 
 common_callers = {
     "int": "int",
@@ -17,15 +19,9 @@ common_callers = {
 
 
 class TypeInferrer:
-    def __init__(
-        self,
-        function_params: Dict[str, str],
-        global_vars: Dict[str, str],
-        imports: Dict[str, str],
-    ):
-        self.function_params = function_params
-        self.global_vars = global_vars
-        self.imports = imports
+    def __init__(self, symbols: SymbolTable):
+        self.symbols = symbols
+        self.imports = symbols.imports
 
     def infer_type_from_value(self, node: ast.AST) -> str:
         if isinstance(node, ast.Constant):
@@ -81,11 +77,7 @@ class TypeInferrer:
         return "Any"
 
     def _infer_from_name(self, node: ast.Name) -> str:
-        if node.id in self.function_params:
-            return self.function_params[node.id]
-        if node.id in self.global_vars:
-            return self.global_vars[node.id]
-        return node.id
+        return self.symbols.lookup(node.id) or node.id
 
     def _infer_from_call(self, node: ast.Call) -> str:
         if isinstance(node.func, ast.Name):
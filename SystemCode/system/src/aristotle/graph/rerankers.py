@@ -0,0 +1,68 @@
+import threading
+from typing import List, Optional, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+# How GraphDatabase.search orders the candidates of the hybrid (BM25 + cosine) search:
+# - rrf: reciprocal rank fusion of the two result lists, no model call at all
+# - cosine: cosine similarity of the query and the stored fact embeddings
+# - cross_encoder: a small cross-encoder run locally on CPU
+# - llm: graphiti's cross-encoder backed by the Ollama chat model, the slowest
+RERANK_STRATEGIES = ("rrf", "cosine", "cross_encoder", "llm")
+
+
+def rank_by_scores(items: Sequence[T], scores: Sequence[Optional[float]]) -> List[T]:
+    """
+    Items by descending score. Items without a score, e.g. facts a structure-first
+    load has not embedded yet, keep their order after the scored ones.
+    """
+    scored = sorted(
+        (i for i, score in enumerate(scores) if score is not None),
+        key=lambda i: -scores[i],  # type: ignore
+    )
+    unscored = [i for i, score in enumerate(scores) if score is None]
+    return [items[i] for i in scored + unscored]
+
+
+def cosine_scores(
+    query_vector: Sequence[float], embeddings: Sequence[Optional[Sequence[float]]]
+) -> List[Optional[float]]:
+    """Cosine similarity of the query to each embedding, None where it is missing."""
+    present = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+    scores: List[Optional[float]] = [None] * len(embeddings)
+    if not present:
+        return scores
+
+    matrix = np.array([embeddings[i] for i in present], dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    similarities = matrix @ query / np.where(norms == 0, 1, norms)
+    for i, similarity in zip(present, similarities.tolist()):
+        scores[i] = similarity
+    return scores
+
+
+class LocalCrossEncoder:
+    """
+    Small sentence-transformers cross-encoder on CPU, loaded on first use so servers
+    that never rerank with it do not pay for loading torch.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.model = None
+        self.lock = threading.Lock()
+
+    def scores(self, query: str, texts: List[str]) -> List[float]:
+        with self.lock:
+            if self.model is None:
+                # Installed with graphiti-core[sentence-transformers]
+                from sentence_transformers import CrossEncoder
+
+                print(f"[INFO] Loading cross-encoder '{self.model_name}'")
+                self.model = CrossEncoder(self.model_name, device="cpu")
+        if not texts:
+            return []
+        return self.model.predict([(query, text) for text in texts]).tolist()
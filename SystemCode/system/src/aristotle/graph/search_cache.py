@@ -0,0 +1,149 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+def normalize_query(query: str) -> str:
+    """
+    Query with whitespace collapsed and trailing punctuation dropped. Case is kept,
+    the exact name search matches symbols like `Dog` case-sensitively.
+    """
+    return " ".join(query.split()).rstrip("?!. ")
+
+
+class SearchCache:
+    """
+    In-process LRU cache of search results with a time to live. Entries are
+    invalidated by codebase: writing to a codebase drops the searches of it and the
+    searches of every codebase (group_ids None).
+
+    A search that was running while its codebases were written to does not store its
+    result, which may predate the write, see `generation` and `put`.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Args:
+            max_entries: Least recently used entries beyond this are evicted, 0
+                disables the cache
+            ttl_seconds: Entries older than this are searched again, e.g. to pick up
+                embeddings backfilled by another process
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (stored at, group_ids, size in bytes, results)
+        self.entries: OrderedDict[Hashable, Tuple[float, Optional[tuple], int, Any]] = (
+            OrderedDict()
+        )
+        # codebase -> keys of the entries searching it
+        self.keys_by_group: Dict[str, set] = {}
+        self.keys_of_all_groups: set = set()
+        # Bumped by every invalidation of a codebase, and of any codebase
+        self.group_generations: Dict[str, int] = {}
+        self.all_generation = 0
+        self.lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(
+        query: str, group_ids: Optional[List[str]], top_k: int, rerank: str
+    ) -> Hashable:
+        groups = None if group_ids is None else tuple(sorted(set(group_ids)))
+        return (normalize_query(query), groups, top_k, rerank)
+
+    def generation(self, group_ids: Optional[List[str]]) -> Hashable:
+        """Snapshot to pass to `put`, taken before searching."""
+        with self.lock:
+            if group_ids is None:
+                return self.all_generation
+            groups = sorted(set(group_ids))
+            return tuple(self.group_generations.get(g, 0) for g in groups)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.monotonic() - entry[0] > self.ttl_seconds:
+                self.remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, key: Hashable, results: Any, generation: Hashable):
+        """Store results, unless their codebases were written to since `generation`."""
+        if self.max_entries <= 0:
+            return
+        groups: Optional[tuple] = key[1]  # type: ignore
+        size = len(pickle.dumps(results))
+        with self.lock:
+            current = (
+                self.all_generation
+                if groups is None
+                else tuple(self.group_generations.get(g, 0) for g in groups)
+            )
+            if current != generation:
+                return
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (time.monotonic(), groups, size, results)
+            self.total_bytes += size
+            if groups is None:
+                self.keys_of_all_groups.add(key)
+            else:
+                for group in groups:
+                    self.keys_by_group.setdefault(group, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, group_id: str):
+        """Drop the searches a write to this codebase may change."""
+        with self.lock:
+            generation = self.group_generations.get(group_id, 0)
+            self.group_generations[group_id] = generation + 1
+            self.all_generation += 1
+            keys = self.keys_by_group.pop(group_id, set()) | self.keys_of_all_groups
+            for key in keys:
+                if key in self.entries:
+                    self.remove(key)
+                    self.invalidations += 1
+
+    def remove(self, key: Hashable):
+        """Drop an entry, with the lock held."""
+        _, groups, size, _ = self.entries.pop(key)
+        self.total_bytes -= size
+        if groups is None:
+            self.keys_of_all_groups.discard(key)
+            return
+        for group in groups:
+            keys = self.keys_by_group.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_group[group]
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
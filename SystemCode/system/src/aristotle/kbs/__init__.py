@@ -1 +1,2 @@
 from .query_filter import filter_docs_search, filter_graph_search
+from .codebase_router import merge_routed, route_codebases
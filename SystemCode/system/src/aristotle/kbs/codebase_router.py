@@ -0,0 +1,79 @@
+import difflib
+import re
+from typing import Callable, Hashable, Iterable, List, Optional, Sequence, TypeVar
+
+# Words of a query that may name a codebase, e.g. `scikit-learn` or `numpy.linalg`
+WORD_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.\-]*")
+MIN_WORD_LENGTH = 3
+
+T = TypeVar("T")
+
+
+def normalize_name(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def route_codebases(
+    query: str,
+    codebases: Iterable[str],
+    codebase: Optional[str] = None,
+    cutoff: float = 0.8,
+) -> List[str]:
+    """
+    Codebases a search is about, matching the codebase names against the explicitly
+    given `codebase`, or else against the words of the query. Names are compared
+    without case and punctuation, so `Scikit Learn`, `scikit_learn` and `scikit-learn`
+    all route to `scikit-learn`. The given `codebase` is also matched fuzzily
+    (difflib) when nothing matches exactly, so a typo like `pandsa` still routes to
+    `pandas`. Words of the query are not, ordinary words like `transform` or `type`
+    are close to names like `transformers` or `typer`.
+
+    Args:
+        codebases: Names of the loaded codebases
+        codebase: Codebase name given along with the query, if any
+        cutoff: Minimum difflib similarity ratio of a match
+
+    Returns:
+        Matching codebase names, empty when the query names none of them and every
+        codebase should be searched
+    """
+    by_normalized: dict[str, List[str]] = {}
+    for name in codebases:
+        by_normalized.setdefault(normalize_name(name), []).append(name)
+
+    if codebase:
+        candidates = [normalize_name(codebase)]
+    else:
+        words = [normalize_name(word) for word in WORD_PATTERN.findall(query)]
+        # Adjacent words too, for names written apart like `scikit learn`
+        candidates = words + [a + b for a, b in zip(words, words[1:])]
+
+    candidates = [c for c in candidates if len(c) >= MIN_WORD_LENGTH]
+    matched = set()
+    for candidate in candidates:
+        matched.update(by_normalized.get(candidate, ()))
+    if matched or not codebase:
+        return sorted(matched)
+
+    for normalized in difflib.get_close_matches(
+        candidates[0] if candidates else "", by_normalized, n=3, cutoff=cutoff
+    ):
+        matched.update(by_normalized[normalized])
+    return sorted(matched)
+
+
+def merge_routed(
+    routed: Sequence[T], unscoped: Sequence[T], key: Callable[[T], Hashable]
+) -> List[T]:
+    """
+    Results of the codebases routed to from the words of a query first, then those of
+    the search of every codebase. A word may name a codebase by accident, e.g. `click`
+    or `requests`, so the codebase the query is about is not left out.
+    """
+    seen = set()
+    merged = []
+    for result in [*routed, *unscoped]:
+        if key(result) not in seen:
+            seen.add(key(result))
+            merged.append(result)
+    return merged
@@ -17,16 +17,58 @@ ollama_llm_small_model = os.environ.get("OLLAMA_LLM_SMALL_MODEL", ollama_llm_mai
 ollama_embedding_model = os.environ.get(
     "OLLAMA_EMBEDDING_MODEL", "nomic-embed-text:latest"
 )
+embedding_dim = int(os.environ.get("EMBEDDING_DIM", 768))
 llm_temperature = float(os.environ.get("LLM_TEMPERATURE", 0.3))
 
 git_clone_dir = os.environ.get("GIT_CLONE_DIR", "./.cloned")
 faiss_data_dir = os.environ.get("FAISS_DATA_DIR", "./.index")
+parse_cache_dir = os.environ.get("PARSE_CACHE_DIR", "./.parse_cache")
+parse_cache_max_mb = int(os.environ.get("PARSE_CACHE_MAX_MB", 1024))
+embedding_cache_file = os.environ.get(
+    "EMBEDDING_CACHE_FILE", "./.embedding_cache/embeddings.sqlite3"
+)
+embedding_cache_max_mb = int(os.environ.get("EMBEDDING_CACHE_MAX_MB", 1024))
+dependency_index_dir = os.environ.get("DEPENDENCY_INDEX_DIR", "./.dependency_index")
+discovery_max_file_kb = int(os.environ.get("DISCOVERY_MAX_FILE_KB", 2048))
+discovery_exclude_dirs = os.environ.get(
+    "DISCOVERY_EXCLUDE_DIRS",
+    "site-packages,node_modules,vendor,vendored,_vendor,third_party,venv,__pycache__",
+).split(",")
 
 system_prompt_file = os.environ.get("SYSTEM_PROMPT_FILE", "system_prompt.txt")
 top_k_graph_search = int(os.environ.get("TOP_K_GRAPH_SEARCH", 7))
 top_k_vector_search = int(os.environ.get("TOP_K_VECTOR_SEARCH", 3))
+search_rerank = os.environ.get("SEARCH_RERANK", "rrf")
+rerank_candidates = int(os.environ.get("RERANK_CANDIDATES", 4))
+local_cross_encoder_model = os.environ.get(
+    "LOCAL_CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+)
+exact_match_max_nodes = int(os.environ.get("EXACT_MATCH_MAX_NODES", 5))
+exact_match_max_edges = int(os.environ.get("EXACT_MATCH_MAX_EDGES", 30))
+search_cache_max_entries = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 1024))
+search_cache_ttl_seconds = float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", 600))
+name_index_ttl_seconds = float(os.environ.get("NAME_INDEX_TTL_SECONDS", 600))
 
 pool_max_workers = int(os.environ.get("POOL_MAX_WORKERS", 1))
+parser_max_workers = int(os.environ.get("PARSER_MAX_WORKERS", os.cpu_count() or 1))
+ingest_batch_items = int(os.environ.get("INGEST_BATCH_ITEMS", 2000))
+ingest_queue_size = int(os.environ.get("INGEST_QUEUE_SIZE", 4))
+ingest_embed_concurrency = int(os.environ.get("INGEST_EMBED_CONCURRENCY", 2))
+structure_first_load = bool(os.environ.get("STRUCTURE_FIRST_LOAD") == "true")
+backfill_chunk_size = int(os.environ.get("BACKFILL_CHUNK_SIZE", 256))
+backfill_concurrency = int(os.environ.get("BACKFILL_CONCURRENCY", 1))
+backfill_pause_seconds = float(os.environ.get("BACKFILL_PAUSE_SECONDS", 0.1))
+group_delete_batch_size = int(os.environ.get("GROUP_DELETE_BATCH_SIZE", 5000))
+group_delete_pause_seconds = float(os.environ.get("GROUP_DELETE_PAUSE_SECONDS", 0.1))
+graph_write_batch_size = int(os.environ.get("GRAPH_WRITE_BATCH_SIZE", 500))
+embedding_batch_size = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))
+embedding_max_batch_size = int(os.environ.get("EMBEDDING_MAX_BATCH_SIZE", 256))
+embedding_concurrency = int(os.environ.get("EMBEDDING_CONCURRENCY", 4))
+embedding_target_latency = float(os.environ.get("EMBEDDING_TARGET_LATENCY", 2.0))
+parser_profile = os.environ.get("PARSER_PROFILE", "full")
+parse_max_source_kb = int(os.environ.get("PARSE_MAX_SOURCE_KB", 1024))
+parse_max_ast_nodes = int(os.environ.get("PARSE_MAX_AST_NODES", 250_000))
+parse_max_seconds = float(os.environ.get("PARSE_MAX_SECONDS", 60))
 loaded_codebases_file = os.environ.get("LOADED_CODEBASES_FILE", "loaded_codebases.json")
 
 ollama_llm_eval_model = os.environ.get("OLLAMA_LLM_EVAL_MODEL", "qwen3:8b")
@@ -0,0 +1,160 @@
+import os
+from typing import Iterable, List, Optional, Tuple
+
+import pygit2
+
+from .. import project_config
+
+# Only the head of a file is read to look for these markers
+GENERATED_MARKERS = (
+    "@generated",
+    "generated by the protocol buffer compiler",
+    "autogenerated by",
+    "auto-generated by",
+    "this file was automatically generated",
+)
+# Only as the first line, hand-written modules say "DO NOT EDIT below this line" too
+GENERATED_FIRST_LINE_MARKER = "do not edit"
+GENERATED_SUFFIXES = ("_pb2.py", "_pb2_grpc.py", "_pb2.pyi")
+GENERATED_HEAD_BYTES = 1024
+
+
+class FileListing:
+    """
+    Files of a codebase found by a single walk, shared by the parser and the docs loader.
+    Paths are relative to `root` and always use "/" as separator.
+    """
+
+    def __init__(self, root: str, paths: List[str], skipped: List[Tuple[str, str]]):
+        """
+        Args:
+            root: Directory the listing was made from
+            paths: Relative paths of the kept files, in walk or git index order
+            skipped: (relative path, reason) of files dropped as too large or generated
+        """
+        self.root = root
+        self.paths = paths
+        self.skipped = skipped
+
+    def with_suffixes(self, suffixes: Tuple[str, ...]) -> List[str]:
+        return [path for path in self.paths if path.endswith(suffixes)]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+
+def is_excluded_dir(dir_name: str, exclude_dirs: Iterable[str]) -> bool:
+    return (
+        dir_name.startswith(".")
+        or dir_name in exclude_dirs
+        or dir_name.endswith(".egg-info")
+    )
+
+
+def is_generated(file_path: str) -> bool:
+    """Detect generated Python modules, e.g. protobuf stubs, by name or header comment."""
+    if file_path.endswith(GENERATED_SUFFIXES):
+        return True
+    if not file_path.endswith(".py"):
+        return False
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(GENERATED_HEAD_BYTES)
+    except OSError:
+        return False
+    head_text = head.decode("utf-8", errors="ignore").lower()
+    first_line = head_text.split("\n", 1)[0]
+    if first_line.startswith("#") and GENERATED_FIRST_LINE_MARKER in first_line:
+        return True
+    return any(marker in head_text for marker in GENERATED_MARKERS)
+
+
+def list_git_index(root: str) -> Optional[List[str]]:
+    """
+    Relative paths of the files tracked in the git index when `root` is the work tree
+    of a repository (e.g. one cloned by clone_git_repository), otherwise None.
+    Ignored and untracked files are never in the index, so .gitignore rules apply.
+    """
+    repo_path = pygit2.discover_repository(root)
+    if repo_path is None:
+        return None
+    repo = pygit2.Repository(repo_path)
+    if repo.workdir is None or os.path.realpath(repo.workdir) != os.path.realpath(
+        root
+    ):
+        return None
+    return [
+        entry.path for entry in repo.index if entry.mode != pygit2.enums.FileMode.LINK
+    ]
+
+
+def walk_files(root: str, exclude_dirs: Iterable[str]) -> List[str]:
+    paths = []
+    for root_path, dir_names, file_names in os.walk(root):
+        dir_names[:] = sorted(
+            d for d in dir_names if not is_excluded_dir(d, exclude_dirs)
+        )
+        relative_root = os.path.relpath(root_path, root).replace(os.sep, "/")
+        for file_name in sorted(file_names):
+            if relative_root == ".":
+                paths.append(file_name)
+            else:
+                paths.append(f"{relative_root}/{file_name}")
+    return paths
+
+
+def discover_files(
+    root: str,
+    suffixes: Tuple[str, ...] = (".py", ".ipynb", ".md"),
+    max_file_bytes: Optional[int] = None,
+    exclude_dirs: Optional[Iterable[str]] = None,
+    use_git_index: bool = True,
+) -> FileListing:
+    """
+    List the files of a codebase worth loading.
+
+    Args:
+        root: Root directory of the codebase
+        suffixes: File extensions to keep
+        max_file_bytes: Larger files are skipped, defaults to
+            project_config.discovery_max_file_kb
+        exclude_dirs: Directory names to skip anywhere in the tree (vendored code, build
+            outputs, virtualenvs), defaults to project_config.discovery_exclude_dirs
+        use_git_index: Whether to list tracked files from the git index when `root`
+            is inside a git work tree, instead of walking the file system
+    """
+    if max_file_bytes is None:
+        max_file_bytes = project_config.discovery_max_file_kb * 1024
+    exclude_dirs = set(
+        project_config.discovery_exclude_dirs if exclude_dirs is None else exclude_dirs
+    )
+
+    candidates = list_git_index(root) if use_git_index else None
+    if candidates is None:
+        candidates = walk_files(root, exclude_dirs)
+    else:
+        candidates = sorted(
+            path
+            for path in candidates
+            if not any(
+                is_excluded_dir(part, exclude_dirs) for part in path.split("/")[:-1]
+            )
+        )
+
+    paths = []
+    skipped = []
+    for path in candidates:
+        if not path.endswith(suffixes):
+            continue
+        file_path = os.path.join(root, path)
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            continue
+        if size > max_file_bytes:
+            skipped.append((path, f"larger than {max_file_bytes} bytes"))
+        elif is_generated(file_path):
+            skipped.append((path, "generated"))
+        else:
+            paths.append(path)
+    return FileListing(root, paths, skipped)
@@ -1,6 +1,7 @@
 import json
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Callable, Dict, List, Optional
 
 import faiss
 import frontmatter
@@ -8,6 +9,8 @@ import numpy as np
 from langchain_ollama import OllamaEmbeddings
 
 from .. import project_config
+from ..embedding_cache import get_embedding_cache
+from ..repository_loader.file_discovery import FileListing, discover_files
 from .chunk import split_markdown
 
 
@@ -16,14 +19,34 @@ class Encoder:
         self.model_name = model_name or project_config.ollama_embedding_model
         base_url = project_config.ollama_base_url.rstrip("/api").rstrip("/")
         self.embeddings = OllamaEmbeddings(model=self.model_name, base_url=base_url)
+        # Shared with the graph ingestion, README chunks repeat across reloads and repos
+        self.cache = get_embedding_cache()
 
     def encode_string(self, text: str) -> np.ndarray:
-        embedding = self.embeddings.embed_query(text)
-        return np.array([embedding], dtype=np.float32)
+        return self.encode_cached(
+            [text], lambda texts: [self.embeddings.embed_query(texts[0])]
+        )
 
     def encode_list(self, texts: List[str]) -> np.ndarray:
-        embeddings = self.embeddings.embed_documents(texts)
-        return np.array(embeddings, dtype=np.float32)
+        return self.encode_cached(texts, self.embeddings.embed_documents)
+
+    def encode_cached(
+        self, texts: List[str], embed: Callable[[List[str]], List[List[float]]]
+    ) -> np.ndarray:
+        """Embeddings of `texts` from the cache, calling `embed` for the missing ones."""
+        if self.cache is None:
+            return np.array(embed(texts), dtype=np.float32)
+
+        dim = project_config.embedding_dim
+        results = self.cache.get_many(self.model_name, dim, texts)
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            embeddings = embed(missing_texts)
+            self.cache.put_many(self.model_name, dim, missing_texts, embeddings)
+            for i, embedding in zip(missing, embeddings):
+                results[i] = embedding
+        return np.array(results, dtype=np.float32)
 
 
 def build_index(embeddings, dim, index_path):
@@ -56,17 +79,24 @@ def load_index(index_path, meta_path):
     return index, meta
 
 
-def search(index, meta, query_embedding, k):
-    scores, ids = index.search(query_embedding, k)
+def search(index, meta, query_embedding, k, params=None):
+    scores, ids = index.search(query_embedding, k, params=params)
     results = []
     for score, idx in zip(scores[0], ids[0]):
-        if idx < len(meta):
+        # faiss pads with -1 when fewer than k vectors pass the selector
+        if 0 <= idx < len(meta):
             m = meta[idx].copy()
             m["score"] = float(score)
             results.append(m)
     return results
 
 
+def chunk_group_id(meta: Dict[str, Any]) -> str:
+    # Chunks loaded before loads were versioned belong to the group named after the
+    # codebase, like its graph
+    return meta.get("group_id", meta.get("codebase", ""))
+
+
 def enrich_chunk_with_context(chunk: str, codebase_name: str, reference: str) -> str:
     context_header = f"[Codebase: {codebase_name}] [File: {reference}]\n\n"
     return context_header + chunk
@@ -79,12 +109,24 @@ class DocumentationsDatabase:
         self.meta_path = f"{project_config.faiss_data_dir}/meta.json"
         self.index = None
         self.meta = None
+        # group -> index ids of its chunks, built on the first scoped search
+        self.ids_by_group: Optional[Dict[str, List[int]]] = None
+        # Held while the index files are rewritten, loads and deletes run in threads
+        self.lock = threading.Lock()
         if os.path.exists(self.index_path) and os.path.exists(self.meta_path):
             self.refresh_index()
 
     def search(
-        self, query: str, top_k: int = project_config.top_k_vector_search
+        self,
+        query: str,
+        top_k: int = project_config.top_k_vector_search,
+        group_ids: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
+        """
+        Args:
+            group_ids: Only search the chunks of these groups, e.g. the active versions
+                of codebases from search_group_ids, all of them when None
+        """
         if not os.path.exists(self.index_path) or not os.path.exists(self.meta_path):
             return [{"info": "Vector DB is empty", "metadata": {}}]
 
@@ -97,7 +139,13 @@ class DocumentationsDatabase:
                 encoded_query, axis=1, keepdims=True
             )
 
-            results = search(self.index, self.meta, normalized_query, top_k)
+            params = None
+            if group_ids is not None:
+                ids = self.group_chunk_ids(group_ids)
+                if len(ids) == 0:
+                    return []
+                params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(ids))
+            results = search(self.index, self.meta, normalized_query, top_k, params)
             results.sort(key=lambda x: x.get("score", 0), reverse=True)
         except Exception as e:
             print("[ERROR] while searching docs:", e)
@@ -106,6 +154,42 @@ class DocumentationsDatabase:
 
     def refresh_index(self):
         self.index, self.meta = load_index(self.index_path, self.meta_path)
+        self.ids_by_group = None
+
+    def group_chunk_ids(self, group_ids: List[str]) -> np.ndarray:
+        """Index ids of the chunks of the given groups."""
+        if self.ids_by_group is None:
+            ids_by_group: Dict[str, List[int]] = {}
+            for i, meta in enumerate(self.meta or []):
+                ids_by_group.setdefault(chunk_group_id(meta), []).append(i)
+            self.ids_by_group = ids_by_group
+        ids = [i for group_id in group_ids for i in self.ids_by_group.get(group_id, [])]
+        return np.array(ids, dtype=np.int64)
+
+    def delete_group(self, group_id: str) -> int:
+        """
+        Remove the chunks of a group, e.g. of a retired version of a codebase.
+
+        Returns:
+            Number of chunks removed
+        """
+        with self.lock:
+            if not os.path.exists(self.index_path) or not os.path.exists(
+                self.meta_path
+            ):
+                return 0
+            index, meta = load_index(self.index_path, self.meta_path)
+            ids = [i for i, m in enumerate(meta) if chunk_group_id(m) == group_id]
+            if not ids:
+                return 0
+            index.remove_ids(np.array(ids, dtype=np.int64))
+            removed = set(ids)
+            faiss.write_index(index, self.index_path)
+            save_metas(
+                [m for i, m in enumerate(meta) if i not in removed], self.meta_path
+            )
+            self.refresh_index()
+        return len(ids)
 
     def load_file(
         self,
@@ -113,7 +197,12 @@ class DocumentationsDatabase:
         codebase_name: str,
         reference: Optional[str] = None,
         append: bool = True,
+        group_id: Optional[str] = None,
     ) -> int:
+        """
+        Args:
+            group_id: Version of the codebase the chunks belong to, see load_dir
+        """
         if not file_path.endswith(".md"):
             return 0
 
@@ -137,6 +226,7 @@ class DocumentationsDatabase:
             all_metas = [
                 {
                     "codebase": codebase_name,
+                    "group_id": group_id or codebase_name,
                     "reference": reference,
                     "text": chunk,
                     "enriched_text": enriched_chunk,
@@ -145,27 +235,7 @@ class DocumentationsDatabase:
             ]
 
             X = self.encoder.encode_list(enriched_chunks)
-
-            if (
-                append
-                and os.path.exists(self.index_path)
-                and os.path.exists(self.meta_path)
-            ):
-                existing_index, existing_meta = load_index(
-                    self.index_path, self.meta_path
-                )
-
-                normalized_embeddings = X / np.linalg.norm(X, axis=1, keepdims=True)
-                existing_index.add(normalized_embeddings)
-                faiss.write_index(existing_index, self.index_path)
-
-                existing_meta.extend(all_metas)
-                save_metas(existing_meta, self.meta_path)
-            else:
-                build_index(X, X.shape[1], self.index_path)
-                save_metas(all_metas, self.meta_path)
-
-            self.refresh_index()
+            self.save_chunks(X, all_metas, append)
             return 1
         except:
             return 0
@@ -177,51 +247,65 @@ class DocumentationsDatabase:
         reference_prefix: str = "",
         print_progress=False,
         append: bool = True,
+        listing: Optional[FileListing] = None,
+        group_id: Optional[str] = None,
     ) -> int:
+        """
+        Args:
+            listing: Files found by discover_files, shared with the parser so the tree
+                is only walked once, discovered here when not given
+            group_id: Version of the codebase the chunks belong to, like the group of
+                its graph, so a reload does not add to the chunks of the previous one.
+                The codebase name when None.
+        """
+        if listing is None:
+            listing = discover_files(codebase_path, suffixes=(".md",))
+
         all_chunks, all_metas = [], []
         file_count = 0
-        for root_path, dir_names, file_names in os.walk(codebase_path):
-            dir_names[:] = [d for d in dir_names if not d.startswith(".")]
-            for file_name in file_names:
-                if not file_name.endswith(".md"):
+        for path in listing.with_suffixes((".md",)):
+            *dir_names, file_name = path.split("/")
+            file_path = os.path.join(codebase_path, *dir_names, file_name)
+            reference = f"{reference_prefix}{'/'.join(dir_names)}/{file_name}"
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    raw = f.read()
+                metadata, text = frontmatter.parse(raw)
+                metadata = metadata or {}
+                parts = split_markdown(text, codebase_name, reference)
+                if not parts:
                     continue
-                file_path = os.path.join(root_path, file_name)
-                reference = (
-                    f"{reference_prefix}{root_path[len(codebase_path)+1:]}/{file_name}"
-                )
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        raw = f.read()
-                    metadata, text = frontmatter.parse(raw)
-                    metadata = metadata or {}
-                    parts = split_markdown(text, codebase_name, reference)
-                    if not parts:
-                        continue
-
-                    enriched_chunks = [
-                        enrich_chunk_with_context(chunk, codebase_name, reference)
-                        for chunk in parts
-                    ]
 
-                    all_chunks.extend(enriched_chunks)
-                    all_metas.extend(
-                        [
-                            {
-                                "codebase": codebase_name,
-                                "reference": reference,
-                                "text": chunk,
-                                "enriched_text": enriched_chunk,
-                            }
-                            for chunk, enriched_chunk in zip(parts, enriched_chunks)
-                        ]
-                    )
-                    file_count += 1
-                except:
-                    pass
+                enriched_chunks = [
+                    enrich_chunk_with_context(chunk, codebase_name, reference)
+                    for chunk in parts
+                ]
+
+                all_chunks.extend(enriched_chunks)
+                all_metas.extend(
+                    [
+                        {
+                            "codebase": codebase_name,
+                            "group_id": group_id or codebase_name,
+                            "reference": reference,
+                            "text": chunk,
+                            "enriched_text": enriched_chunk,
+                        }
+                        for chunk, enriched_chunk in zip(parts, enriched_chunks)
+                    ]
+                )
+                file_count += 1
+            except:
+                pass
 
         if all_chunks:
             X = self.encoder.encode_list(all_chunks)
+            self.save_chunks(X, all_metas, append)
+        return file_count
 
+    def save_chunks(self, X: np.ndarray, metas: List[Dict[str, Any]], append: bool):
+        """Add chunks to the index files, or replace them unless `append`."""
+        with self.lock:
             if (
                 append
                 and os.path.exists(self.index_path)
@@ -235,11 +319,10 @@ class DocumentationsDatabase:
                 existing_index.add(normalized_embeddings)
                 faiss.write_index(existing_index, self.index_path)
 
-                existing_meta.extend(all_metas)
+                existing_meta.extend(metas)
                 save_metas(existing_meta, self.meta_path)
             else:
                 build_index(X, X.shape[1], self.index_path)
-                save_metas(all_metas, self.meta_path)
+                save_metas(metas, self.meta_path)
 
             self.refresh_index()
-        return file_count
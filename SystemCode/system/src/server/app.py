@@ -1,3 +1,4 @@
+import asyncio
 import tempfile
 from typing import Any, Dict
 
@@ -9,6 +10,8 @@ from aristotle.graph.parser.parser_settings import ParserSettings
 
 from ..aristotle import project_config
 from ..aristotle.agent import AristotleAgent, docs_db, graph_db
+from ..aristotle.agent.load_tools import resume_retired_deletes
+from ..aristotle.agent.loaded_codebases import codebase_group_id
 from ..aristotle.graph.parser import CodebaseParser
 from .request_types import *
 
@@ -33,6 +36,8 @@ async def startup_event():
     print("[INFO] Server is starting up...")
     print(f"[INFO] LLM model for agent: {project_config.ollama_llm_main_model}")
     await graph_db.setup()
+    # Old versions of reloaded codebases the last run did not finish deleting
+    resume_retired_deletes(asyncio.get_running_loop())
 
 
 async def shutdown_event():
@@ -63,6 +68,16 @@ async def index():
     )
 
 
+@app.get("/stats")
+async def stats() -> JSONResponse:
+    embedding_cache = graph_db.embedding_batcher.cache
+    payload = {
+        "search_cache": graph_db.search_cache.stats(),
+        "embedding_cache": None if embedding_cache is None else embedding_cache.stats(),
+    }
+    return JSONResponse(content=payload, status_code=200)
+
+
 def log_response(payload: Dict[str, Any], status_code: int = 200) -> None:
     print(f"[RESPONSE {status_code}] {payload}")
 
@@ -104,9 +119,16 @@ async def load_file(load_request: LoadFileRequest) -> JSONResponse:
                     load_request.file_path,
                     load_request.file_path,
                 )
-                await graph_db.insert_parser_results(parser)
+                await graph_db.insert_parser_results(
+                    parser,
+                    group_id=codebase_group_id(load_request.codebase_name),
+                )
             elif file.name.endswith(".md"):
-                docs_db.load_file(file.path, load_request.codebase_name)
+                docs_db.load_file(
+                    file.path,
+                    load_request.codebase_name,
+                    group_id=codebase_group_id(load_request.codebase_name),
+                )
 
         payload = {
             "message": f"File {load_request.file_path} loaded successfully",
@@ -1,9 +1,18 @@
+import json
+
+import pygit2
 import pytest
 
+from aristotle.graph.parser.ast_traverser import ASTTraverser
 from aristotle.graph.parser.codebase_parser import CodebaseParser
 from aristotle.graph.parser.node import Node
+from aristotle.graph.parser.parse_cache import ParseCache
+from aristotle.graph.parser.parse_stream import (read_parser_results,
+                                                 write_parser_results)
 from aristotle.graph.parser.parser_settings import ParserSettings
 from aristotle.graph.parser.relationship import Relationship
+from aristotle.graph.parser.relationship_table import RelationshipTable
+from aristotle.repository_loader.file_discovery import discover_files
 
 file_name = "1.py"
 source_file_path = f"./test_files/{file_name}"
@@ -353,3 +362,394 @@ def test_nodes_and_relationships_match_expected(
         assert (
             actual_attrs == expected_attrs
         ), f"Attributes mismatch for relationship {key}: expected {expected_attrs!r}, got {actual_attrs!r}"
+
+
+def test_parallel_parse_dir_matches_sequential():
+    sequential = CodebaseParser(codebase_name, ParserSettings())
+    sequential.parse_dir("./test_files")
+    parallel = CodebaseParser(codebase_name, ParserSettings())
+    parallel.parse_dir("./test_files", parallel=True, max_workers=2)
+
+    assert sequential.get_nodes()
+    assert parallel.get_nodes() == sequential.get_nodes()
+    assert parallel.get_relationships() == sequential.get_relationships()
+
+
+def test_parse_cache_reuses_results(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"), max_bytes=10 * 1024 * 1024)
+    cold = CodebaseParser(codebase_name, ParserSettings(), cache=cache)
+    cold.parse_dir("./test_files")
+    warm = CodebaseParser(codebase_name, ParserSettings(), cache=cache)
+    warm.parse_dir("./test_files")
+
+    assert cache.hits == len(cold.collect_files("./test_files"))
+    assert warm.get_nodes() == cold.get_nodes()
+    assert warm.get_relationships() == cold.get_relationships()
+
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"), max_bytes=1)
+    CodebaseParser(codebase_name, ParserSettings(), cache=cache).parse_dir(
+        "./test_files"
+    )
+    assert cache.stats()["entries"] == 0
+
+    # Room for two entries, the one not read since is evicted for the third
+    result = ([], [], ("module", {}, []), None)
+    cache = ParseCache(str(tmp_path / "lru"), max_bytes=10 * 1024 * 1024)
+    cache.put("a", result)
+    cache.max_bytes = 2 * cache.stats()["bytes"]
+    cache.put("b", result)
+    assert cache.get("a") == result
+    cache.put("c", result)
+    assert cache.get("b") is None
+    assert cache.get("a") == result
+    assert cache.get("c") == result
+    assert cache.stats()["entries"] == 2
+
+
+def test_parse_cache_skips_results_over_the_time_budget(tmp_path, monkeypatch):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    (source_dir / "deep.py").write_text(
+        "def g(x: int):\n" + "".join(f"    y{i} = x + {i}\n" for i in range(50))
+    )
+    check_deadline = ASTTraverser.check_deadline
+
+    def check_deadline_with_bodies(traverser):
+        # Over the time budget only while parsing function bodies
+        if traverser.traverse_function_bodies:
+            check_deadline(traverser)
+
+    monkeypatch.setattr(ASTTraverser, "check_deadline", check_deadline_with_bodies)
+    cache = ParseCache(str(tmp_path / "cache"), max_bytes=10 * 1024 * 1024)
+    parser = CodebaseParser(
+        codebase_name, ParserSettings(max_parse_seconds=0), cache=cache
+    )
+    parser.parse_dir(str(source_dir))
+    assert parser.quarantine.to_list()[0]["action"] == "shallow"
+    assert cache.stats()["entries"] == 0
+
+    # The node budget gives the same result every time, so it is cached
+    parser = CodebaseParser(
+        codebase_name, ParserSettings(max_ast_nodes=100), cache=cache
+    )
+    parser.parse_dir(str(source_dir))
+    assert parser.quarantine.to_list()[0]["action"] == "shallow"
+    assert cache.stats()["entries"] == 1
+
+
+def test_nested_function_returns_do_not_leak_into_outer(tmp_path):
+    source_file = tmp_path / "nested.py"
+    source_file.write_text(
+        "def outer(flag: bool):\n"
+        "    def inner():\n"
+        "        return 'text'\n"
+        "    return 1\n"
+    )
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_file(str(source_file), "./nested.py", "./nested.py")
+
+    attrs = {
+        (r.source, r.relationship, r.target): r.attributes
+        for r in parser.get_relationships()
+    }
+    outer = attrs[("CodebaseName.nested", "CONTAINS", "CodebaseName.nested.outer")]
+    assert outer["target_return_type"] == "int"
+    assert outer["target_signature"] == "outer(self, flag: bool) -> int"
+
+
+def test_iter_parse_dir_batches_match_parse_dir():
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_dir("./test_files")
+
+    batches = list(
+        CodebaseParser(codebase_name, ParserSettings()).iter_parse_dir(
+            "./test_files"
+        )
+    )
+    assert len(batches) > 1
+    assert [n for b in batches for n in b.get_nodes()] == parser.get_nodes()
+    assert [
+        r for b in batches for r in b.get_relationships()
+    ] == parser.get_relationships()
+
+
+def test_relationship_table_round_trips_relationships():
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_file(source_file_path, f"./{file_name}", file_name)
+    relationships = list(parser.get_relationships())
+    relationships.append(
+        Relationship(
+            "a", "CALLS", "b", {"source_kind": "Function", "target_kind": "Function"}
+        )
+    )
+
+    table = RelationshipTable(relationships)
+    assert len(table) == len(relationships)
+    assert table == relationships
+    assert [r.to_tuple() for r in relationships] == table.to_tuples()
+    assert table[-1].attributes == {
+        "source_kind": "Function",
+        "target_kind": "Function",
+    }
+    assert len(table.strings) < sum(2 + len(r.attributes) for r in relationships)
+
+
+def test_notebook_code_cells_and_magics_are_parsed(tmp_path):
+    notebook = {
+        "cells": [
+            {"cell_type": "markdown", "metadata": {}, "source": ["# Title\n"]},
+            {
+                "cell_type": "code",
+                "execution_count": 1,
+                "metadata": {},
+                "outputs": [],
+                "source": ["%matplotlib inline\n", "!pip install foo\n", "import os"],
+            },
+            {
+                "cell_type": "code",
+                "execution_count": 2,
+                "metadata": {},
+                "outputs": [],
+                "source": ["%%time\n", "not python at all\n"],
+            },
+            {
+                "cell_type": "code",
+                "execution_count": 3,
+                "metadata": {},
+                "outputs": [],
+                "source": ["def step(x: int) -> int:\n", "    return x\n"],
+            },
+        ],
+        "metadata": {},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+    notebook_file = tmp_path / "demo.ipynb"
+    notebook_file.write_text(json.dumps(notebook))
+
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_file(str(notebook_file), "./demo.ipynb", "./demo.ipynb")
+    assert "CodebaseName.demo.step" in {n.uuid for n in parser.get_nodes()}
+
+    notebook["cells"][3]["source"] = ["def broken(:\n"]
+    notebook_file.write_text(json.dumps(notebook))
+    with pytest.raises(SyntaxError, match="notebook cell 3"):
+        parser.parse_file(str(notebook_file), "./demo.ipynb", "./demo.ipynb")
+
+
+def test_nodes_and_relationships_are_merged_across_files(tmp_path):
+    (tmp_path / "a.py").write_text("class Base:\n    pass\n\nclass A(Base):\n    pass\n")
+    (tmp_path / "b.py").write_text(
+        'class Base:\n    """Base docstring"""\n\nclass A(Base):\n    pass\n'
+    )
+    settings = ParserSettings(include_module_name=False)
+    parser = CodebaseParser(codebase_name, settings)
+    parser.parse_dir(str(tmp_path))
+
+    uuids = [n.uuid for n in parser.get_nodes()]
+    assert len(uuids) == len(set(uuids))
+    keys = [(r.source, r.relationship, r.target) for r in parser.get_relationships()]
+    assert len(keys) == len(set(keys))
+    base = next(n for n in parser.get_nodes() if n.uuid == "CodebaseName.Base")
+    assert base.attributes["docstring"] == "Base docstring"
+
+    batches = list(
+        CodebaseParser(codebase_name, settings).iter_parse_dir(str(tmp_path))
+    )
+    streamed = {n.uuid: n for b in batches for n in b.get_nodes()}
+    assert streamed["CodebaseName.Base"] == base
+    assert sum(len(b.get_relationships()) for b in batches) == len(keys)
+
+
+def test_inherits_resolve_to_canonical_uuids(tmp_path):
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("from .shapes import Shape\n")
+    (package / "shapes.py").write_text("class Shape:\n    pass\n")
+    (package / "square.py").write_text(
+        "from . import shapes\nfrom .shapes import Shape\n\nclass Square(Shape):\n"
+        "    pass\n"
+    )
+    (tmp_path / "circle.py").write_text(
+        "from pkg import Shape\n\nclass Circle(Shape):\n    pass\n\n"
+        "class Error(ValueError):\n    pass\n"
+    )
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_dir(str(tmp_path))
+
+    inherits = {
+        r.source: r.target
+        for r in parser.get_relationships()
+        if r.relationship == "INHERITS"
+    }
+    assert inherits == {
+        "CodebaseName.pkg.square.Square": "CodebaseName.pkg.shapes.Shape",
+        "CodebaseName.circle.Circle": "CodebaseName.pkg.shapes.Shape",
+        "CodebaseName.circle.Error": "builtins.ValueError",
+    }
+    uuids = {n.uuid for n in parser.get_nodes()}
+    assert "pkg.Shape" not in uuids and "pkg.shapes.Shape" not in uuids
+    assert "builtins.ValueError" in uuids
+
+    batches = list(
+        CodebaseParser(codebase_name, ParserSettings()).iter_parse_dir(str(tmp_path))
+    )
+    assert {n.uuid for b in batches for n in b.get_nodes()} == uuids
+
+
+def test_reparse_only_changed_files_and_dependents(tmp_path):
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("from .shapes import Shape\n")
+    (package / "shapes.py").write_text("class Shape:\n    pass\n")
+    (tmp_path / "circle.py").write_text(
+        "from pkg import Shape\n\nclass Circle(Shape):\n    pass\n"
+    )
+    (tmp_path / "square.py").write_text(
+        "import pkg.shapes\n\nclass Square(pkg.shapes.Shape):\n    pass\n"
+    )
+    (tmp_path / "other.py").write_text("import os\n\nclass Other:\n    pass\n")
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_dir(str(tmp_path))
+    parser.save_index(str(tmp_path / "index.json"))
+
+    index = parser.dependency_index
+    assert index.affected_files({"/other.py"}) == {"/other.py"}
+    assert index.affected_files({"/circle.py"}) == {"/circle.py"}
+    # circle.py imports Shape through the package re-export
+    assert index.affected_files({"pkg/shapes.py"}) == {
+        "pkg/shapes.py",
+        "pkg/__init__.py",
+        "/circle.py",
+        "/square.py",
+    }
+
+    reloaded = CodebaseParser(codebase_name, ParserSettings())
+    assert reloaded.load_index(str(tmp_path / "index.json"))
+    batches = list(reloaded.iter_reparse_files(str(tmp_path), {"/circle.py"}))
+    inherits = [
+        (r.source, r.target)
+        for b in batches
+        for r in b.get_relationships()
+        if r.relationship == "INHERITS"
+    ]
+    assert inherits == [("CodebaseName.circle.Circle", "CodebaseName.pkg.shapes.Shape")]
+    references = {n.attributes.get("reference") for b in batches for n in b.get_nodes()}
+    assert references - {None} == {"/circle.py"}
+
+
+def test_files_over_budget_are_quarantined(tmp_path):
+    (tmp_path / "small.py").write_text("def f(x: int):\n    return x\n")
+    (tmp_path / "deep.py").write_text(
+        "def g(x: int):\n" + "".join(f"    y{i} = x + {i}\n" for i in range(50))
+    )
+    (tmp_path / "big.py").write_text("x = 1\n" * 1000)
+    (tmp_path / "broken.py").write_text("def broken(:\n")
+    settings = ParserSettings(max_source_kb=4, max_ast_nodes=100)
+    parser = CodebaseParser(codebase_name, settings)
+    parser.parse_dir(str(tmp_path))
+
+    actions = {e["reference"]: e["action"] for e in parser.quarantine.to_list()}
+    assert actions == {
+        "/big.py": "skipped",
+        "/deep.py": "shallow",
+        "/broken.py": "failed",
+    }
+    signatures = {
+        r.target: r.attributes["target_signature"]
+        for r in parser.get_relationships()
+        if r.relationship == "CONTAINS"
+    }
+    # Return types are only inferred from function bodies
+    assert signatures["CodebaseName.small.f"] == "f(self, x: int) -> int"
+    assert signatures["CodebaseName.deep.g"] == "g(self, x: int) -> Any"
+
+    parser = CodebaseParser(codebase_name, ParserSettings(max_parse_seconds=0))
+    parser.parse_dir(str(tmp_path))
+    assert {e["reference"] for e in parser.quarantine.to_list()} == {
+        "/small.py",
+        "/deep.py",
+        "/broken.py",
+    }
+
+
+def test_discover_files_skips_vendored_generated_and_large_files(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "core.py").write_text("def run():\n    pass\n")
+    (tmp_path / "pkg" / "api_pb2.py").write_text("X = 1\n")
+    (tmp_path / "pkg" / "gen.py").write_text("# @generated by tool\nY = 2\n")
+    (tmp_path / "pkg" / "stub.py").write_text("# Code generated by x. DO NOT EDIT.\n")
+    (tmp_path / "pkg" / "names.py").write_text(
+        '"""Names."""\n\n# Do not edit this list manually\nNAMES = []\n'
+    )
+    (tmp_path / "pkg" / "huge.py").write_text("Z = 3\n" * 1000)
+    (tmp_path / "site-packages").mkdir()
+    (tmp_path / "site-packages" / "dep.py").write_text("W = 4\n")
+    (tmp_path / "README.md").write_text("# Readme\n")
+
+    listing = discover_files(str(tmp_path), max_file_bytes=1024)
+    assert listing.paths == ["README.md", "pkg/core.py", "pkg/names.py"]
+    assert {path for path, _ in listing.skipped} == {
+        "pkg/api_pb2.py",
+        "pkg/gen.py",
+        "pkg/huge.py",
+        "pkg/stub.py",
+    }
+
+    repo = pygit2.init_repository(str(tmp_path))
+    (tmp_path / "untracked.py").write_text("V = 5\n")
+    repo.index.add("pkg/core.py")
+    repo.index.write()
+    assert discover_files(str(tmp_path)).paths == ["pkg/core.py"]
+
+
+def test_include_private_dirs_and_test_files(tmp_path):
+    (tmp_path / "_internal").mkdir()
+    (tmp_path / "_internal" / "impl.py").write_text("def impl():\n    pass\n")
+    (tmp_path / "test_core.py").write_text("def test_core():\n    pass\n")
+
+    default = CodebaseParser(codebase_name, ParserSettings())
+    assert default.collect_files(str(tmp_path)) == []
+
+    settings = ParserSettings(include_private_dirs=True, include_test_files=True)
+    parser = CodebaseParser(codebase_name, settings)
+    files = parser.collect_files(str(tmp_path), "p/")
+    assert [(virtual_path, reference) for _, virtual_path, reference in files] == [
+        ("./test_core.py", "p//test_core.py"),
+        ("./_internal/impl.py", "p/_internal/impl.py"),
+    ]
+
+
+def test_signatures_only_profile_skips_bodies_and_parameter_usages():
+    full = CodebaseParser(codebase_name, ParserSettings())
+    full.parse_file(source_file_path, f"./{file_name}", file_name)
+    settings = ParserSettings(profile="signatures_only")
+    signatures = CodebaseParser(codebase_name, settings)
+    signatures.parse_file(source_file_path, f"./{file_name}", file_name)
+
+    kinds = {r.relationship for r in signatures.get_relationships()}
+    assert "HAS_PARAMETER" not in kinds
+    assert "HAS_METHOD" in kinds
+    assert len(signatures.get_relationships()) < len(full.get_relationships())
+    assert settings.should_embed("HAS_METHOD")
+    assert not settings.should_embed("INHERITS")
+
+    with pytest.raises(ValueError):
+        ParserSettings(profile="everything")
+
+
+def test_parse_stream_round_trips_batches(tmp_path):
+    parser = CodebaseParser(codebase_name, ParserSettings(profile="structure"))
+    batches = list(parser.iter_parse_dir("./test_files"))
+    stream_path = str(tmp_path / "parsed.arps")
+
+    assert write_parser_results(stream_path, batches) == len(batches)
+    read_back = list(read_parser_results(stream_path))
+    assert len(read_back) == len(batches)
+    for written, read in zip(batches, read_back):
+        assert read.codebase_name == codebase_name
+        assert read.settings.profile == "structure"
+        assert read.get_nodes() == written.get_nodes()
+        assert read.get_relationships() == written.get_relationships()
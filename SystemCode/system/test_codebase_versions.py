@@ -0,0 +1,160 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from aristotle.graph.graph_database import PreparedBatch
+from aristotle.graph.name_index import NameIndex
+from aristotle.graph.parser.codebase_parser import CodebaseParser
+from aristotle.graph.parser.parser_settings import ParserSettings
+
+codebase_name = "CodebaseName"
+
+
+def test_versions_of_a_codebase_are_written_to_separate_groups(fake_graph_db):
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_dir("./test_files")
+    old_nodes, old_edges = PreparedBatch(parser, {}).records(None)
+    new_batch = PreparedBatch(parser, {}, f"{codebase_name}@v2")
+    new_nodes, new_edges = new_batch.records(None)
+    # Same names, but no uuid of the new version overwrites one of the old version
+    assert [n["name"] for n in new_nodes] == [n["name"] for n in old_nodes]
+    assert not {n["uuid"] for n in new_nodes} & {n["uuid"] for n in old_nodes}
+    assert not {e["uuid"] for e in new_edges} & {e["uuid"] for e in old_edges}
+    new_uuids = {n["uuid"] for n in new_nodes}
+    assert all(e["source_uuid"] in new_uuids for e in new_edges)
+
+    index = NameIndex()
+    index.load(f"{codebase_name}@v2", new_uuids)
+    assert index.lookup("what does `Dog.bark` do") == [
+        f"{codebase_name}@v2/{codebase_name}.1.Dog.bark"
+    ]
+
+    class Driver:
+        def __init__(self):
+            self.remaining = {"RELATES_TO": 5, "DETACH": 3}
+            self.limits = []
+
+        async def execute_query(self, query, group_id, limit):
+            self.limits.append(limit)
+            key = "DETACH" if "DETACH" in query else "RELATES_TO"
+            deleted = min(limit, self.remaining[key])
+            self.remaining[key] -= deleted
+            return [{"deleted": deleted}], None, None
+
+    graph_db = fake_graph_db(Driver(), name_index=index)
+    assert asyncio.run(
+        graph_db.delete_group(f"{codebase_name}@v2", batch_size=2, pause_seconds=0)
+    ) == (3, 5)
+    # Batches until one comes back short
+    assert len(graph_db.graphiti.driver.limits) == 3 + 2
+    assert not index.is_loaded(f"{codebase_name}@v2")
+
+
+def test_codebase_versions_are_activated_and_retired(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_core")
+    from aristotle import project_config
+    from aristotle.agent import loaded_codebases as registry
+
+    monkeypatch.setattr(
+        project_config, "loaded_codebases_file", str(tmp_path / "loaded.json")
+    )
+    (tmp_path / "loaded.json").write_text(json.dumps({"cb": "LOADED"}))
+    assert registry.search_group_ids(None) is None
+    assert registry.search_group_ids(["cb"]) == ["cb"]
+
+    # A reload is not searched until it is activated
+    assert registry.begin_codebase_version("cb") == 1
+    assert registry.get_loaded_codebase_status("cb") == "LOADED"
+    assert registry.search_group_ids(["cb"]) == ["cb"]
+    assert registry.search_group_ids(None) == ["cb"]
+    assert registry.activate_codebase_version("cb", 1, "LOADED") == ["cb"]
+    assert registry.search_group_ids(["cb"]) == ["cb@v1"]
+    registry.retired_group_deleted("cb", "cb")
+    assert registry.search_group_ids(None) is None
+
+    # A failed reload is retired, the loaded version stays active
+    assert registry.begin_codebase_version("cb") == 2
+    assert registry.abandon_codebase_version("cb", 2, "Error") == ["cb@v2"]
+    assert registry.search_group_ids(["cb"]) == ["cb@v1"]
+    # A reload superseded by a later one is never activated, and only retired once
+    # its load stops writing to it
+    assert registry.begin_codebase_version("cb") == 3
+    assert registry.begin_codebase_version("cb") == 4
+    assert registry.retired_groups() == [("cb", "cb@v2")]
+    assert registry.search_group_ids(None) == ["cb@v1"]
+    assert registry.activate_codebase_version("cb", 3, "LOADED") == ["cb@v2", "cb@v3"]
+    assert registry.search_group_ids(["cb"]) == ["cb@v1"]
+    assert registry.activate_codebase_version("cb", 4, "LOADED") == [
+        "cb@v2",
+        "cb@v3",
+        "cb@v1",
+    ]
+    assert registry.retired_groups() == [
+        ("cb", "cb@v2"),
+        ("cb", "cb@v3"),
+        ("cb", "cb@v1"),
+    ]
+
+    # A failed first load is not searchable at all
+    assert registry.begin_codebase_version("new") == 1
+    assert registry.get_loaded_codebase_status("new") == "LOADING_IN_PROGRESS"
+    registry.abandon_codebase_version("new", 1, "Error")
+    assert registry.get_loaded_codebase_status("new") == "FAILED_TO_LOAD"
+    assert "new" not in registry.searchable_codebases()
+
+    # Loads the server stopped midway are retired on the next start
+    assert registry.begin_codebase_version("cb") == 5
+    assert registry.begin_codebase_version("cb") == 6
+    assert registry.begin_codebase_version("other") == 1
+    registry.retire_interrupted_loads()
+    assert not registry.is_loading("cb")
+    assert registry.get_loaded_codebase_status("cb") == "LOADED"
+    assert registry.get_loaded_codebase_status("other") == "FAILED_TO_LOAD"
+    assert ("cb", "cb@v5") in registry.retired_groups()
+    assert ("cb", "cb@v6") in registry.retired_groups()
+    assert ("other", "other@v1") in registry.retired_groups()
+    # The load of a superseded version that was abandoned leaves the status alone
+    assert registry.begin_codebase_version("cb") == 7
+    assert registry.begin_codebase_version("cb") == 8
+    assert registry.abandon_codebase_version("cb", 7, "Error")[-1] == "cb@v7"
+    assert registry.is_loading("cb")
+    assert "reload_error" not in json.loads(registry.list_all_codebases())["cb"]
+
+
+def test_docs_of_retired_codebase_versions_are_deleted(tmp_path):
+    pytest.importorskip("faiss")
+    pytest.importorskip("langchain_ollama")
+    from aristotle.vector.documentations_database import DocumentationsDatabase
+
+    (tmp_path / "README.md").write_text("# Usage\n\nCall `run` to start.\n")
+
+    class Encoder:
+        def encode_list(self, texts):
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+        def encode_string(self, text):
+            return np.ones((1, 4), dtype=np.float32)
+
+    docs_db = DocumentationsDatabase.__new__(DocumentationsDatabase)
+    docs_db.__dict__.update(
+        encoder=Encoder(),
+        index_path=str(tmp_path / "faiss_index"),
+        meta_path=str(tmp_path / "meta.json"),
+        index=None,
+        meta=None,
+        ids_by_group=None,
+        lock=threading.Lock(),
+    )
+    for group_id in ("cb@v1", "cb@v2"):
+        assert docs_db.load_dir(str(tmp_path), "cb", group_id=group_id) == 1
+    # A reload is only searched once it is activated
+    results = docs_db.search("how to run", group_ids=["cb@v1"])
+    assert results and {r["group_id"] for r in results} == {"cb@v1"}
+
+    assert docs_db.delete_group("cb@v1") == len(results)
+    assert docs_db.search("how to run", group_ids=["cb@v1"]) == []
+    assert {r["group_id"] for r in docs_db.search("how to run")} == {"cb@v2"}
+    assert docs_db.delete_group("cb@v1") == 0
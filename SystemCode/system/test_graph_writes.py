@@ -0,0 +1,307 @@
+import asyncio
+from types import SimpleNamespace
+
+from aristotle.embedding_cache import EmbeddingCache
+from aristotle.graph.embedding_batcher import EmbeddingBatcher
+from aristotle.graph.graph_database import (DELETE_REFERENCE_EDGES,
+                                            DELETE_REFERENCE_NODES,
+                                            NODES_WITHOUT_EMBEDDING,
+                                            PreparedBatch, edge_record,
+                                            late_docstrings_batch)
+from aristotle.graph.ingest_pipeline import IngestPipeline
+from aristotle.graph.parser.codebase_parser import CodebaseParser
+from aristotle.graph.parser.node import Node
+from aristotle.graph.parser.parse_batch import ParseBatch
+from aristotle.graph.parser.parser_settings import ParserSettings
+from aristotle.graph.parser.relationship import Relationship
+
+codebase_name = "CodebaseName"
+
+
+def test_reparse_deletes_definitions_removed_from_a_file(tmp_path, fake_graph_db):
+    (tmp_path / "mod.py").write_text(
+        "from ext import Base\n\n"
+        "class Keep:\n    def f(self):\n        pass\n\n"
+        "class Gone(Base):\n    def g(self, x):\n        pass\n\n"
+        "def h():\n    pass\n"
+    )
+    nodes, edges = {}, {}
+
+    def write(parser_or_batches):
+        batches = (
+            [parser_or_batches]
+            if isinstance(parser_or_batches, CodebaseParser)
+            else parser_or_batches
+        )
+        for batch in batches:
+            node_records, edge_records = PreparedBatch(batch, {}, "cb@v1").records(None)
+            nodes.update((record["uuid"], record) for record in node_records)
+            edges.update((record["uuid"], record) for record in edge_records)
+
+    class Driver:
+        async def execute_query(self, query, group_id, references):
+            """The deletes of delete_references, on the in-memory graph."""
+            if query == DELETE_REFERENCE_EDGES:
+                for uuid, edge in list(edges.items()):
+                    if edge["reference"] in references:
+                        del edges[uuid]
+                return
+            connected = {e["source_uuid"] for e in edges.values()}
+            connected |= {e["target_uuid"] for e in edges.values()}
+            for uuid, node in list(nodes.items()):
+                if query == DELETE_REFERENCE_NODES:
+                    deleted = node.get("reference") in references
+                else:
+                    deleted = node.get("reference") is None and uuid not in connected
+                if deleted:
+                    del nodes[uuid]
+                    for edge_uuid, edge in list(edges.items()):
+                        if uuid in (edge["source_uuid"], edge["target_uuid"]):
+                            del edges[edge_uuid]
+
+    parser = CodebaseParser("cb", ParserSettings())
+    parser.parse_dir(str(tmp_path))
+    parser.save_index(str(tmp_path / "index.json"))
+    write(parser)
+    # Every node the file defines can be found by its reference
+    assert all(
+        node.get("reference") == "/mod.py"
+        for uuid, node in nodes.items()
+        if uuid.startswith("cb@v1/cb.mod")
+    )
+
+    (tmp_path / "mod.py").write_text("class Keep:\n    def f(self):\n        pass\n")
+    graph_db = fake_graph_db(Driver())
+    asyncio.run(graph_db.delete_references("cb@v1", ["/mod.py"]))
+    # As main_reload.py does
+    reloaded = CodebaseParser("cb", ParserSettings())
+    assert reloaded.load_index(str(tmp_path / "index.json"))
+    write(reloaded.iter_reparse_files(str(tmp_path), {"/mod.py"}))
+
+    assert sorted(nodes) == [
+        "cb@v1/cb.mod",
+        "cb@v1/cb.mod.Keep",
+        "cb@v1/cb.mod.Keep.f",
+        "cb@v1/cb.mod.mod",
+    ]
+
+
+def test_graph_writes_are_batched_and_idempotent(fake_graph_db):
+    relationship = Relationship(
+        "a.A", "INHERITS", "a.B", {"source_kind": "CLASS", "target_kind": "CLASS"}
+    )
+    first = edge_record("cb", relationship, "fact", None, {})
+    assert first["uuid"] == edge_record("cb", relationship, "fact", None, {})["uuid"]
+    assert first["uuid"] != edge_record("other", relationship, "fact", None, {})["uuid"]
+
+    writes = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def execute_write(self, func, query, **params):
+            writes.append({key: len(records) for key, records in params.items()})
+
+    graph_db = fake_graph_db(SimpleNamespace(session=Session), write_batch_size=2)
+    node = {"uuid": "cb.a.A", "group_id": "cb"}
+    asyncio.run(graph_db.write_records([node] * 3, [{"group_id": "cb"}] * 2))
+    assert writes == [{"nodes": 2}, {"nodes": 1}, {"edges": 2}]
+
+
+def test_embedding_batcher_keeps_order_and_retries_failed_batches():
+    requests = []
+
+    class Embedder:
+        async def create_batch(self, texts):
+            requests.append(len(texts))
+            if len(requests) == 1:
+                raise ConnectionError("first request fails")
+            return [[float(len(text))] for text in texts]
+
+    texts = ["a" * length for length in (5, 1, 4, 2, 3)]
+    batcher = EmbeddingBatcher(Embedder(), batch_size=4, retry_delay=0)
+    embeddings = asyncio.run(batcher.embed(texts))
+
+    assert embeddings == [[5.0], [1.0], [4.0], [2.0], [3.0]]
+    assert batcher.errors == 1
+    assert batcher.embedded == len(texts)
+    # The failed batch is retried in halves and the batch size is halved
+    assert requests[0] == 4 and sorted(requests[1:]) == [1, 2, 2]
+
+
+def test_embedding_cache_is_persistent_and_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    # Room for two 2-dimensional float32 vectors
+    cache = EmbeddingCache(path, max_bytes=16)
+    cache.put_many("model", 2, ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert cache.get_many("model", 2, ["a", "c"]) == [[1.0, 2.0], None]
+    assert cache.get_many("other", 2, ["a"]) == [None]
+
+    cache.put_many("model", 2, ["c"], [[5.0, 6.0]])
+    reopened = EmbeddingCache(path, max_bytes=16)
+    assert reopened.get_many("model", 2, ["a", "b", "c"]) == [
+        [1.0, 2.0],
+        None,
+        [5.0, 6.0],
+    ]
+    assert reopened.stats() == {"entries": 2, "bytes": 16, "hits": 2, "misses": 1}
+
+    embedded = []
+
+    class Embedder:
+        async def create_batch(self, texts):
+            embedded.extend(texts)
+            return [[0.5, 0.5] for _ in texts]
+
+    batcher = EmbeddingBatcher(Embedder(), cache=reopened, model="model", dim=2)
+    assert asyncio.run(batcher.embed(["c", "d", "c"])) == [
+        [5.0, 6.0],
+        [0.5, 0.5],
+        [5.0, 6.0],
+    ]
+    assert embedded == ["d"]
+
+
+def test_ingest_pipeline_writes_batches_in_parse_order():
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_dir("./test_files")
+    nodes = parser.get_nodes()
+    # Earlier batches are larger, so later ones finish embedding first
+    batches = [
+        ParseBatch(codebase_name, nodes[start : start + size], [], parser.settings)
+        for start, size in ((0, 5), (5, 4), (9, 3), (12, 2), (14, 1))
+    ]
+    written = []
+
+    class Database:
+        async def embed_batch(self, prepared, print_progress=False):
+            await asyncio.sleep(0.01 * len(prepared.nodes))
+            return [node.uuid for node in prepared.nodes], prepared.facts
+
+        async def write_records(self, node_records, edge_records, print_progress=False):
+            written.append(node_records)
+
+    pipeline = IngestPipeline(Database(), queue_size=3, embed_concurrency=3)  # type: ignore
+    assert asyncio.run(pipeline.run(batches, docs_loader=lambda: 7)) == 7
+    assert written == [[node.uuid for node in batch.get_nodes()] for batch in batches]
+    assert pipeline.stats["write"].items == 15
+
+
+def test_structure_first_load_is_backfilled_with_embeddings(fake_graph_db):
+    parser = CodebaseParser(codebase_name, ParserSettings(profile="structure"))
+    parser.parse_dir("./test_files")
+    # uuid -> embedding, of the nodes and edges as the graph stores them
+    graph = {"nodes": {}, "edges": {}}
+
+    class Database:
+        async def write_records(self, node_records, edge_records, print_progress=False):
+            for key, records, vector in (
+                ("nodes", node_records, "name_embedding"),
+                ("edges", edge_records, "fact_embedding"),
+            ):
+                for record in records:
+                    graph[key][record["uuid"]] = (record["name"], record[vector])
+
+    pipeline = IngestPipeline(Database(), embed=False)  # type: ignore
+    asyncio.run(pipeline.run([parser]))  # type: ignore
+    assert graph["nodes"] and graph["edges"]
+    assert all(embedding is None for _, embedding in graph["nodes"].values())
+
+    class Driver:
+        async def execute_query(self, query, group_id, limit, relations=None):
+            key = "nodes" if query == NODES_WITHOUT_EMBEDDING else "edges"
+            return (
+                [
+                    {"uuid": uuid} if key == "nodes" else {"uuid": uuid, "text": name}
+                    for uuid, (name, embedding) in graph[key].items()
+                    if embedding is None and (relations is None or name in relations)
+                ][:limit],
+                None,
+                None,
+            )
+
+        def session(self):
+            return self
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def execute_write(self, func, query, records):
+            key = "nodes" if "setNodeVectorProperty" in query else "edges"
+            for record in records:
+                name, _ = graph[key][record["uuid"]]
+                graph[key][record["uuid"]] = (name, record["embedding"])
+
+    embedded_texts = []
+
+    class Embedder:
+        async def create_batch(self, texts):
+            embedded_texts.extend(texts)
+            return [[1.0] for _ in texts]
+
+    graph_db = fake_graph_db(
+        graphiti=SimpleNamespace(driver=Driver(), embedder=Embedder()),
+        embedding_batcher=EmbeddingBatcher(Embedder()),
+    )
+    num_nodes, num_relationships = asyncio.run(
+        graph_db.backfill_embeddings(codebase_name, parser.settings)
+    )
+    assert num_nodes == len(graph["nodes"])
+    assert num_relationships == len(graph["edges"])
+    # The texts a full load embeds, qualified names rather than short names
+    assert sorted(embedded_texts[:num_nodes]) == sorted(
+        node.uuid for node in parser.get_nodes()
+    )
+    assert f"{codebase_name}.1.Dog.bark" in embedded_texts
+    assert all(embedding == [1.0] for _, embedding in graph["nodes"].values())
+
+
+def test_relationships_get_docstrings_of_later_batches():
+    settings = ParserSettings()
+    contains = Relationship(
+        "cb.a",
+        "CONTAINS",
+        "cb.a.f",
+        {"source_kind": "MODULE", "target_kind": "FUNCTION"},
+    )
+    parameter = Relationship(
+        "cb.a.f",
+        "HAS_PARAMETER",
+        "cb.a.f.x",
+        {"source_kind": "FUNCTION", "target_kind": "FIELD"},
+    )
+    first = ParseBatch(
+        "cb",
+        [Node("cb.a", "MODULE", {"name": "a", "docstring": "Module a."})],
+        [contains, parameter],
+        settings,
+    )
+    # A later file adds the docstring of the function, e.g. through a merged node
+    second = ParseBatch(
+        "cb",
+        [Node("cb.a.f", "FUNCTION", {"name": "f", "docstring": "Does f."})],
+        [],
+        settings,
+    )
+
+    docstrings: dict = {}
+    held_back: list = []
+    early = PreparedBatch(first, docstrings, held_back=held_back)
+    PreparedBatch(second, docstrings, held_back=held_back)
+    assert "Does f." not in early.facts[0]
+    late = late_docstrings_batch(second, held_back, docstrings)
+    assert late is not None and late.get_relationships() == [contains, parameter]
+
+    _, late_edges = PreparedBatch(late, docstrings).records(None)
+    _, early_edges = early.records(None)
+    assert [e["uuid"] for e in late_edges] == [e["uuid"] for e in early_edges]
+    assert late_edges[0]["target_docstring"] == "Does f."
+    assert late_edges[1]["source_docstring"] == "Does f."
+    assert late_docstrings_batch(second, [], docstrings) is None
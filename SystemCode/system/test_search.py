@@ -0,0 +1,156 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from aristotle.graph.name_index import NameIndex
+from aristotle.graph.parser.codebase_parser import CodebaseParser
+from aristotle.graph.parser.parser_settings import ParserSettings
+from aristotle.graph.rerankers import cosine_scores, rank_by_scores
+from aristotle.graph.search_cache import SearchCache
+from aristotle.kbs.codebase_router import merge_routed, route_codebases
+
+codebase_name = "CodebaseName"
+
+
+def test_search_is_routed_to_fuzzily_matched_codebases():
+    codebases = ["scikit-learn", "pandas", "numpy", "opencv-python"]
+    assert route_codebases("How does Scikit Learn fit a model", codebases) == [
+        "scikit-learn"
+    ]
+    assert route_codebases("x", codebases, codebase="pandsa") == ["pandas"]
+    assert route_codebases("numpy arrays in pandas frames", codebases) == [
+        "numpy",
+        "pandas",
+    ]
+    assert route_codebases("x", codebases, codebase="OpenCV_Python") == [
+        "opencv-python"
+    ]
+    # Nothing named, every codebase is searched
+    assert route_codebases("where is the retry logic", codebases) == []
+    # Ordinary words close to codebase names are not typos of them
+    codebases += ["transformers", "typer", "requests", "click"]
+    for query in [
+        "How does the transform method of Pipeline work?",
+        "what type does parse return",
+        "what types are accepted by fit",
+        "How is the request body validated?",
+        "pandsa read_csv options",
+    ]:
+        assert route_codebases(query, codebases) == [], query
+    # Codebases named in the query add their results on top of the full search
+    assert merge_routed(["a", "b"], ["c", "b"], lambda result: result) == [
+        "a",
+        "b",
+        "c",
+    ]
+
+
+def test_name_index_finds_symbols_named_in_queries():
+    parser = CodebaseParser(codebase_name, ParserSettings())
+    parser.parse_dir("./test_files")
+    index = NameIndex(max_matches=2)
+    # Codebases are only indexed once loaded, or once every codebase is
+    index.add(codebase_name, ["ignored"])
+    index.load(codebase_name, [node.uuid for node in parser.get_nodes()])
+
+    prefix = f"{codebase_name}.1"
+    assert index.lookup("what does `Dog.bark` return") == [f"{prefix}.Dog.bark"]
+    # Leading parts that are not in the uuid, e.g. re-exports, are dropped
+    assert index.lookup("params of pkg.Animal.speak") == [f"{prefix}.Animal.speak"]
+    assert index.lookup("subclasses of `Mammal`", ["other"]) == []
+    # Plain English words and ambiguous names are left to the semantic search
+    assert index.lookup("how do animals speak and greet") == []
+    assert index.lookup("where is `name` set") == []
+    assert "ignored" not in index.suffixes[codebase_name]
+
+
+def test_cosine_rerank_orders_by_similarity_and_keeps_unembedded_last():
+    items = ["orthogonal", "unembedded", "same", "opposite"]
+    scores = cosine_scores([1.0, 0.0], [[0.0, 2.0], None, [3.0, 0.0], [-1.0, 0.0]])
+    assert scores[1] is None
+    assert scores[2] == pytest.approx(1.0)
+    assert rank_by_scores(items, scores) == [
+        "same",
+        "orthogonal",
+        "opposite",
+        "unembedded",
+    ]
+    assert cosine_scores([1.0], [None]) == [None]
+
+
+def test_name_index_is_loaded_again_after_its_time_to_live(fake_graph_db):
+    queries = []
+
+    class Driver:
+        def __init__(self):
+            self.uuids = {"cb": ["cb.Dog"], "gone": ["gone.Cat"]}
+
+        async def execute_query(self, query, group_id=None):
+            queries.append(group_id)
+            groups = [group_id] if group_id is not None else list(self.uuids)
+            records = [
+                {"group_id": g, "uuid": uuid} for g in groups for uuid in self.uuids[g]
+            ]
+            return records, None, None
+
+    graph_db = fake_graph_db(Driver(), name_index=NameIndex(ttl_seconds=60))
+    asyncio.run(graph_db.load_name_index(["cb"]))
+    asyncio.run(graph_db.load_name_index(["cb"]))
+    asyncio.run(graph_db.load_name_index())
+    asyncio.run(graph_db.load_name_index())
+    assert queries == ["cb", None]
+    assert graph_db.name_index.lookup("`Cat`") == ["gone.Cat"]
+
+    # Another process wrote to cb and deleted gone
+    graph_db.graphiti.driver.uuids = {"cb": ["cb.Dog", "cb.Puppy"]}
+    graph_db.name_index.ttl_seconds = 0
+    asyncio.run(graph_db.load_name_index(["cb"]))
+    assert graph_db.name_index.lookup("`Puppy`", ["cb"]) == ["cb.Puppy"]
+    asyncio.run(graph_db.load_name_index())
+    assert queries == ["cb", None, "cb", None]
+    assert graph_db.name_index.lookup("`Cat`") == []
+
+
+def test_search_cache_is_invalidated_by_writes_to_searched_codebases(fake_graph_db):
+    searches = []
+
+    class Graphiti:
+        async def search(self, query, group_ids=None, num_results=10):
+            searches.append((query, group_ids))
+            return [SimpleNamespace(uuid=f"{query}-{len(searches)}")]
+
+    graph_db = fake_graph_db(
+        graphiti=Graphiti(), search_cache=SearchCache(max_entries=3, ttl_seconds=60)
+    )
+    graph_db.name_index.complete = True
+
+    def search(query, group_ids=None):
+        return asyncio.run(graph_db.search(query, 7, group_ids, rerank="rrf"))
+
+    first = search("how do dogs bark?", ["cb"])
+    # Same query up to whitespace and punctuation
+    assert search("how  do dogs bark", ["cb"]) == first
+    search("what is a mammal", ["other"])
+    search("what is a mammal")
+    assert len(searches) == 3
+
+    graph_db.search_cache.invalidate("cb")
+    assert search("how do dogs bark", ["cb"]) != first
+    search("what is a mammal", ["other"])
+    search("what is a mammal")
+    # Searches of every codebase are invalidated by writes to any of them
+    assert len(searches) == 5
+
+    # A result computed while its codebase was written to is not stored
+    generation = graph_db.search_cache.generation(["other"])
+    graph_db.search_cache.invalidate("other")
+    key = graph_db.search_cache.key("stale", ["other"], 7, "rrf")
+    graph_db.search_cache.put(key, [], generation)
+    assert graph_db.search_cache.get(key) is None
+
+    stats = graph_db.search_cache.stats()
+    assert stats["entries"] <= 3
+    assert stats["hits"] == 2
+    assert stats["invalidations"] == 4
+    assert stats["bytes"] > 0